@@ -4,6 +4,44 @@ Agentic Wellness System - Agent Module
 from .planner_agent import PlannerAgent
 from .decision_agent import DecisionAgent
 from .feedback_agent import FeedbackAgent
+from .agent_log import AgentLog, SegmentStore
+from .plan_templates import PlanTemplates, get_default_templates
+from .decision_table import DecisionRules, DecisionTable, get_default_rules
+from .tracing import (
+    DEBUG,
+    INFO,
+    OFF,
+    Tracer,
+    TraceSink,
+    NullSink,
+    ConsoleSink,
+    JsonlSink,
+    MemorySink,
+    get_default_tracer,
+    set_default_tracer,
+)
 
-__all__ = ["PlannerAgent", "DecisionAgent", "FeedbackAgent"]
+__all__ = [
+    "PlannerAgent",
+    "DecisionAgent",
+    "FeedbackAgent",
+    "AgentLog",
+    "SegmentStore",
+    "PlanTemplates",
+    "get_default_templates",
+    "DecisionRules",
+    "DecisionTable",
+    "get_default_rules",
+    "DEBUG",
+    "INFO",
+    "OFF",
+    "Tracer",
+    "TraceSink",
+    "NullSink",
+    "ConsoleSink",
+    "JsonlSink",
+    "MemorySink",
+    "get_default_tracer",
+    "set_default_tracer",
+]
 
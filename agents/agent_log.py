@@ -0,0 +1,211 @@
+"""
+AgentLog: bounded in-memory reasoning log with optional spill to compressed JSONL segments.
+"""
+import gzip
+import itertools
+import json
+import weakref
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Union
+
+TimeBound = Union[str, datetime, None]
+
+
+class SegmentStore:
+    """
+    Append-only store of gzip JSONL segments plus an index (index.jsonl) with per-segment
+    seq range, time range, steps and user IDs, so queries only open segments that can match.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 1000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.index_path = self.directory / "index.jsonl"
+        self.segments: List[Dict[str, Any]] = []
+        self.pending: List[Dict[str, Any]] = []
+        if self.index_path.exists():
+            with open(self.index_path, "r") as f:
+                self.segments = [json.loads(line) for line in f if line.strip()]
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self.pending.append(entry)
+        if len(self.pending) >= self.segment_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        entries, self.pending = self.pending, []
+        name = f"segment-{entries[0]['seq']:012d}.jsonl.gz"
+        with gzip.open(self.directory / name, "wt") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+        timestamps = [e.get("timestamp", "") for e in entries]
+        meta = {
+            "file": name,
+            "first_seq": entries[0]["seq"],
+            "last_seq": entries[-1]["seq"],
+            "min_ts": min(timestamps),
+            "max_ts": max(timestamps),
+            "steps": sorted({e.get("step") for e in entries if e.get("step")}),
+            "users": sorted({e.get("user_id") for e in entries if e.get("user_id")}),
+            "count": len(entries),
+        }
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(meta) + "\n")
+        self.segments.append(meta)
+
+    def count(self) -> int:
+        return sum(meta["count"] for meta in self.segments) + len(self.pending)
+
+    def scan(self, step=None, user_id=None, since: str = None, until: str = None) -> Iterator[Dict[str, Any]]:
+        for meta in self.segments:
+            if step is not None and step not in meta["steps"]:
+                continue
+            if user_id is not None and user_id not in meta["users"]:
+                continue
+            if since is not None and meta["max_ts"] < since:
+                continue
+            if until is not None and meta["min_ts"] > until:
+                continue
+            with gzip.open(self.directory / meta["file"], "rt") as f:
+                for line in f:
+                    yield json.loads(line)
+        yield from self.pending
+
+
+def _spill(ring: deque, store: SegmentStore) -> None:
+    """Move the in-memory window to `store` and write out its buffered entries."""
+    while ring:
+        store.append(ring.popleft())
+    store.flush()
+
+
+class AgentLog:
+    """
+    Ring buffer of the most recent `capacity` entries. Older entries are spilled to a
+    SegmentStore when `spill_dir` is set, otherwise dropped. Entries get a monotonically
+    increasing "seq" and, when a context user is set, a "user_id". A spilling log writes
+    everything still in memory to disk on close(), when it is garbage collected, and at
+    interpreter exit.
+    """
+
+    def __init__(self, capacity: int = 1000, spill_dir: Optional[str] = None, segment_size: int = 1000):
+        self.capacity = capacity
+        self._ring = deque()
+        self.store = SegmentStore(spill_dir, segment_size) if spill_dir else None
+        self.user_id: Optional[str] = None
+        # Continue numbering after segments spilled by an earlier process.
+        self.total = self.store.segments[-1]["last_seq"] + 1 if self.store and self.store.segments else 0
+        self.dropped = 0
+        self._finalizer = weakref.finalize(self, _spill, self._ring, self.store) if self.store else None
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        entry["seq"] = self.total
+        if self.user_id is not None and "user_id" not in entry:
+            entry["user_id"] = self.user_id
+        self.total += 1
+        self._ring.append(entry)
+        if len(self._ring) > self.capacity:
+            evicted = self._ring.popleft()
+            if self.store is not None:
+                self.store.append(evicted)
+            else:
+                self.dropped += 1
+
+    def set_context(self, user_id: Optional[str]) -> None:
+        self.user_id = user_id
+
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        if n <= 0:
+            return []
+        return self[-n:]
+
+    def query(
+        self,
+        step: Optional[str] = None,
+        user_id: Optional[str] = None,
+        since: TimeBound = None,
+        until: TimeBound = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Entries matching all given filters, oldest first; `limit` keeps the newest matches."""
+        since = since.isoformat() if isinstance(since, datetime) else since
+        until = until.isoformat() if isinstance(until, datetime) else until
+        sources = [self._ring]
+        if self.store is not None:
+            sources.insert(0, self.store.scan(step, user_id, since, until))
+        matches = deque(maxlen=limit) if limit else []
+        for source in sources:
+            for entry in source:
+                if step is not None and entry.get("step") != step:
+                    continue
+                if user_id is not None and entry.get("user_id") != user_id:
+                    continue
+                ts = entry.get("timestamp", "")
+                if since is not None and ts < since:
+                    continue
+                if until is not None and ts > until:
+                    continue
+                matches.append(entry)
+        return list(matches)
+
+    def flush(self) -> None:
+        if self.store is not None:
+            self.store.flush()
+
+    def close(self) -> None:
+        """Spill the in-memory window and buffered entries to disk; call once nothing writes to the log."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def clear(self) -> None:
+        """Forget in-memory entries; spilled segments stay on disk."""
+        self._ring.clear()
+
+    # List-style access to the in-memory window, for existing callers, without copying it.
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """
+        The window as of the first step, oldest first. Entries appended meanwhile do not stop the
+        iteration: it resumes after the last entry yielded and skips any evicted since.
+        """
+        ring = self._ring
+        if not ring:
+            return
+        seq, last = ring[0]["seq"], ring[-1]["seq"]
+        while ring and seq <= last:
+            try:
+                for entry in itertools.islice(ring, max(0, seq - ring[0]["seq"]), None):
+                    if entry["seq"] > last:
+                        return
+                    yield entry
+                    seq = entry["seq"] + 1
+                return
+            except RuntimeError:  # deque mutated during iteration
+                continue
+
+    def __getitem__(self, key):
+        """
+        Items index the deque, which is O(1) at either end and walks blocks towards the middle.
+        Slices walk from the nearer end, so a page costs its distance from that end plus its length.
+        """
+        ring = self._ring
+        if not isinstance(key, slice):
+            return ring[key]
+        start, stop, step = key.indices(len(ring))
+        positions = range(start, stop, step)
+        if not positions:
+            return []
+        if step < 0:
+            return self[positions[-1] : positions[0] + 1 : -step][::-1]
+        if start >= len(ring) - stop:
+            page = list(itertools.islice(reversed(ring), len(ring) - stop, len(ring) - start))
+            page.reverse()
+            return page[::step]
+        return list(itertools.islice(ring, start, stop, step))
@@ -1,40 +1,42 @@
 """
 DecisionAgent: Makes autonomous decisions about plan execution and interventions.
+
+The decisions themselves are the rule tables in decision_rules.json (see DecisionRules);
+this agent gathers the inputs, logs the outcome and traces the reasoning.
 """
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Optional
+
+from tools.metrics import AGENT_SECONDS, instrumented, timed
+from .agent_log import AgentLog
+from .decision_table import DecisionRules, get_default_rules
+from .tracing import INFO, Tracer, get_default_tracer
+
+AGENT = "DecisionAgent"
 
 
+@instrumented
 class DecisionAgent:
-    def __init__(self):
-        self.decision_log = []
+    def __init__(
+        self, tracer: Optional[Tracer] = None, log: Optional[AgentLog] = None, rules: Optional[DecisionRules] = None
+    ):
+        self.decision_log = log if log is not None else AgentLog()
+        self.tracer = tracer or get_default_tracer()
+        self.rules = rules or get_default_rules()
 
+    @timed(AGENT_SECONDS, agent=AGENT, method="should_adapt_plan")
     def should_adapt_plan(self, feedback: Dict[str, Any], plan: Dict[str, Any]) -> bool:
-        print("\n[DecisionAgent] Reasoning: Evaluating if plan adaptation is needed...")
-        consistency_rate = feedback.get("consistency_rate", 0)
-        difficulty = feedback.get("difficulty", "moderate")
-        total = feedback.get("total_workouts", 0)
-        adaptation_count = plan.get("adaptation_count", 0)
+        tracer = self.tracer
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "step", "Evaluating if plan adaptation is needed...")
+        _, outcome = self.rules.adapt.evaluate(feedback, plan)
+        decision = outcome["decision"]
+        reasoning = outcome["reasoning"]
 
-        if total == 0:
-            print("[DecisionAgent] Decision: No data yet - continue with current plan")
-            return False
-
-        if adaptation_count >= 5:
-            reasoning = "Maximum adaptations reached - maintain"
-            decision = False
-        elif consistency_rate < 0.5 and total >= 3:
-            reasoning = "Low consistency below 50%"
-            decision = True
-        elif consistency_rate > 0.8 and difficulty == "easy" and total >= 5:
-            reasoning = "High consistency + easy difficulty"
-            decision = True
-        elif difficulty == "hard" and total >= 3:
-            reasoning = "User reports difficulty hard"
-            decision = True
-        else:
-            reasoning = "Plan appropriate - maintain"
-            decision = False
+        if outcome.get("quiet"):
+            if tracer.info:
+                tracer.emit(INFO, AGENT, "decision", reasoning, decision=decision)
+            return decision
 
         self.decision_log.append(
             {
@@ -45,45 +47,19 @@ class DecisionAgent:
                 "timestamp": datetime.now().isoformat(),
             }
         )
-        print(f"[DecisionAgent] Decision: {'ADAPT PLAN' if decision else 'MAINTAIN PLAN'}")
-        print(f"[DecisionAgent] Reasoning: {reasoning}")
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "decision", "ADAPT PLAN" if decision else "MAINTAIN PLAN", decision=decision)
+            tracer.emit(INFO, AGENT, "reasoning", reasoning)
         return decision
 
+    @timed(AGENT_SECONDS, agent=AGENT, method="decide_intervention")
     def decide_intervention(self, feedback: Dict[str, Any]) -> Dict[str, Any]:
-        print("\n[DecisionAgent] Reasoning: Deciding on user intervention...")
-        skipped = feedback.get("skipped_workouts", 0)
-        completed = feedback.get("completed_workouts", 0)
-        streak = feedback.get("current_streak", 0)
-
-        intervention = {
-            "type": "encouragement",
-            "message": "Keep up the great work!",
-            "action": None,
-        }
-
-        if skipped > completed:
-            intervention = {
-                "type": "motivation",
-                "message": "Consistency matters. Try a smaller task today.",
-                "action": "reduce_intensity",
-            }
-            reasoning = "Struggling with consistency"
-        elif streak >= 7:
-            intervention = {
-                "type": "celebration",
-                "message": f"Amazing streak of {streak} days! You're building strong habits!",
-                "action": "maintain",
-            }
-            reasoning = "Celebrate streak"
-        elif completed > 0:
-            intervention = {
-                "type": "positive_reinforcement",
-                "message": f"Great job completing {completed} task(s)!",
-                "action": "maintain",
-            }
-            reasoning = "Reinforce success"
-        else:
-            reasoning = "Standard encouragement"
+        tracer = self.tracer
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "step", "Deciding on user intervention...")
+        _, outcome = self.rules.intervention.evaluate(feedback)
+        reasoning = outcome.pop("reasoning")
+        intervention = outcome
 
         self.decision_log.append(
             {
@@ -93,27 +69,26 @@ class DecisionAgent:
                 "timestamp": datetime.now().isoformat(),
             }
         )
-        print(f"[DecisionAgent] Decision: {intervention['type'].upper()} intervention")
-        print(f"[DecisionAgent] Reasoning: {reasoning}")
-        print(f"[DecisionAgent] Message: {intervention['message']}")
+        if tracer.info:
+            tracer.emit(
+                INFO, AGENT, "decision", f"{intervention['type'].upper()} intervention", intervention=intervention["type"]
+            )
+            tracer.emit(INFO, AGENT, "reasoning", reasoning)
+            tracer.emit(INFO, AGENT, "message", intervention["message"])
         return intervention
 
+    @timed(AGENT_SECONDS, agent=AGENT, method="should_escalate_goal")
     def should_escalate_goal(self, plan: Dict[str, Any], feedback: Dict[str, Any]) -> bool:
-        print("\n[DecisionAgent] Reasoning: Evaluating goal escalation...")
-        week_number = plan.get("week_number", 1)
-        consistency_rate = feedback.get("consistency_rate", 0)
-        goal_weeks = plan.get("goal", {}).get("target_weeks", 8)
-
-        if week_number >= goal_weeks and consistency_rate > 0.75:
-            reasoning = f"Goal period complete with high consistency ({consistency_rate:.2%})"
-            print("[DecisionAgent] Decision: Goal achieved - ready for new goal")
-            print(f"[DecisionAgent] Reasoning: {reasoning}")
-            return True
+        tracer = self.tracer
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "step", "Evaluating goal escalation...")
+        _, outcome = self.rules.escalate.evaluate(feedback, plan)
+        escalate = outcome["decision"]
 
-        reasoning = f"Goal in progress ({week_number}/{goal_weeks}) - continue"
-        print("[DecisionAgent] Decision: Continue current goal")
-        print(f"[DecisionAgent] Reasoning: {reasoning}")
-        return False
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "decision", outcome["label"], escalate=escalate)
+            tracer.emit(INFO, AGENT, "reasoning", outcome["reasoning"])
+        return escalate
 
-    def get_decision_log(self) -> List[Dict[str, Any]]:
+    def get_decision_log(self) -> AgentLog:
         return self.decision_log
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+DecisionRules: DecisionAgent's decision tables, loaded from decision_rules.json.
+
+Each table lists the fields it reads (where from, and the default when missing) and an
+ordered list of rules; the first rule whose conditions all hold decides, exactly like the
+if/elif chains it replaces. Thresholds are named params, so they can be tuned in the JSON
+(or overridden per DecisionRules) without touching code. Outcome strings name fields and
+params as {placeholders}; those naming only params are formatted once, at compile time.
+
+A table is compiled once: into per-rule condition tuples, and from those into plain Python
+functions that read the fields and find the first matching rule. Outcomes formatted from
+field values are memoized on the tuple of values, which repeats heavily across a
+population. evaluate_batch runs the same rules over NumPy columns and returns the
+matching rule index per row.
+"""
+import json
+import operator
+from pathlib import Path
+from string import Formatter
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_RULES_PATH = Path(__file__).with_name("decision_rules.json")
+
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+NO_MATCH = -1
+
+# Where a field is read from: the feedback dict, the plan, or the plan's goal.
+SOURCES = ("feedback", "plan", "goal")
+
+# (field position, operator, operand, operand is a field position)
+Condition = Tuple[int, Callable[[Any, Any], Any], Any, bool]
+
+
+def _literal(value: Any) -> str:
+    if value is not None and not isinstance(value, (bool, int, float, str)):
+        raise ValueError(f"expected a JSON scalar, got {value!r}")
+    return repr(value)
+
+
+def _placeholders(text: str) -> set:
+    """Names a format string refers to, e.g. {"low_consistency"} for "below {low_consistency:.0%}"."""
+    return {name.split(".")[0].split("[")[0] for _, name, _, _ in Formatter().parse(text) if name}
+
+
+class DecisionTable:
+    def __init__(self, name: str, spec: Dict[str, Any], params: Dict[str, Any], memo_size: int = 65536):
+        self.name = name
+        self.fields = tuple(spec["fields"])
+        self.sources = {
+            field: (f["from"], f.get("key", field), f.get("default")) for field, f in spec["fields"].items()
+        }
+        self.params = params
+        self.outcomes = [self._bind(rule["then"], params) for rule in spec["rules"]]
+        self.rules = [self._compile(rule["when"], params) for rule in spec["rules"]]
+        self.values, self.match = self._generate()
+        # Outcome strings with {field} placeholders, formatted per evaluation.
+        self._templates = [
+            tuple(k for k, v in outcome.items() if isinstance(v, str) and "{" in v) for outcome in self.outcomes
+        ]
+        self.memo_size = memo_size
+        self._memo: Dict[Tuple, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _bind(self, outcome: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        """Check the outcome's placeholders and format the strings that only name params."""
+        bound = dict(outcome)
+        for key, value in outcome.items():
+            if not isinstance(value, str):
+                continue
+            names = _placeholders(value)
+            unknown = names - set(self.fields) - set(params)
+            if unknown:
+                raise ValueError(f"{self.name}: unknown placeholder(s) {sorted(unknown)} in {key!r}")
+            if names and not names & set(self.fields):
+                bound[key] = value.format_map(params)
+        return bound
+
+    def _compile(self, when: List[List[Any]], params: Dict[str, Any]) -> Tuple[Condition, ...]:
+        conditions = []
+        for field, op, operand in when:
+            if field not in self.fields:
+                raise ValueError(f"{self.name}: unknown field {field!r}")
+            if op not in OPERATORS:
+                raise ValueError(f"{self.name}: unknown operator {op!r}")
+            is_field = isinstance(operand, dict) and "field" in operand
+            if is_field:
+                operand = self.fields.index(operand["field"])
+            elif isinstance(operand, dict):
+                operand = params[operand["param"]]
+            conditions.append((self.fields.index(field), OPERATORS[op], operand, is_field))
+        return tuple(conditions)
+
+    def _generate(self) -> Tuple[Callable, Callable]:
+        """
+        Python source for values(feedback, plan) and match(values), executed once. Keys,
+        defaults and operands are JSON scalars, emitted with repr().
+        """
+        getters = []
+        for field in self.fields:
+            source, key, default = self.sources[field]
+            if source not in SOURCES:
+                raise ValueError(f"{self.name}: unknown source {source!r} for {field!r}")
+            getters.append(f"{source}.get({_literal(key)}, {_literal(default)})")
+        lines = ["def values(feedback, plan=None):", "    plan = plan or {}"]
+        if any(source == "goal" for source, _, _ in self.sources.values()):
+            lines.append('    goal = plan.get("goal", {})')
+        lines.append(f"    return ({', '.join(getters)},)")
+
+        lines.append("def match(v):")
+        symbols = {op: symbol for symbol, op in OPERATORS.items()}
+        for i, conditions in enumerate(self.rules):
+            tests = [
+                f"v[{field}] {symbols[op]} " + (f"v[{operand}]" if is_field else _literal(operand))
+                for field, op, operand, is_field in conditions
+            ]
+            if not tests:
+                lines.append(f"    return {i}")
+                break
+            lines.append(f"    if {' and '.join(tests)}:")
+            lines.append(f"        return {i}")
+        else:
+            lines.append(f"    return {NO_MATCH}")
+
+        namespace: Dict[str, Any] = {}
+        exec(compile("\n".join(lines), f"<decision table {self.name}>", "exec"), namespace)
+        values, match = namespace["values"], namespace["match"]
+        values.__doc__ = "Field values for one user, in self.fields order."
+        match.__doc__ = "Index of the first rule whose conditions hold for `values`, or NO_MATCH."
+        return values, match
+
+    def outcome(self, rule: int, values: Sequence[Any]) -> Dict[str, Any]:
+        outcome = dict(self.outcomes[rule])
+        if self._templates[rule]:
+            fields = {**self.params, **dict(zip(self.fields, values))}
+            for key in self._templates[rule]:
+                outcome[key] = outcome[key].format_map(fields)
+        return outcome
+
+    def evaluate(self, feedback: Dict[str, Any], plan: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+        """(rule index, outcome) for one user; the outcome is a fresh dict the caller owns."""
+        values = self.values(feedback, plan)
+        rule = self.match(values)
+        if not self._templates[rule]:
+            return rule, dict(self.outcomes[rule])
+        # Formatting is what costs here; the same field values always format the same way.
+        try:
+            outcome = self._memo.get(values)
+        except TypeError:  # unhashable field value: format without caching
+            return rule, self.outcome(rule, values)
+        if outcome is None:
+            self.misses += 1
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            outcome = self._memo[values] = self.outcome(rule, values)
+        else:
+            self.hits += 1
+        return rule, dict(outcome)
+
+    def evaluate_batch(
+        self, columns: Dict[str, np.ndarray], categories: Optional[Dict[str, Sequence[Any]]] = None
+    ) -> np.ndarray:
+        """
+        Matching rule index per row (NO_MATCH where none applies). Every field is a column of
+        equal length; a field in `categories` holds integer codes into its list of values.
+        """
+        cols = [np.asarray(columns[field]) for field in self.fields]
+        categories = categories or {}
+        n = len(cols[0]) if cols else 0
+        choices = []
+        for conditions in self.rules:
+            hit = np.ones(n, dtype=bool)
+            for field, op, operand, is_field in conditions:
+                if is_field:
+                    operand = cols[operand]
+                elif self.fields[field] in categories:
+                    values = list(categories[self.fields[field]])
+                    operand = values.index(operand) if operand in values else NO_MATCH
+                hit &= op(cols[field], operand)
+            choices.append(hit)
+        return np.select(choices, np.arange(len(self.rules)), default=NO_MATCH)
+
+    def outcome_column(self, key: str, values: Optional[Sequence[Any]] = None) -> np.ndarray:
+        """
+        Per-rule outcome[key] for indexing with evaluate_batch's result (NO_MATCH maps to
+        the last entry, the fallback). With `values`, outcomes are coded as their index in it.
+        """
+        column = [outcome.get(key) for outcome in self.outcomes]
+        if values is not None:
+            column = [list(values).index(v) for v in column]
+        return np.array(column)
+
+    def stats(self) -> Dict[str, int]:
+        return {"memoized": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+
+class DecisionRules:
+    """The adapt, intervention and escalate tables, compiled with the same params."""
+
+    def __init__(self, spec: Dict[str, Any], params: Optional[Dict[str, Any]] = None):
+        self.spec = spec
+        self.params = {**spec["params"], **{k: v for k, v in (params or {}).items() if k in spec["params"]}}
+        self.tables = {name: DecisionTable(name, table, self.params) for name, table in spec["tables"].items()}
+        self.adapt = self.tables["adapt"]
+        self.intervention = self.tables["intervention"]
+        self.escalate = self.tables["escalate"]
+
+    @classmethod
+    def load(cls, path=None, params: Optional[Dict[str, Any]] = None) -> "DecisionRules":
+        with open(path or DEFAULT_RULES_PATH, "r") as f:
+            return cls(json.load(f), params)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: table.stats() for name, table in self.tables.items()}
+
+
+_default_rules: Optional[DecisionRules] = None
+
+
+def get_default_rules() -> DecisionRules:
+    """Process-wide rules from decision_rules.json, loaded on first use."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = DecisionRules.load()
+    return _default_rules
@@ -2,36 +2,48 @@
 FeedbackAgent: Observes user behavior and collects feedback for the agent loop.
 """
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
+from tools import feedback_state
+from tools.metrics import AGENT_SECONDS, instrumented, timed
+from tools.time_index import DEFAULT_WINDOWS, time_index
+from .agent_log import AgentLog
+from .tracing import INFO, Tracer, get_default_tracer
 
+AGENT = "FeedbackAgent"
+
+
+@instrumented
 class FeedbackAgent:
-    def __init__(self):
-        self.observation_log = []
+    def __init__(self, tracer: Optional[Tracer] = None, log: Optional[AgentLog] = None):
+        self.observation_log = log if log is not None else AgentLog()
+        self.tracer = tracer or get_default_tracer()
 
+    @timed(AGENT_SECONDS, agent=AGENT, method="observe_task_completion")
     def observe_task_completion(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
-        print("\n[FeedbackAgent] Reasoning: Observing task completion (domain-agnostic)...")
-        plan = user_data.get("current_plan", {}).get("weekly_schedule", [])
-        completed = [w for w in plan if w.get("status") == "completed"]
-        skipped = [w for w in plan if w.get("status") == "skipped"]
-        pending = [w for w in plan if w.get("status") == "pending"]
-
-        total_expected = len(plan)
-        total_completed = len(completed)
+        tracer = self.tracer
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "step", "Observing task completion (domain-agnostic)...")
+        # Plan counts cover a handful of tasks and the streak comes from the incremental state,
+        # so cost is independent of history length.
+        counts = feedback_state.plan_counts(user_data)
+        total_expected = counts["tasks"]
+        total_completed = counts["completed"]
+        skipped, pending = counts["skipped"], counts["pending"]
         consistency_rate = (total_completed / total_expected) if total_expected else 0
 
         observation = {
             "completed_workouts": total_completed,  # keep key name for compatibility
-            "skipped_workouts": len(skipped),
-            "pending_workouts": len(pending),
+            "skipped_workouts": skipped,
+            "pending_workouts": pending,
             "consistency_rate": consistency_rate,
-            "current_streak": self._calculate_streak(user_data.get("workouts", [])),
+            "current_streak": feedback_state.current_streak(user_data),
             "total_workouts": total_expected,
             "observation_timestamp": datetime.now().isoformat(),
             "domain": user_data.get("profile", {}).get("domain", "fitness"),
         }
 
-        reasoning = f"Observed {total_completed} completed, {len(skipped)} skipped, {len(pending)} pending"
+        reasoning = f"Observed {total_completed} completed, {skipped} skipped, {pending} pending"
         self.observation_log.append(
             {
                 "step": "task_observation",
@@ -40,20 +52,25 @@ class FeedbackAgent:
                 "timestamp": datetime.now().isoformat(),
             }
         )
-        print(f"[FeedbackAgent] Observation: {reasoning}")
-        print(f"[FeedbackAgent] Observation: Consistency rate = {consistency_rate:.2%}")
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "observation", reasoning)
+            tracer.emit(
+                INFO, AGENT, "observation", f"Consistency rate = {consistency_rate:.2%}", consistency_rate=consistency_rate
+            )
         return observation
 
+    @timed(AGENT_SECONDS, agent=AGENT, method="collect_difficulty_feedback")
     def collect_difficulty_feedback(self, user_data: Dict[str, Any]) -> str:
-        print("\n[FeedbackAgent] Reasoning: Collecting difficulty feedback (simulated)...")
+        tracer = self.tracer
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "step", "Collecting difficulty feedback (simulated)...")
         # Simulation based on completion; in real app, collect user input
-        workouts = user_data.get("workouts", [])
-        recent = workouts[-5:] if len(workouts) >= 5 else workouts
+        recent = feedback_state.recent_statuses(user_data)
         if not recent:
             difficulty = "moderate"
             reasoning = "No recent tasks - default moderate"
         else:
-            completed_recent = [w for w in recent if w.get("status") == "completed"]
+            completed_recent = [status for status in recent if status == "completed"]
             rate = len(completed_recent) / len(recent) if recent else 0
             if rate < 0.4:
                 difficulty = "hard"
@@ -73,12 +90,16 @@ class FeedbackAgent:
                 "timestamp": datetime.now().isoformat(),
             }
         )
-        print(f"[FeedbackAgent] Observation: Difficulty level = {difficulty}")
-        print(f"[FeedbackAgent] Reasoning: {reasoning}")
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "observation", f"Difficulty level = {difficulty}", difficulty=difficulty)
+            tracer.emit(INFO, AGENT, "reasoning", reasoning)
         return difficulty
 
+    @timed(AGENT_SECONDS, agent=AGENT, method="aggregate_feedback")
     def aggregate_feedback(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
-        print("\n[FeedbackAgent] Reasoning: Aggregating all feedback data...")
+        tracer = self.tracer
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "step", "Aggregating all feedback data...")
         observation = self.observe_task_completion(user_data)
         difficulty = self.collect_difficulty_feedback(user_data)
         feedback = {
@@ -95,10 +116,31 @@ class FeedbackAgent:
                 "timestamp": datetime.now().isoformat(),
             }
         )
-        print("[FeedbackAgent] Observation: Feedback aggregated")
-        print(f"[FeedbackAgent] Reasoning: {reasoning}")
+        if tracer.info:
+            tracer.emit(INFO, AGENT, "observation", "Feedback aggregated")
+            tracer.emit(INFO, AGENT, "reasoning", reasoning)
         return feedback
 
+    @timed(AGENT_SECONDS, agent=AGENT, method="windowed_consistency")
+    def windowed_consistency(self, user_data: Dict[str, Any], windows=DEFAULT_WINDOWS) -> Dict[str, Any]:
+        """Completion rate of logged workouts over the last N days, per window (e.g. "7d")."""
+        stats = time_index(user_data.get("workouts", [])).windows(windows)
+        reasoning = ", ".join(f"{key}: {s['completion_rate']:.0%} of {s['total']}" for key, s in stats.items())
+        self.observation_log.append(
+            {
+                "step": "windowed_consistency",
+                "windows": stats,
+                "reasoning": reasoning,
+                "timestamp": datetime.now().isoformat(),
+            }
+        )
+        if self.tracer.info:
+            self.tracer.emit(INFO, AGENT, "observation", f"Windowed consistency - {reasoning}")
+        return stats
+
+    def weekly_rollup(self, user_data: Dict[str, Any], weeks: int = 4) -> List[Dict[str, Any]]:
+        return time_index(user_data.get("workouts", [])).weekly(weeks)
+
     def _calculate_streak(self, workouts: List[Dict[str, Any]]) -> int:
         if not workouts:
             return 0
@@ -124,5 +166,5 @@ class FeedbackAgent:
                 break
         return streak
 
-    def get_observation_log(self) -> List[Dict[str, Any]]:
+    def get_observation_log(self) -> AgentLog:
         return self.observation_log
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""
+PlanTemplates: goal and plan shapes loaded from plan_templates.json, compiled once per profile key.
+
+Only the profile fields a domain's plan depends on (its "params", plus the goal type where a
+plan varies by goal) form the key, so the space of distinct plans is small. Each compiled shape
+is a tuple of read-only task mappings; instantiating one copies the tasks into fresh dicts,
+since callers update task status and adapt schedules in place, and fills in created_at.
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, Any, Hashable, List, Optional, Tuple
+
+DEFAULT_TEMPLATES_PATH = Path(__file__).with_name("plan_templates.json")
+
+# Read-only mappings plus (index, key, thaw) for the nested values that need a fresh copy.
+Shape = Tuple[Tuple[MappingProxyType, ...], Tuple[Tuple[int, str, Callable], ...]]
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _thaw_fn(value: Any) -> Callable:
+    if isinstance(value, tuple) and not any(isinstance(v, (MappingProxyType, tuple)) for v in value):
+        return list
+    return _thaw
+
+
+def _freeze_all(values: List[Dict[str, Any]]) -> Shape:
+    frozen = tuple(_freeze(value) for value in values)
+    nested = tuple(
+        (i, k, _thaw_fn(v))
+        for i, value in enumerate(frozen)
+        for k, v in value.items()
+        if isinstance(v, (MappingProxyType, tuple))
+    )
+    return frozen, nested
+
+
+def _copy_all(shape: Shape) -> List[Dict[str, Any]]:
+    """Fresh dicts from a frozen shape: flat C-level copies, thawing only the nested values."""
+    frozen, nested = shape
+    values = list(map(MappingProxyType.copy, frozen))
+    for i, key, thaw in nested:
+        values[i][key] = thaw(values[i][key])
+    return values
+
+
+def _fill(value: Any, params: Dict[str, Any]) -> Any:
+    """Substitute {name} placeholders; a value that is exactly one placeholder keeps the param's type."""
+    if not isinstance(value, str) or "{" not in value:
+        return value
+    if value.startswith("{") and value.endswith("}") and value[1:-1] in params:
+        return params[value[1:-1]]
+    return value.format_map(params)
+
+
+class PlanTemplates:
+    """With memoize=False every plan is compiled from the spec, as the old per-domain builders did."""
+
+    def __init__(self, spec: Dict[str, Any], memoize: bool = True):
+        self.spec = spec
+        self.memoize = memoize
+        self.default_domain = spec.get("default_domain", "fitness")
+        self.goals = {domain: _freeze_all([goal]) for domain, goal in spec["goals"].items()}
+        self.plans = spec["plans"]
+        # Per domain: param names, their defaults, and whether the plan varies by goal type.
+        self._keys = {
+            domain: (tuple(plan.get("params", {})), tuple(plan.get("params", {}).values()), "sequence_by_goal" in plan)
+            for domain, plan in self.plans.items()
+        }
+        self._shapes: Dict[Hashable, Shape] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path=None, memoize: bool = True) -> "PlanTemplates":
+        with open(path or DEFAULT_TEMPLATES_PATH, "r") as f:
+            return cls(json.load(f), memoize)
+
+    def _domain(self, profile: Dict[str, Any], table: Dict[str, Any]) -> str:
+        domain = profile.get("domain", self.default_domain)
+        return domain if domain in table else self.default_domain
+
+    def goal(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        return _copy_all(self.goals[self._domain(profile, self.goals)])[0]
+
+    def shape_key(self, goal: Dict[str, Any], profile: Dict[str, Any]) -> Tuple:
+        domain = self._domain(profile, self.plans)
+        names, defaults, by_goal = self._keys[domain]
+        goal_type = goal.get("type", self.plans[domain]["default_goal"]) if by_goal else None
+        return (domain, goal_type, tuple(map(profile.get, names, defaults)))
+
+    def shape(self, goal: Dict[str, Any], profile: Dict[str, Any]) -> Shape:
+        key = self.shape_key(goal, profile)
+        if not self.memoize:
+            return self._compile(key)
+        try:
+            shape = self._shapes.get(key)
+        except TypeError:  # unhashable profile value: compile without caching
+            return self._compile(key)
+        if shape is None:
+            self.misses += 1
+            shape = self._shapes[key] = self._compile(key)
+        else:
+            self.hits += 1
+        return shape
+
+    def _compile(self, key: Tuple) -> Shape:
+        domain, goal_type, values = key
+        spec = self.plans[domain]
+        params = dict(zip(spec.get("params", {}), values))
+        days = spec["days"]
+        if "sequence_by_goal" in spec:
+            sequences = spec["sequence_by_goal"]
+            items = sequences.get(goal_type, sequences[spec["default_goal"]])
+        else:
+            items = spec.get("sequence", [None] * len(days))
+        if spec.get("cycle"):
+            items = [items[i % len(items)] for i in range(len(days))]
+        if "limit" in spec:
+            items = items[: params[spec["limit"]]]
+
+        variant = {}
+        if "variants" in spec:
+            variants = spec["variants"]
+            variant = variants["values"].get(params.get(variants["param"]), variants["default"])
+
+        tasks = []
+        for day, item in zip(days, items):
+            fields = {**params, "item": item}
+            task = {"day": day}
+            task.update({name: _fill(value, fields) for name, value in spec["task"].items()})
+            task.update(variant)
+            task["status"] = "pending"
+            tasks.append(task)
+        return _freeze_all(tasks)
+
+    def instantiate(self, shape: Shape, goal: Dict[str, Any], created_at: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "goal": goal,
+            "weekly_schedule": _copy_all(shape),
+            "created_at": created_at or datetime.now().isoformat(),
+            "week_number": 1,
+            "adaptation_count": 0,
+        }
+
+    def create_plan(
+        self, goal: Dict[str, Any], profile: Dict[str, Any], created_at: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return self.instantiate(self.shape(goal, profile), goal, created_at)
+
+    def stats(self) -> Dict[str, int]:
+        return {"shapes": len(self._shapes), "hits": self.hits, "misses": self.misses}
+
+
+_default_templates: Optional[PlanTemplates] = None
+
+
+def get_default_templates() -> PlanTemplates:
+    """Process-wide templates from plan_templates.json, loaded on first use."""
+    global _default_templates
+    if _default_templates is None:
+        _default_templates = PlanTemplates.load()
+    return _default_templates
@@ -0,0 +1,106 @@
+"""
+Tracing: structured agent events routed to a pluggable sink instead of print().
+
+Agents guard every emit with `if self.tracer.info:` so a disabled level costs one
+attribute lookup and no string formatting.
+"""
+import json
+import sys
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, TextIO
+
+DEBUG = 10
+INFO = 20
+OFF = 100
+
+# Console prefixes match the original print() output of the agents.
+_CONSOLE_LABELS = {
+    "step": "\n[{agent}] Reasoning: ",
+    "reasoning": "[{agent}] Reasoning: ",
+    "decision": "[{agent}] Decision: ",
+    "observation": "[{agent}] Observation: ",
+    "message": "[{agent}] Message: ",
+}
+
+
+class TraceSink:
+    def write(self, event: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(TraceSink):
+    def write(self, event: Dict[str, Any]) -> None:
+        pass
+
+
+class ConsoleSink(TraceSink):
+    """Human-readable lines, identical to the agents' original console narration."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+
+    def write(self, event: Dict[str, Any]) -> None:
+        label = _CONSOLE_LABELS.get(event["kind"], "[{agent}] ").format(agent=event["agent"])
+        print(label + event["message"], file=self.stream or sys.stdout)
+
+
+class JsonlSink(TraceSink):
+    def __init__(self, path: str):
+        self.file = open(path, "a", buffering=1 << 16)
+
+    def write(self, event: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(event, default=str) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class MemorySink(TraceSink):
+    def __init__(self, maxlen: Optional[int] = None):
+        self.events = deque(maxlen=maxlen)
+
+    def write(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+
+    def messages(self) -> List[str]:
+        return [e["message"] for e in self.events]
+
+
+class Tracer:
+    def __init__(self, sink: Optional[TraceSink] = None, level: int = INFO):
+        self.sink = sink if sink is not None else NullSink()
+        self.set_level(level)
+
+    def set_level(self, level: int) -> None:
+        self.level = level
+        active = not isinstance(self.sink, NullSink)
+        self.debug = active and level <= DEBUG
+        self.info = active and level <= INFO
+
+    def emit(self, level: int, agent: str, kind: str, message: str, **fields) -> None:
+        if level < self.level:
+            return
+        event = {"ts": time.time(), "level": level, "agent": agent, "kind": kind, "message": message}
+        if fields:
+            event.update(fields)
+        self.sink.write(event)
+
+    def close(self) -> None:
+        self.sink.close()
+
+
+_default_tracer = Tracer(ConsoleSink())
+
+
+def get_default_tracer() -> Tracer:
+    return _default_tracer
+
+
+def set_default_tracer(tracer: Tracer) -> None:
+    """Tracer used by agents constructed without an explicit one."""
+    global _default_tracer
+    _default_tracer = tracer
@@ -2,17 +2,70 @@
 Agentic Wellness System - Streamlit Interface
 Domains: fitness, nutrition, mental_health, preventive
 """
+import json
+import uuid
+from datetime import date
+
 import streamlit as st
-from agents import PlannerAgent, DecisionAgent, FeedbackAgent
-from tools import DataManager, FitnessTools
+from agents import PlannerAgent, DecisionAgent, FeedbackAgent, AgentLog, get_default_rules, get_default_templates
+from tools import DataManager, FitnessTools, get_default_metrics, plan_versions
+
+LOG_PAGE_SIZE = 5
+LOG_DIR = "data/agent_logs"
 
 st.set_page_config(page_title="Agentic Wellness Coach", page_icon="🤖", layout="wide")
 
+
+# Read-only resources shared by every session and rerun; built once per server process.
+# Each session keeps its own DataManager, so no two sessions edit the same record dict.
+@st.cache_resource
+def get_templates():
+    return get_default_templates()
+
+
+@st.cache_resource
+def get_rules():
+    return get_default_rules()
+
+
+def view_key(user_data):
+    """Changes whenever the plan or its task statuses do: a new plan version, a logged workout, a status update."""
+    plan = user_data.get("current_plan") or {}
+    statuses = tuple(task.get("status") for task in plan.get("weekly_schedule", []))
+    return plan_versions.count(user_data), len(user_data.get("workouts", [])), statuses
+
+
+def memoized(name, key, compute):
+    """Per-session view cache: `compute()` only runs when `key` differs from the last call's."""
+    views = st.session_state.setdefault("views", {})
+    if name not in views or views[name][0] != key:
+        views[name] = (key, compute())
+    return views[name][1]
+
+
+def plan_text(user_data):
+    plan = user_data.get("current_plan")
+    return memoized("plan", view_key(user_data), lambda: st.session_state.fitness_tools.format_plan_display(plan))
+
+
+def progress_view(user_data):
+    # Windowed rates are relative to today, so the day is part of the key.
+    key = (view_key(user_data), date.today())
+    return memoized("progress", key, lambda: st.session_state.fitness_tools.calculate_progress(user_data))
+
+
 # Initialize session state
 if "planner" not in st.session_state:
-    st.session_state.planner = PlannerAgent()
-    st.session_state.decision_agent = DecisionAgent()
-    st.session_state.feedback_agent = FeedbackAgent()
+    # Long-lived sessions keep only a short window of reasoning in memory and spill the rest,
+    # one directory per session so concurrent sessions never share a segment store.
+    session_logs = f"{LOG_DIR}/{uuid.uuid4().hex}"
+    st.session_state.planner = PlannerAgent(
+        log=AgentLog(capacity=50, spill_dir=f"{session_logs}/planner"), templates=get_templates()
+    )
+    st.session_state.decision_agent = DecisionAgent(
+        log=AgentLog(capacity=50, spill_dir=f"{session_logs}/decision"), rules=get_rules()
+    )
+    st.session_state.feedback_agent = FeedbackAgent(log=AgentLog(capacity=50, spill_dir=f"{session_logs}/feedback"))
     st.session_state.data_manager = DataManager()
     st.session_state.fitness_tools = FitnessTools()
     st.session_state.user_data = st.session_state.data_manager.load_user_data("default")
@@ -71,7 +124,7 @@ with col1:
                 st.session_state.user_data = st.session_state.data_manager.update_plan(
                     st.session_state.user_data, current_plan
                 )
-            st.code(st.session_state.fitness_tools.format_plan_display(current_plan))
+            st.code(plan_text(st.session_state.user_data))
 
         # ACT
         with st.expander("⚡ PHASE 2: ACT"):
@@ -91,9 +144,9 @@ with col1:
                     st.session_state.user_data = st.session_state.data_manager.add_workout(
                         st.session_state.user_data, entry
                     )
-                    for w in schedule:
-                        if w.get("day") == task.get("day"):
-                            w["status"] = status
+                    st.session_state.user_data = st.session_state.data_manager.set_task_status(
+                        st.session_state.user_data, task.get("day"), status
+                    )
                     st.session_state.user_data = st.session_state.data_manager.update_plan(
                         st.session_state.user_data, current_plan
                     )
@@ -115,7 +168,7 @@ with col1:
                 st.session_state.user_data = st.session_state.data_manager.update_plan(
                     st.session_state.user_data, adapted_plan
                 )
-                st.code(st.session_state.fitness_tools.format_plan_display(adapted_plan))
+                st.code(plan_text(st.session_state.user_data))
                 st.success("Plan adapted!")
             else:
                 st.info("Plan maintained - no adaptation needed")
@@ -124,35 +177,96 @@ with col1:
             st.info(f"💬 {intervention['message']}")
 
         st.session_state.data_manager.save_user_data(st.session_state.user_data, "default")
-        st.rerun()
 
-with col2:
+
+# Fragments: their widgets rerun only the fragment, not the agent loop above.
+@st.fragment
+def status_panel():
     st.subheader("📊 Current Status")
-    if st.session_state.user_data.get("current_plan"):
-        progress = st.session_state.fitness_tools.calculate_progress(st.session_state.user_data)
+    user_data = st.session_state.user_data
+    if user_data.get("current_plan"):
+        progress = progress_view(user_data)
         st.metric("Progress", f"{progress['progress_percent']:.1f}%")
         st.metric("Completed", f"{progress['completed']}/{progress['total']}")
+        for col, (key, window) in zip(st.columns(len(progress["windows"])), progress["windows"].items()):
+            col.metric(f"Last {key}", f"{window['completion_rate']:.0%}", help=f"{window['completed']}/{window['total']} logged")
         st.subheader("Current Plan")
-        st.code(st.session_state.fitness_tools.format_plan_display(st.session_state.user_data.get("current_plan")))
+        st.code(plan_text(user_data))
     else:
         st.info("No active plan. Initialize profile and run agent loop.")
 
+
+@st.fragment
+def log_viewer(name: str, log: AgentLog):
+    """One page of `log`, newest page first; paging reruns only this fragment."""
+    pages = max(1, -(-len(log) // LOG_PAGE_SIZE))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, key=f"log_page_{name}")
+    end = len(log) - (min(page, pages) - 1) * LOG_PAGE_SIZE
+    start = max(0, end - LOG_PAGE_SIZE)
+    st.caption(f"Entries {start + 1}-{end} of {len(log)} in memory" if end else "No entries yet")
+    if end:
+        st.json(log[start:end])
+
+
+with col2:
+    status_panel()
+
 # Reasoning logs
 st.markdown("---")
 st.header("🧠 Agent Reasoning Logs")
 tab1, tab2, tab3 = st.tabs(["Planner", "Decision", "Feedback"])
 
 with tab1:
-    st.subheader("PlannerAgent Reasoning (last 5)")
-    for log in st.session_state.planner.get_reasoning_log()[-5:]:
-        st.json(log)
+    st.subheader("PlannerAgent Reasoning")
+    log_viewer("planner", st.session_state.planner.get_reasoning_log())
 
 with tab2:
-    st.subheader("DecisionAgent Reasoning (last 5)")
-    for log in st.session_state.decision_agent.get_decision_log()[-5:]:
-        st.json(log)
+    st.subheader("DecisionAgent Reasoning")
+    log_viewer("decision", st.session_state.decision_agent.get_decision_log())
 
 with tab3:
-    st.subheader("FeedbackAgent Reasoning (last 5)")
-    for log in st.session_state.feedback_agent.get_observation_log()[-5:]:
-        st.json(log)
\ No newline at end of file
+    st.subheader("FeedbackAgent Reasoning")
+    log_viewer("feedback", st.session_state.feedback_agent.get_observation_log())
+
+
+def _series(entry):
+    labels = ",".join(f"{k}={v}" for k, v in entry["labels"].items())
+    return f"{entry['name']}{{{labels}}}" if labels else entry["name"]
+
+
+@st.fragment
+def diagnostics_panel():
+    """Process-wide metrics: latency histograms per phase, agent method and DataManager call, I/O counters."""
+    metrics = get_default_metrics()
+    metrics.enabled = st.toggle("Record metrics (all sessions)", value=metrics.enabled)
+    snapshot = metrics.snapshot()
+    if not snapshot["histograms"] and not snapshot["counters"]:
+        st.info("No metrics recorded yet. Enable recording and run the agent loop.")
+        return
+    st.dataframe(
+        [
+            {
+                "series": _series(h),
+                "count": h["count"],
+                "mean ms": h["sum"] / h["count"] * 1000 if h["count"] else 0.0,
+                "p50 ms": h["p50"] * 1000,
+                "p95 ms": h["p95"] * 1000,
+                "p99 ms": h["p99"] * 1000,
+            }
+            for h in snapshot["histograms"]
+        ],
+        width="stretch",
+    )
+    if snapshot["counters"]:
+        st.dataframe([{"counter": _series(c), "value": c["value"]} for c in snapshot["counters"]])
+    col_prom, col_json, col_reset = st.columns(3)
+    col_prom.download_button("Prometheus text", metrics.to_prometheus(), "metrics.prom")
+    col_json.download_button("JSON snapshot", json.dumps(snapshot, indent=2), "metrics.json")
+    if col_reset.button("Reset metrics"):
+        metrics.reset()
+        st.rerun(scope="fragment")
+
+
+st.markdown("---")
+with st.expander("🩺 Diagnostics"):
+    diagnostics_panel()
\ No newline at end of file
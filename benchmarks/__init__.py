@@ -0,0 +1,3 @@
+"""
+Agentic Wellness System - Benchmarks
+"""
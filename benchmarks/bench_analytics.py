@@ -0,0 +1,89 @@
+"""
+Cohort analytics: throughput and memory of cohort_stats as the store grows.
+
+For each size, a sharded store of that many users is built (`--history` past workouts
+each, a few PAOA iterations in) and cohort_stats runs once in-process and once per
+`--workers` count. Reports users/sec and the peak RSS of the parent and of the workers;
+throughput should stay flat and memory should not grow with the store. Every parallel
+report must equal the in-process one (merged partials lose nothing); exits non-zero
+otherwise.
+
+Usage: python -m benchmarks.bench_analytics [--sizes 1000 4000 16000] [--workers 2 4] [--by domain week_number]
+"""
+import argparse
+import random
+import resource
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from engine import AgentLoop, cohort_stats
+from engine.analytics import GROUP_KEYS
+from tools import DataManager
+from benchmarks.synthetic import make_user
+
+TIMING_KEYS = ("workers", "elapsed_s", "users_per_sec")
+
+
+def build_store(data_dir: Path, users: int, history: int, seed: int) -> None:
+    manager = DataManager(str(data_dir), backend="sharded")
+    loop = AgentLoop(manager)
+    rng = random.Random(seed)
+    for u in range(users):
+        user_data = make_user(f"user_{u}", rng, history)
+        for _ in range(rng.randint(0, 3)):
+            user_data = loop.run_iteration(user_data, rng)
+        loop.clear_logs()
+        manager.save_user_data(user_data, f"user_{u}")
+    manager.close()
+
+
+def _peak_mb(who: int) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def _run(data_dir: str, by, workers: int) -> dict:
+    """One cohort_stats call in a fresh process, so peak RSS is this run's alone."""
+    report = cohort_stats(data_dir, backend="sharded", by=by, workers=workers)
+    report["peak_mb"] = _peak_mb(resource.RUSAGE_SELF)
+    report["workers_peak_mb"] = _peak_mb(resource.RUSAGE_CHILDREN) if workers > 1 else 0.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--by", nargs="*", choices=GROUP_KEYS, default=["domain", "week_number"])
+    parser.add_argument("--history", type=int, default=100)
+    args = parser.parse_args()
+
+    mismatches = 0
+    print(f"{'users':>8} {'workers':>8} {'users/sec':>10} {'peak MB':>8} {'workers MB':>11} {'groups':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            data_dir = Path(tmp) / str(size)
+            build_store(data_dir, size, args.history, seed=size)
+            reference = None
+            for workers in [1, *args.workers]:
+                with ProcessPoolExecutor(max_workers=1) as runner:
+                    report = runner.submit(_run, str(data_dir), args.by, workers).result()
+                print(
+                    f"{size:>8} {workers:>8} {report['users_per_sec']:>10.0f} {report['peak_mb']:>8.1f} "
+                    f"{report['workers_peak_mb']:>11.1f} {len(report['groups']):>7}"
+                )
+                stats = {k: v for k, v in report.items() if k not in TIMING_KEYS and not k.endswith("peak_mb")}
+                if reference is None:
+                    reference = stats
+                    mismatches += stats["users"] != size
+                else:
+                    mismatches += stats != reference
+    if mismatches:
+        print(f"MISMATCH: {mismatches} reports differ from the in-process report or miss users")
+        sys.exit(1)
+    print("Merge OK: every parallel report equals the in-process one")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Streamlit dashboard interaction latency, scripted through streamlit.testing's AppTest.
+
+Runs the app headless against a fresh data directory and times a fixed script of
+interactions: first render, initializing the profile, `--iterations` agent loop iterations,
+then paging through the reasoning logs (skipped for apps without a log pager). Times are
+process CPU time: AppTest polls the script thread with short sleeps, which would otherwise
+dominate wall time. Pass several
+`--app` scripts to compare them on the same interactions, e.g. the app before a change:
+`git show HEAD~1:app.py > app_before.py`.
+
+Usage: python -m benchmarks.bench_app [--iterations 20] [--repeat 3] [--app app.py app_before.py]
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+INTERACTIONS = ("first render", "initialize profile", "run iteration", "page logs")
+
+
+def _button(at: AppTest, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+def _timed(samples: dict, name: str, at: AppTest) -> AppTest:
+    started = time.process_time()
+    at.run()
+    samples[name].append(time.process_time() - started)
+    if at.exception:
+        raise RuntimeError(f"{name}: {at.exception[0].message}")
+    return at
+
+
+def session(app: Path, iterations: int, samples: dict) -> None:
+    at = AppTest.from_file(str(app), default_timeout=120)
+    _timed(samples, "first render", at)
+    _button(at, "Initialize Profile").click()
+    _timed(samples, "initialize profile", at)
+    for _ in range(iterations):
+        _button(at, "🔄 Run Agent Loop Iteration").click()
+        _timed(samples, "run iteration", at)
+    pagers = [n.key for n in at.number_input if n.key and n.key.startswith("log_page_")]
+    for key in pagers:
+        for page in range(2, int(at.number_input(key=key).proto.max) + 1):
+            at.number_input(key=key).set_value(page)
+            _timed(samples, "page logs", at)
+
+
+def measure(app: Path, iterations: int, repeat: int) -> dict:
+    samples = {name: [] for name in INTERACTIONS}
+    cwd = os.getcwd()
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)  # the app's DataManager writes to ./data
+            st.cache_resource.clear()
+            try:
+                session(app, iterations, samples)
+            finally:
+                os.chdir(cwd)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--app", nargs="+", default=["app.py"])
+    args = parser.parse_args()
+
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    print(f"{args.repeat} sessions x {args.iterations} iterations per app (median / mean CPU ms per interaction)")
+    print(f"{'app':>20} " + " ".join(f"{name:>20}" for name in INTERACTIONS))
+    for app in args.app:
+        with contextlib.redirect_stdout(sys.stderr):  # agent traces go to stdout
+            samples = measure(Path(app).resolve(), args.iterations, args.repeat)
+        cells = [
+            f"{statistics.median(s) * 1e3:>9.1f} / {statistics.mean(s) * 1e3:>8.1f}" if s else f"{'-':>20}"
+            for s in samples.values()
+        ]
+        print(f"{Path(app).name:>20} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
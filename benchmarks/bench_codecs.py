@@ -0,0 +1,104 @@
+"""
+Record serialization: encode/decode time and size per codec on realistic user records.
+
+Users with `--histories` past workouts run a few PAOA iterations first, so records carry
+plan versions and feedback state as stored ones do. Every installed codec (see
+tools.serialization) is compared with the indent=2 stdlib JSON files were written with
+before codecs existed. Decoding goes through serialization.decode, header detection
+included, so JSON rows decode with orjson when it is installed whichever codec wrote them.
+Every codec must round-trip every record to the same value as stdlib JSON;
+exits non-zero otherwise.
+
+Usage: python -m benchmarks.bench_codecs [--histories 100 1000 10000] [--users 20] [--iterations 5]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from engine import AgentLoop
+from tools import DataManager, serialization
+from tools.workout_history import attach, json_default
+from benchmarks.synthetic import make_user
+
+
+class IndentedJson(serialization.Codec):
+    name = "json indent=2"
+
+    def encode(self, value):
+        return json.dumps(value, indent=2, default=json_default).encode("utf-8")
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+def make_records(users: int, history: int, iterations: int, data_dir: str) -> list:
+    loop = AgentLoop(DataManager(data_dir, backend="sharded"))
+    rng = random.Random(history)
+    records = []
+    for u in range(users):
+        user_data = attach(make_user(f"user_{u}", rng, history))
+        for _ in range(iterations):
+            user_data = loop.run_iteration(user_data, rng)
+        loop.clear_logs()
+        records.append(user_data)
+    loop.data_manager.close()
+    return records
+
+
+def _per_record_ms(op, items: list, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            op(item)
+        runs.append((time.perf_counter() - started) / len(items) * 1e3)
+    return statistics.median(runs)
+
+
+def bench(codec: serialization.Codec, records: list, repeat: int) -> dict:
+    encoded = [codec.encode(r) for r in records]
+    decode = codec.decode if isinstance(codec, IndentedJson) else serialization.decode
+    return {
+        "encode_ms": _per_record_ms(codec.encode, records, repeat),
+        "decode_ms": _per_record_ms(decode, encoded, repeat),
+        "bytes": statistics.mean(len(data) for data in encoded),
+        "decoded": [decode(data) for data in encoded],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--histories", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=5, help="PAOA iterations per user before timing")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    codecs = [IndentedJson()] + [serialization.get_codec(name) for name in serialization.available_codecs()]
+    print(f"codecs: {', '.join(c.name for c in codecs)} (not installed: "
+          f"{', '.join(n for n in serialization.CODECS if n not in serialization.available_codecs()) or 'none'})")
+    print(f"{'history':>8} {'codec':>14} {'encode ms':>10} {'decode ms':>10} {'KB/record':>10} {'size':>7}")
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for history in args.histories:
+            records = make_records(args.users, history, args.iterations, f"{tmp}/{history}")
+            results = [bench(codec, records, args.repeat) for codec in codecs]
+            expected = results[0]["decoded"]
+            for codec, result in zip(codecs, results):
+                mismatches += sum(a != b for a, b in zip(result["decoded"], expected))
+                print(
+                    f"{history:>8} {codec.name:>14} {result['encode_ms']:>10.3f} {result['decode_ms']:>10.3f} "
+                    f"{result['bytes'] / 1024:>10.1f} {result['bytes'] / results[0]['bytes']:>7.0%}"
+                )
+    if mismatches:
+        print(f"MISMATCH: {mismatches} decoded records differ from stdlib JSON")
+        sys.exit(1)
+    print("Round trip OK: every codec decodes every record equal to stdlib JSON")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Cohort simulator: parity check against the dict-based agents, then throughput.
+
+The parity check drives both implementations with the same uniform draws and compares
+plan state, feedback, decisions and interventions after every iteration. It exits
+non-zero on any mismatch before benchmarking.
+
+Usage: python -m benchmarks.bench_cohort [--parity-users 200] [--users 1000000] [--iterations 5]
+"""
+import argparse
+import copy
+import random
+import sys
+import time
+
+import numpy as np
+
+from agents import PlannerAgent, DecisionAgent, FeedbackAgent, Tracer
+from engine import simulate_user_action
+from tools import feedback_state
+from engine.cohort import (
+    CohortSimulator,
+    DIFFICULTIES,
+    INTERVENTIONS,
+    INTENSITY_CODES,
+    NO_INTENSITY,
+    PAD,
+    STATUS_CODES,
+)
+from benchmarks.synthetic import make_user
+
+
+class _FixedDraw:
+    def __init__(self, value: float):
+        self.value = value
+
+    def random(self) -> float:
+        return self.value
+
+
+def _dict_iteration(user_data, draw, planner, decision_agent, feedback_agent):
+    """Same steps as engine.AgentLoop.run_iteration, returning what the simulator exposes."""
+    plan = user_data.get("current_plan")
+    if not plan:
+        goal = planner.identify_goal(user_data["profile"])
+        plan = user_data["current_plan"] = planner.create_plan(goal, user_data["profile"])
+    action = simulate_user_action(user_data, _FixedDraw(draw))
+    if action:
+        user_data["workouts"].append({**action, "date": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        feedback_state.record_workout(user_data, user_data["workouts"][-1])
+    feedback = feedback_agent.aggregate_feedback(user_data)
+    adapted = decision_agent.should_adapt_plan(feedback, plan)
+    if adapted:
+        plan = user_data["current_plan"] = planner.adapt_plan(plan, feedback)
+    intervention = decision_agent.decide_intervention(feedback)
+    escalated = decision_agent.should_escalate_goal(plan, feedback)
+    if escalated:
+        user_data["current_plan"] = None
+        user_data["goal_history"].append(plan)
+    return feedback, adapted, intervention["type"], escalated, plan
+
+
+def check_parity(n_users: int, iterations: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    tracer = Tracer()
+    planner, decision_agent, feedback_agent = PlannerAgent(tracer), DecisionAgent(tracer), FeedbackAgent(tracer)
+    users = [make_user(f"user_{i}", rng, history=rng.randint(0, 12), planner=planner) for i in range(n_users)]
+    for user_data in users:
+        # Spread plans over the escalation and max-adaptation boundaries.
+        user_data["current_plan"]["week_number"] = rng.randint(1, 9)
+        user_data["current_plan"]["adaptation_count"] = rng.randint(0, 5)
+    sim = CohortSimulator.from_users(copy.deepcopy(users))
+    draws = np.random.default_rng(seed).random((iterations, n_users))
+    mismatches = []
+
+    for it in range(iterations):
+        out = sim.step(draws[it])
+        for i, user_data in enumerate(users):
+            feedback, adapted, intervention, escalated, plan = _dict_iteration(
+                user_data, float(draws[it, i]), planner, decision_agent, feedback_agent
+            )
+            schedule = plan["weekly_schedule"]
+            expected = {
+                "consistency": feedback["consistency_rate"],
+                "difficulty": feedback["difficulty"],
+                "streak": feedback["current_streak"],
+                "adapted": adapted,
+                "intervention": intervention,
+                "escalated": escalated,
+                "adaptation_count": plan.get("adaptation_count", 0),
+                "status": [STATUS_CODES[t["status"]] for t in schedule],
+                "duration": [t.get("duration_minutes", 0) for t in schedule],
+                "intensity": [INTENSITY_CODES.get(t.get("intensity"), NO_INTENSITY) for t in schedule],
+            }
+            n = int(sim.n_tasks[i])
+            actual = {
+                "consistency": float(out["consistency"][i]),
+                "difficulty": DIFFICULTIES[out["difficulty"][i]],
+                "streak": int(out["streak"][i]),
+                "adapted": bool(out["adapted"][i]),
+                "intervention": INTERVENTIONS[out["intervention"][i]],
+                "escalated": bool(out["escalated"][i]),
+                "adaptation_count": int(sim.adaptation_count[i]),
+                "status": [int(x) for x in sim.status[i, :n]],
+                "duration": [int(x) for x in sim.duration[i, :n]],
+                "intensity": [int(x) for x in sim.intensity[i, :n]],
+            }
+            if (sim.status[i, n:] != PAD).any():
+                actual["status"].append("stray task past n_tasks")
+            for key, value in expected.items():
+                if actual[key] != value:
+                    mismatches.append({"iteration": it, "user": i, "field": key, "dict": value, "vector": actual[key]})
+        planner.reasoning_log.clear()
+        decision_agent.decision_log.clear()
+        feedback_agent.observation_log.clear()
+    return mismatches
+
+
+def bench(n_users: int, iterations: int) -> dict:
+    sim = CohortSimulator.synthetic(n_users, seed=1)
+    started = time.perf_counter()
+    sim.run(iterations)
+    elapsed = time.perf_counter() - started
+    user_steps = n_users * iterations
+    return {
+        "users": n_users,
+        "iterations": iterations,
+        "elapsed_s": elapsed,
+        "user_steps_per_sec": user_steps / elapsed,
+        # A plan week has at most 7 tasks; the CLI loop acts on one task per iteration.
+        "user_weeks_per_sec": user_steps / 7 / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--parity-users", type=int, default=200)
+    parser.add_argument("--parity-iterations", type=int, default=12)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=7)
+    args = parser.parse_args()
+
+    mismatches = check_parity(args.parity_users, args.parity_iterations)
+    if mismatches:
+        print(f"PARITY FAILED: {len(mismatches)} mismatches, first: {mismatches[0]}")
+        sys.exit(1)
+    print(f"Parity OK: {args.parity_users} users x {args.parity_iterations} iterations")
+
+    r = bench(args.users, args.iterations)
+    print(
+        f"{r['users']} users x {r['iterations']} iterations in {r['elapsed_s']:.2f}s: "
+        f"{r['user_steps_per_sec'] / 1e6:.2f}M user-steps/s, {r['user_weeks_per_sec'] / 1e6:.2f}M user-weeks/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
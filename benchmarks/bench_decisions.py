@@ -0,0 +1,152 @@
+"""
+Decision throughput: the original if/elif chains vs compiled rule tables, one user at a time and batched.
+
+Checks every table against the original chains (decision, reasoning and intervention) on
+random feedback, and checks evaluate_batch against per-user evaluation. Exits non-zero on
+mismatch. Then times the three decisions per user: the chains, DecisionRules.evaluate
+(memoized on the field values) and evaluate_batch over NumPy columns.
+
+Usage: python -m benchmarks.bench_decisions [--users 1000000]
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from agents import DecisionRules
+from benchmarks.synthetic import DIFFICULTIES, make_decision_case as make_case
+
+
+def reference(feedback: Dict[str, Any], plan: Dict[str, Any]) -> Tuple:
+    """The decisions exactly as DecisionAgent's original if/elif chains made them."""
+    consistency_rate = feedback.get("consistency_rate", 0)
+    difficulty = feedback.get("difficulty", "moderate")
+    total = feedback.get("total_workouts", 0)
+    if total == 0:
+        adapt = (False, "No data yet - continue with current plan")
+    elif plan.get("adaptation_count", 0) >= 5:
+        adapt = (False, "Maximum adaptations reached - maintain")
+    elif consistency_rate < 0.5 and total >= 3:
+        adapt = (True, "Low consistency below 50%")
+    elif consistency_rate > 0.8 and difficulty == "easy" and total >= 5:
+        adapt = (True, "High consistency + easy difficulty")
+    elif difficulty == "hard" and total >= 3:
+        adapt = (True, "User reports difficulty hard")
+    else:
+        adapt = (False, "Plan appropriate - maintain")
+
+    skipped = feedback.get("skipped_workouts", 0)
+    completed = feedback.get("completed_workouts", 0)
+    streak = feedback.get("current_streak", 0)
+    if skipped > completed:
+        intervention = ("motivation", "Consistency matters. Try a smaller task today.", "reduce_intensity")
+        reasoning = "Struggling with consistency"
+    elif streak >= 7:
+        message = f"Amazing streak of {streak} days! You're building strong habits!"
+        intervention, reasoning = ("celebration", message, "maintain"), "Celebrate streak"
+    elif completed > 0:
+        message = f"Great job completing {completed} task(s)!"
+        intervention, reasoning = ("positive_reinforcement", message, "maintain"), "Reinforce success"
+    else:
+        intervention, reasoning = ("encouragement", "Keep up the great work!", None), "Standard encouragement"
+
+    week_number = plan.get("week_number", 1)
+    goal_weeks = plan.get("goal", {}).get("target_weeks", 8)
+    if week_number >= goal_weeks and consistency_rate > 0.75:
+        escalate = (True, f"Goal period complete with high consistency ({consistency_rate:.2%})")
+    else:
+        escalate = (False, f"Goal in progress ({week_number}/{goal_weeks}) - continue")
+    return adapt, (intervention, reasoning), escalate
+
+
+def evaluate(rules: DecisionRules, feedback: Dict[str, Any], plan: Dict[str, Any]) -> Tuple:
+    adapt = rules.adapt.evaluate(feedback, plan)[1]
+    intervention = rules.intervention.evaluate(feedback)[1]
+    escalate = rules.escalate.evaluate(feedback, plan)[1]
+    return (
+        (adapt["decision"], adapt["reasoning"]),
+        ((intervention["type"], intervention["message"], intervention["action"]), intervention["reasoning"]),
+        (escalate["decision"], escalate["reasoning"]),
+    )
+
+
+def to_columns(rules: DecisionRules, cases: List[Tuple]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Per-table columns; difficulty is coded as its index in DIFFICULTIES."""
+    columns = {}
+    for name, table in rules.tables.items():
+        rows = [table.values(feedback, plan) for feedback, plan in cases]
+        columns[name] = {}
+        for i, field in enumerate(table.fields):
+            values = [row[i] for row in rows]
+            if field == "difficulty":
+                values = [DIFFICULTIES.index(v) for v in values]
+            columns[name][field] = np.array(values)
+    return columns
+
+
+def evaluate_batch(rules: DecisionRules, columns: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    categories = {"difficulty": DIFFICULTIES}
+    return {name: table.evaluate_batch(columns[name], categories) for name, table in rules.tables.items()}
+
+
+def check_parity(cases: List[Tuple]) -> int:
+    rules = DecisionRules.load()
+    mismatches = 0
+    for feedback, plan in cases:
+        if evaluate(rules, feedback, plan) != reference(feedback, plan):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"MISMATCH: {feedback} {plan}: {evaluate(rules, feedback, plan)} vs {reference(feedback, plan)}")
+    batch = evaluate_batch(rules, to_columns(rules, cases))
+    for name, table in rules.tables.items():
+        single = np.array([table.evaluate(feedback, plan)[0] for feedback, plan in cases])
+        if not np.array_equal(batch[name], single):
+            mismatches += 1
+            print(f"MISMATCH: {name} batch rule indices differ from single evaluation")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cases = [make_case(rng) for _ in range(args.users)]
+    mismatches = check_parity(cases[:20000])
+    if mismatches:
+        sys.exit(1)
+    print(f"Parity OK: {min(args.users, 20000)} users, rule tables match the original chains")
+
+    results = {}
+    started = time.perf_counter()
+    for feedback, plan in cases:
+        reference(feedback, plan)
+    results["chains"] = time.perf_counter() - started
+
+    rules = DecisionRules.load()
+    started = time.perf_counter()
+    for feedback, plan in cases:
+        evaluate(rules, feedback, plan)
+    results["tables"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columns = to_columns(rules, cases)
+    extract = time.perf_counter() - started
+    started = time.perf_counter()
+    batch = evaluate_batch(rules, columns)
+    results["batch"] = time.perf_counter() - started
+    adapted = int(rules.adapt.outcome_column("decision")[batch["adapt"]].sum())
+
+    print(f"{'mode':>7} {'seconds':>9} {'users/s':>12}")
+    for name, elapsed in results.items():
+        print(f"{name:>7} {elapsed:>9.3f} {args.users / elapsed:>12.0f}")
+    print(f"batch speedup vs chains: {results['chains'] / results['batch']:.0f}x ({adapted} adaptations)")
+    print(f"column extraction from dicts: {extract:.2f}s; memo stats: {rules.stats()}")
+
+
+if __name__ == "__main__":
+    main()
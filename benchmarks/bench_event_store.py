@@ -0,0 +1,128 @@
+"""
+Event-sourced storage: append-per-save event logs vs rewriting each user's record.
+
+Users with `--history` past workouts run PAOA iterations through AgentLoop, saving after
+every iteration, once on the sharded backend and once on the event-log backend. Reports
+save latency, bytes written per save and load latency (snapshot + replay) for both, then
+compacts the event logs. Every event-sourced user must reload equal to its live record,
+before and after compaction; exits non-zero otherwise.
+
+Usage: python -m benchmarks.bench_event_store [--users 200] [--history 1000] [--iterations 20]
+       [--snapshot-every 100]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from engine import AgentLoop
+from tools import DataManager, EventLogBackend, ShardedFileBackend, events, feedback_state
+from benchmarks.synthetic import make_user
+
+
+def _files(backend, user_id: str) -> list:
+    if isinstance(backend, EventLogBackend):
+        return list(backend._paths(user_id)[:2])
+    return [backend._user_path(user_id)]
+
+
+def _stat(paths: list) -> list:
+    return [(p.stat().st_size, p.stat().st_mtime_ns) if p.exists() else (0, 0) for p in paths]
+
+
+def _written(backend, paths: list, before: list) -> int:
+    """Bytes a save wrote: growth of an appended log, whole size of a rewritten file."""
+    total = 0
+    for path, (size, mtime), (old_size, old_mtime) in zip(paths, _stat(paths), before):
+        if mtime != old_mtime:
+            appended = isinstance(backend, EventLogBackend) and path.name.endswith(".events")
+            total += size - old_size if appended else size
+    return total
+
+
+def _comparable(user_data: dict) -> dict:
+    feedback_state.get_state(user_data)  # derived state is built on first read; build it on both sides
+    record = {k: v for k, v in user_data.items() if k != events.EVENTS_KEY}
+    record["workouts"] = [dict(w) for w in record["workouts"]]
+    return record
+
+
+def run(backend, users: int, history: int, iterations: int, root: Path) -> dict:
+    manager = DataManager(str(root), backend=backend)
+    loop = AgentLoop(manager)
+    rng = random.Random(0)
+    for u in range(users):
+        manager.save_user_data(make_user(f"user_{u}", rng, history), f"user_{u}")
+
+    live = {}
+    save_s = 0.0
+    written = 0
+    for u in range(users):
+        user_id = f"user_{u}"
+        user_data = manager.load_user_data(user_id)
+        paths = _files(backend, user_id)
+        for _ in range(iterations):
+            user_data = loop.run_iteration(user_data, rng)
+            before = _stat(paths)
+            started = time.perf_counter()
+            manager.save_user_data(user_data, user_id)
+            save_s += time.perf_counter() - started
+            written += _written(backend, paths, before)
+        loop.clear_logs()
+        live[user_id] = user_data
+
+    started = time.perf_counter()
+    loaded = {user_id: manager.load_user_data(user_id) for user_id in live}
+    load_s = time.perf_counter() - started
+    mismatches = sum(_comparable(loaded[user_id]) != _comparable(live[user_id]) for user_id in live)
+    saves = users * iterations
+    return {
+        "manager": manager,
+        "live": live,
+        "save_ms": save_s / saves * 1e3,
+        "bytes_per_save": written / saves,
+        "load_ms": load_s / users * 1e3,
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--history", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--snapshot-every", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sharded_backend = ShardedFileBackend(tmp / "sharded" / "users")
+        sharded = run(sharded_backend, args.users, args.history, args.iterations, tmp / "sharded")
+        event_log = EventLogBackend(tmp / "events" / "events", snapshot_every=args.snapshot_every)
+        logged = run(event_log, args.users, args.history, args.iterations, tmp / "events")
+
+        print(f"{args.users} users, {args.history} past workouts, {args.iterations} saves each")
+        print(f"{'backend':>9} {'save ms':>9} {'bytes/save':>11} {'load ms':>9}")
+        for name, result in (("sharded", sharded), ("events", logged)):
+            print(f"{name:>9} {result['save_ms']:>9.3f} {result['bytes_per_save']:>11.0f} {result['load_ms']:>9.3f}")
+
+        started = time.perf_counter()
+        compacted = event_log.compact_all()
+        elapsed = time.perf_counter() - started
+        after = sum(
+            _comparable(logged["manager"].load_user_data(user_id)) != _comparable(user_data)
+            for user_id, user_data in logged["live"].items()
+        )
+        print(f"compaction: {compacted['events']} events from {compacted['users']} users in {elapsed:.2f}s")
+        for result in (sharded, logged):
+            result["manager"].close()
+        if logged["mismatches"] or after:
+            print(f"MISMATCH: {logged['mismatches']} users before compaction, {after} after, reload differently")
+            sys.exit(1)
+        print("Replay OK: every user reloads equal to its live record, before and after compaction")
+
+
+if __name__ == "__main__":
+    main()
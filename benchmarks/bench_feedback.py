@@ -0,0 +1,120 @@
+"""
+Feedback observation cost vs workout history length, incremental state vs full scans.
+
+First replays randomized histories (out-of-order, future and malformed dates included)
+through DataManager.add_workout, mixed with task statuses set through DataManager and
+directly, and workouts edited in place. It checks the incremental streak, difficulty
+window and plan counts against the original scanning implementations. Exits non-zero on
+mismatch.
+
+Usage: python -m benchmarks.bench_feedback [--lengths 100 1000 10000 100000] [--calls 200]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from agents import FeedbackAgent, Tracer
+from tools import DataManager, feedback_state
+from tools.workout_history import attach
+from benchmarks.synthetic import make_user, make_workouts
+
+
+def _legacy_observation(agent: FeedbackAgent, user_data: dict) -> tuple:
+    """The pre-incremental computations: full scans over schedule and history."""
+    plan = user_data["current_plan"]["weekly_schedule"]
+    counts = tuple(len([w for w in plan if w.get("status") == s]) for s in ("completed", "skipped", "pending"))
+    workouts = user_data.get("workouts", [])
+    recent = workouts[-5:] if len(workouts) >= 5 else workouts
+    return counts, agent._calculate_streak(workouts), [w.get("status") for w in recent]
+
+
+def check_parity(users: int = 200, steps: int = 60, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    agent = FeedbackAgent(Tracer())
+    today = datetime.now()
+    mismatches = []
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = DataManager(tmp)
+        for u in range(users):
+            # A WorkoutHistory, as loaded records have, so in-place edits are tracked.
+            user_data = attach(make_user(f"u{u}", rng, history=rng.randint(0, 10)))
+            for step in range(steps):
+                roll = rng.random()
+                if roll < 0.7:
+                    offset = rng.choice([0, 0, 0, -1, -2, -3, -rng.randint(4, 30), 1])
+                    date = (today + timedelta(days=offset)).isoformat()
+                    if rng.random() < 0.03:
+                        date = "not-a-date"
+                    status = rng.choice(["completed", "completed", "skipped"])
+                    manager.add_workout(user_data, {"day": "Monday", "type": "x", "status": status, "date": date})
+                elif roll < 0.8:
+                    task = rng.choice(user_data["current_plan"]["weekly_schedule"])
+                    manager.set_task_status(user_data, task["day"], rng.choice(["completed", "skipped", "pending"]))
+                elif roll < 0.85:
+                    task = rng.choice(user_data["current_plan"]["weekly_schedule"])
+                    task["status"] = rng.choice(["completed", "skipped", "pending"])
+                elif roll < 0.9 and user_data["workouts"]:
+                    workout = user_data["workouts"][rng.randrange(len(user_data["workouts"]))]
+                    workout["status"] = rng.choice(["completed", "skipped"])
+                else:
+                    schedule = user_data["current_plan"]["weekly_schedule"]
+                    plan = {**user_data["current_plan"], "weekly_schedule": schedule[:-1] if len(schedule) > 2 else schedule}
+                    manager.update_plan(user_data, plan)
+
+                counts = feedback_state.plan_counts(user_data)
+                actual = (
+                    (counts["completed"], counts["skipped"], counts["pending"]),
+                    feedback_state.current_streak(user_data),
+                    list(feedback_state.recent_statuses(user_data)),
+                )
+                expected = _legacy_observation(agent, user_data)
+                if actual != expected:
+                    mismatches.append({"user": u, "step": step, "incremental": actual, "scan": expected})
+    return mismatches
+
+
+def bench(lengths, calls: int) -> list:
+    rng = random.Random(1)
+    agent = FeedbackAgent(Tracer())
+    results = []
+    for length in lengths:
+        user_data = make_user("bench", rng, history=0)
+        user_data["workouts"] = make_workouts(rng, length)
+
+        started = time.perf_counter()
+        for _ in range(calls):
+            _legacy_observation(agent, user_data)
+        scan_us = (time.perf_counter() - started) / calls * 1e6
+
+        feedback_state.get_state(user_data)
+        started = time.perf_counter()
+        for _ in range(calls):
+            agent.aggregate_feedback(user_data)
+            agent.observation_log.clear()
+        incremental_us = (time.perf_counter() - started) / calls * 1e6
+        results.append({"history": length, "scan_us": scan_us, "aggregate_feedback_us": incremental_us})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    mismatches = check_parity()
+    if mismatches:
+        print(f"PARITY FAILED: {len(mismatches)} mismatches, first: {mismatches[0]}")
+        sys.exit(1)
+    print("Parity OK: incremental feedback state matches full scans")
+
+    print(f"{'history':>8} {'legacy scan us':>16} {'aggregate_feedback us':>22}")
+    for r in bench(args.lengths, args.calls):
+        print(f"{r['history']:>8} {r['scan_us']:>16.1f} {r['aggregate_feedback_us']:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
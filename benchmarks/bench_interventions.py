@@ -0,0 +1,186 @@
+"""
+Intervention queue: coalescing and delivery checks, then enqueue, dequeue, reopen and delivery at scale.
+
+The check enqueues `--ops` random interventions for `--users` users over a simulated week.
+The queue is ticked every hour through a sink that rejects `--failure-rate` of the batches
+and is reopened every `--reopen` ticks. Interventions may be enqueued up to six hours past
+due, which the queue moves to its clock. Every (user, window) that was enqueued must be
+delivered exactly once, never before it is due, and in due order within a tick. It must
+carry the highest priority and earliest due enqueued before it went out. Exits non-zero
+otherwise. Then `--pending` interventions are queued. The benchmark times enqueue, a
+journal replay on reopen, enqueue+dequeue at several queue sizes (O(log n): the cost per op
+should barely move), and delivery of `--deliver` of them to the stub endpoint.
+
+Usage: python -m benchmarks.bench_interventions [--ops 50000] [--pending 1000000] [--deliver 200000]
+"""
+import argparse
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from tools.interventions import PRIORITIES, InterventionDispatcher, InterventionQueue, StubEndpointSink
+from tools.time_index import to_micros
+
+HOUR_US = 3600 * 10**6
+DAY_US = 24 * HOUR_US
+START = datetime(2026, 1, 5)
+TYPES = list(PRIORITIES)
+
+
+class RecordingSink(StubEndpointSink):
+    """The stub endpoint, keeping every accepted batch."""
+
+    def __init__(self, failure_rate: float, seed: int):
+        super().__init__(latency_ms=0, failure_rate=failure_rate, seed=seed)
+        self.accepted = []
+
+    def send(self, messages):
+        super().send(messages)
+        self.accepted.append(messages)
+
+
+def intervention(rng: random.Random) -> dict:
+    kind = rng.choice(TYPES)
+    return {"type": kind, "message": f"{kind} {rng.randrange(1000)}", "action": None}
+
+
+def check(args, path: Path) -> int:
+    rng = random.Random(0)
+    start = to_micros(START)
+    ticks = 7 * 24
+    enqueued = {}  # (user_id, window) -> [(tick, due, priority)]
+    sent = {}  # (user_id, window) -> (tick, due, priority)
+    bad = 0
+    queue = InterventionQueue(path, fsync=False)
+    sink = RecordingSink(args.failure_rate, seed=1)
+    clock = 0
+    for tick in range(ticks + 48):
+        if tick < ticks:
+            for _ in range(args.ops // ticks):
+                user_id = f"user_{rng.randrange(args.users)}"
+                due = start + tick * HOUR_US + rng.randrange(-6 * HOUR_US, 36 * HOUR_US)
+                item = intervention(rng)
+                queue.enqueue(user_id, item, due)
+                due = max(due, clock)
+                enqueued.setdefault((user_id, due // DAY_US), []).append((tick, due, PRIORITIES[item["type"]]))
+        if tick % args.reopen == 0:
+            queue.close()
+            queue = InterventionQueue(path, fsync=False, compact_min=1000)
+        now = clock = start + (tick + 1) * HOUR_US
+        dispatcher = InterventionDispatcher(queue, sink, batch_size=100, workers=1)
+        sink.accepted.clear()
+        while True:
+            result = dispatcher.dispatch(datetime(1970, 1, 1) + timedelta(microseconds=now))
+            if not result["failed"]:
+                break
+        dues = [to_micros(m["due"]) for batch in sink.accepted for m in batch]
+        bad += dues != sorted(dues)
+        for batch in sink.accepted:
+            for m in batch:
+                due = to_micros(m["due"])
+                key = (m["user_id"], due // DAY_US)
+                bad += key in sent or due > now
+                sent[key] = (tick, due, PRIORITIES[m["type"]])
+    queue.close()
+
+    bad += set(sent) != set(enqueued)
+    for key, (tick, due, priority) in sent.items():
+        before = [e for e in enqueued.get(key, []) if e[0] <= tick]
+        bad += not before or due != min(e[1] for e in before) or priority != max(e[2] for e in before)
+    print(
+        f"{args.ops} enqueues for {args.users} users, {len(enqueued)} user-days, {ticks + 48} hourly ticks, "
+        f"{args.failure_rate:.0%} of batches rejected, reopened every {args.reopen} ticks"
+    )
+    return bad
+
+
+def per_op_us(queue: InterventionQueue, start: int, ops: int) -> float:
+    """Enqueue an intervention due before all others, then pop and ack it, `ops` times."""
+    probe = {"type": "reminder", "message": "probe", "action": None}
+    started = time.perf_counter()
+    for i in range(ops):
+        queue.enqueue(f"probe_{len(queue)}_{i}", probe, start - 1 - i)
+        queue.ack(queue.pop_due(start - 1, 1))
+    return (time.perf_counter() - started) / ops * 1e6
+
+
+def scale(args, path: Path) -> None:
+    rng = random.Random(1)
+    start = to_micros(START)
+    users = max(1, args.pending // 30)
+    items = [intervention(rng) for _ in range(1000)]
+    # Compaction is timed on its own below.
+    queue = InterventionQueue(path, fsync=False, compact_min=10**9)
+    sizes = sorted({s for s in (10000, 100000, args.pending) if s <= args.pending})
+    costs = {}
+    started = time.perf_counter()
+    for i in range(args.pending):
+        # One intervention per user per day over 30 days, due at a random time of that day.
+        queue.enqueue(f"user_{i % users}", items[i % 1000], start + (i // users) * DAY_US + rng.randrange(DAY_US))
+        if i + 1 in sizes:
+            enqueue_s = time.perf_counter() - started
+            costs[i + 1] = per_op_us(queue, start, 10000)
+            started = time.perf_counter() - enqueue_s
+    queue.flush()
+    enqueue_s = time.perf_counter() - started
+    queue.close()
+    size = (path / "queue.log").stat().st_size / 2**20
+    print(f"{args.pending} pending interventions for {users} users")
+    print(f"  enqueue              {enqueue_s:7.2f}s  {args.pending / enqueue_s:9.0f}/sec  ({size:.0f} MB journal)")
+
+    started = time.perf_counter()
+    queue = InterventionQueue(path, fsync=False, compact_min=10**9)
+    print(f"  reopen (replay)      {time.perf_counter() - started:7.2f}s  {len(queue)} pending")
+    started = time.perf_counter()
+    queue.compact()
+    size = (path / "queue.log").stat().st_size / 2**20
+    print(f"  compact              {time.perf_counter() - started:7.2f}s  ({size:.0f} MB journal)")
+    for n, cost in costs.items():
+        print(f"  enqueue+dequeue at {n:>8} pending: {cost:6.2f} us per op")
+
+    sink = StubEndpointSink(latency_ms=args.latency_ms)
+    dispatcher = InterventionDispatcher(queue, sink, batch_size=args.batch_size, workers=args.workers)
+    # The first `--deliver` interventions are due within their first deliver / users days.
+    until = datetime(1970, 1, 1) + timedelta(microseconds=start + args.deliver * DAY_US // users)
+    started = time.perf_counter()
+    result = dispatcher.dispatch(until)
+    elapsed = time.perf_counter() - started
+    dispatcher.close()
+    queue.close()
+    print(
+        f"  deliver              {elapsed:7.2f}s  {result['sent'] / elapsed:9.0f}/sec  ({result['sent']} in "
+        f"{result['batches']} batches of {args.batch_size}, {args.workers} workers, {args.latency_ms:.0f} ms per batch)"
+    )
+    print(f"  peak RSS             {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:7.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--reopen", type=int, default=10)
+    parser.add_argument("--pending", type=int, default=1000000)
+    parser.add_argument("--deliver", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bad = check(args, Path(tmp))
+    if bad:
+        print(f"MISMATCH: {bad} deliveries lost, duplicated, early, out of order or not coalesced")
+        sys.exit(1)
+    print("Queue OK: one delivery per user-day, on time and in due order, highest priority and earliest due kept")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scale(args, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Async orchestrator throughput as concurrency grows, for a burst of action submissions.
+
+Every user gets `--submissions` actions, all submitted at once (round-robin over users) to
+AsyncOrchestrator. Each action is tagged with its sequence number; afterwards every user's
+stored workouts must carry the tags in submission order, so lost updates or reordering
+within a user fail the run (exit 1). `--io-latency-ms` adds a fixed delay to each backend
+load and save, standing in for a storage service on the network.
+
+Usage: python -m benchmarks.bench_orchestrator [--users 500] [--submissions 5] [--concurrency 1 4 16 64 256]
+       [--backend sharded] [--io-latency-ms 2]
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+
+from engine import AsyncOrchestrator
+from tools import DataManager
+from tools.data_manager import BACKENDS
+
+
+class LatencyBackend:
+    """Delegates to a real backend, sleeping before each load and save."""
+
+    def __init__(self, backend, latency: float):
+        self.backend = backend
+        self.latency = latency
+
+    def load(self, user_id):
+        time.sleep(self.latency)
+        return self.backend.load(user_id)
+
+    def save(self, user_id, user_data):
+        time.sleep(self.latency)
+        return self.backend.save(user_id, user_data)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+async def burst(orchestrator: AsyncOrchestrator, users: int, submissions: int) -> float:
+    started = time.perf_counter()
+    tasks = [
+        asyncio.ensure_future(
+            orchestrator.submit(f"user_{u}", {"day": "Monday", "status": "completed", "type": f"seq{s}"})
+        )
+        for s in range(submissions)
+        for u in range(users)
+    ]
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started
+
+
+def check_order(manager: DataManager, users: int, submissions: int) -> int:
+    expected = [f"seq{s}" for s in range(submissions)]
+    bad = 0
+    for u in range(users):
+        workouts = manager.load_user_data(f"user_{u}")["workouts"]
+        if [w["type"] for w in workouts] != expected:
+            bad += 1
+            if bad <= 3:
+                print(f"ORDER MISMATCH for user_{u}: {[w['type'] for w in workouts]}")
+    return bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--submissions", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="sharded")
+    parser.add_argument("--io-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    total = args.users * args.submissions
+    print(f"{args.users} users x {args.submissions} submissions, {args.backend}, +{args.io_latency_ms} ms per I/O")
+    print(f"{'concurrency':>11} {'seconds':>9} {'actions/s':>10} {'peak in flight':>15}")
+    for concurrency in args.concurrency:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = DataManager(tmp, backend=args.backend)
+            manager.backend = LatencyBackend(manager.backend, args.io_latency_ms / 1000)
+
+            async def run():
+                async with AsyncOrchestrator(manager, concurrency) as orchestrator:
+                    return await burst(orchestrator, args.users, args.submissions), orchestrator.peak_in_flight
+
+            elapsed, peak = asyncio.run(run())
+            manager.backend = manager.backend.backend
+            if check_order(manager, args.users, args.submissions):
+                sys.exit(1)
+            manager.close()
+        print(f"{concurrency:>11} {elapsed:>9.2f} {total / elapsed:>10.0f} {peak:>15}")
+    print("Per-user order OK at every concurrency level")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Plan version history: delta-encoded versions vs keeping a full plan copy per version.
+
+Drives users through plan creation, task status updates, adaptations and goal escalations
+via DataManager, keeping an independent deep copy of every plan as it was installed. Checks
+that every version rebuilds exactly (so later in-place edits never leak into old versions),
+then compares serialized size and save cost of the two layouts. Exits non-zero on mismatch.
+
+Usage: python -m benchmarks.bench_plan_versions [--users 200] [--iterations 200] [--snapshot-every 10]
+"""
+import argparse
+import copy
+import json
+import random
+import sys
+import tempfile
+import time
+
+from agents import PlannerAgent, Tracer
+from tools import DataManager, plan_versions
+from tools.workout_history import json_default
+from benchmarks.synthetic import make_profile
+
+
+def simulate(manager: DataManager, planner: PlannerAgent, rng: random.Random, iterations: int, snapshot_every: int):
+    user_data = manager._create_default_user("bench")
+    user_data["profile"] = make_profile(rng)
+    user_data["plan_versions"] = {"snapshot_every": snapshot_every, "entries": [], "snapshots": []}
+    expected = []
+
+    def install(plan):
+        manager.update_plan(user_data, plan)
+        if not expected or expected[-1] != plan:
+            expected.append(copy.deepcopy(plan))
+
+    for _ in range(iterations):
+        plan = user_data.get("current_plan")
+        if not plan:
+            plan = planner.create_plan(planner.identify_goal(user_data["profile"]), user_data["profile"])
+            install(plan)
+        task = rng.choice(plan["weekly_schedule"])
+        manager.set_task_status(user_data, task["day"], rng.choice(["completed", "skipped"]))
+        roll = rng.random()
+        if roll < 0.6:
+            feedback = {
+                "completed_workouts": rng.randint(0, 5),
+                "skipped_workouts": rng.randint(0, 5),
+                "difficulty": rng.choice(["easy", "moderate", "hard"]),
+            }
+            install(planner.adapt_plan(plan, feedback))
+        elif roll < 0.65:
+            final = copy.deepcopy(plan)
+            manager.retire_plan(user_data)
+            if expected[-1] != final:
+                expected.append(final)
+    return user_data, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--snapshot-every", type=int, default=plan_versions.SNAPSHOT_EVERY)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    planner = PlannerAgent(Tracer())
+    delta_bytes = full_bytes = versions = 0
+    delta_save = full_save = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = DataManager(tmp)
+        for u in range(args.users):
+            user_data, expected = simulate(manager, planner, rng, args.iterations, args.snapshot_every)
+            rebuilt = plan_versions.history(user_data)
+            if rebuilt != expected or any(plan_versions.get_version(user_data, i) != p for i, p in enumerate(expected)):
+                print(f"MISMATCH for user {u}: {len(rebuilt)} rebuilt vs {len(expected)} expected versions")
+                sys.exit(1)
+            versions += len(expected)
+
+            full_layout = {**user_data, "plan_versions": expected}
+            started = time.perf_counter()
+            delta_bytes += len(json.dumps(user_data, default=json_default))
+            delta_save += time.perf_counter() - started
+            started = time.perf_counter()
+            full_bytes += len(json.dumps(full_layout, default=json_default))
+            full_save += time.perf_counter() - started
+
+    print(f"Versions OK: {versions} versions over {args.users} users rebuild exactly")
+    print(f"{'layout':>12} {'KB/user':>10} {'serialize ms/user':>18}")
+    print(f"{'full copies':>12} {full_bytes / args.users / 1e3:>10.1f} {full_save / args.users * 1e3:>18.3f}")
+    print(f"{'deltas':>12} {delta_bytes / args.users / 1e3:>10.1f} {delta_save / args.users * 1e3:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Bulk onboarding: identify_goal + create_plan for many users, memoized templates vs compiling each plan.
+
+"compile" rebuilds every plan from the template spec (PlanTemplates(memoize=False)), which is
+the per-user work the old hard-coded builders did; "memoized" compiles each profile shape once
+and only copies tasks and stamps created_at per user. Plans from both modes are compared.
+
+Usage: python -m benchmarks.bench_planner [--users 1000000]
+"""
+import argparse
+import random
+import time
+
+from agents import PlannerAgent, PlanTemplates, Tracer
+from benchmarks.synthetic import make_profile
+
+
+def onboard(planner: PlannerAgent, profiles) -> float:
+    started = time.perf_counter()
+    for profile in profiles:
+        planner.create_plan(planner.identify_goal(profile), profile)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    profiles = [make_profile(rng) for _ in range(args.users)]
+    compiled = PlannerAgent(Tracer(), templates=PlanTemplates.load(memoize=False))
+    memoized = PlannerAgent(Tracer(), templates=PlanTemplates.load())
+
+    for profile in profiles[:1000]:
+        plans = [p.create_plan(p.identify_goal(profile), profile) for p in (compiled, memoized)]
+        for plan in plans:
+            plan.pop("created_at")
+        assert plans[0] == plans[1], (profile, plans)
+
+    results = {name: onboard(planner, profiles) for name, planner in (("compile", compiled), ("memoized", memoized))}
+    print(f"{'mode':>9} {'seconds':>9} {'users/s':>10}")
+    for name, elapsed in results.items():
+        print(f"{name:>9} {elapsed:>9.2f} {args.users / elapsed:>10.0f}")
+    print(f"speedup: {results['compile'] / results['memoized']:.2f}x, template stats: {memoized.templates.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Population snapshot: export/refresh cost and query latency vs loading every user.
+
+A sharded store of `--store-users` users is exported with export_population; every row
+must match FeedbackAgent.observe_task_completion on the loaded user (counts, consistency,
+streak) and the plan's week_number/adaptation_count. Then `--changed` users run an
+iteration and refresh_population must re-read exactly those and match again. Exits
+non-zero on any mismatch. Query latency is measured on a synthetic `--rows` snapshot,
+next to the load-and-observe approach extrapolated to the same population.
+
+Usage: python -m benchmarks.bench_population [--store-users 2000] [--history 100] [--changed 20] [--rows 1000000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from agents import FeedbackAgent, Tracer
+from engine import AgentLoop
+from tools import DataManager, PopulationSnapshot, export_population, refresh_population
+from tools.population import COLUMNS, _day_number, write_snapshot
+from tools.time_index import to_micros
+from benchmarks.synthetic import DOMAINS, make_user
+
+
+def mismatches(manager: DataManager, snapshot: PopulationSnapshot) -> int:
+    agent = FeedbackAgent(Tracer())
+    rows = {user_id: i for i, user_id in enumerate(snapshot.user_ids())}
+    consistency = snapshot.consistency_rate()
+    streak = snapshot.streak()
+    bad = 0
+    for user_id in manager.backend.user_ids():
+        user_data = manager.load_user_data(user_id)
+        observed = agent.observe_task_completion(user_data)
+        agent.observation_log.clear()
+        i = rows[user_id]
+        plan = user_data["current_plan"]
+        expected = (
+            observed["completed_workouts"],
+            observed["skipped_workouts"],
+            observed["pending_workouts"],
+            observed["consistency_rate"],
+            observed["current_streak"],
+            observed["domain"],
+            plan.get("week_number"),
+            plan.get("adaptation_count"),
+        )
+        actual = (
+            snapshot["completed"][i],
+            snapshot["skipped"][i],
+            snapshot["pending"][i],
+            consistency[i],
+            streak[i],
+            snapshot.labels["domain"][snapshot["domain"][i]],
+            snapshot["week_number"][i],
+            snapshot["adaptation_count"][i],
+        )
+        bad += expected != actual
+    return bad
+
+
+def store_benchmark(args, tmp: Path) -> int:
+    manager = DataManager(str(tmp / "store"), backend="sharded")
+    loop = AgentLoop(manager)
+    rng = random.Random(0)
+    for u in range(args.store_users):
+        manager.save_user_data(make_user(f"user_{u}", rng, args.history), f"user_{u}")
+
+    agent = FeedbackAgent(Tracer())
+    started = time.perf_counter()
+    for user_id in manager.backend.user_ids():
+        agent.observe_task_completion(manager.load_user_data(user_id))
+        agent.observation_log.clear()
+    naive_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    snapshot = export_population(manager, tmp / "population")
+    export_s = time.perf_counter() - started
+    bad = mismatches(manager, snapshot)
+
+    changed = rng.sample(range(args.store_users), args.changed)
+    for u in changed:
+        user_id = f"user_{u}"
+        manager.save_user_data(loop.run_iteration(manager.load_user_data(user_id), rng), user_id)
+    loop.clear_logs()
+    time.sleep(0.01)
+    started = time.perf_counter()
+    result = refresh_population(manager, tmp / "population")
+    refresh_s = time.perf_counter() - started
+    bad_after = mismatches(manager, PopulationSnapshot(tmp / "population"))
+    manager.close()
+
+    per_user_ms = naive_s / args.store_users * 1e3
+    print(f"{args.store_users} stored users, {args.history} past workouts each")
+    print(f"  load + observe every user   {naive_s:8.2f}s  ({per_user_ms:.3f} ms/user)")
+    print(f"  full export                 {export_s:8.2f}s")
+    print(f"  refresh, {args.changed} changed         {refresh_s:8.2f}s  (re-read {result['reread']})")
+    if bad or bad_after or result["reread"] != args.changed:
+        print(f"MISMATCH: {bad} rows after export, {bad_after} after refresh, re-read {result['reread']}/{args.changed}")
+        return -1
+    return per_user_ms
+
+
+def synthetic_snapshot(rows: int, path: Path) -> None:
+    rng = np.random.default_rng(0)
+    today = _day_number(datetime.now().date())
+    columns = {name: np.zeros(rows, dtype=dtype) for name, dtype in COLUMNS.items()}
+    columns["domain"][:] = rng.integers(0, len(DOMAINS), rows)
+    columns["fitness_level"][:] = rng.integers(0, 3, rows)
+    columns["has_plan"][:] = 1
+    columns["week_number"][:] = rng.integers(1, 9, rows)
+    columns["adaptation_count"][:] = rng.integers(0, 5, rows)
+    columns["tasks"][:] = rng.integers(2, 6, rows)
+    columns["completed"][:] = rng.integers(0, columns["tasks"] + 1)
+    columns["skipped"][:] = rng.integers(0, columns["tasks"] - columns["completed"] + 1)
+    columns["pending"][:] = columns["tasks"] - columns["completed"] - columns["skipped"]
+    columns["workout_count"][:] = rng.integers(0, 1000, rows)
+    columns["streak_day"][:] = today - rng.integers(0, 3, rows)
+    columns["streak_run"][:] = rng.integers(1, 30, rows)
+    now = to_micros(datetime.now())
+    columns["last_activity"][:] = now - rng.integers(0, 30 * 86400 * 10**6, rows)
+    labels = {"domain": DOMAINS, "fitness_level": ["beginner", "intermediate", "advanced"]}
+    write_snapshot(path, [f"user_{i}" for i in range(rows)], columns, labels)
+
+
+def _ms(op, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        op()
+        best = min(best, time.perf_counter() - started)
+    return best * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store-users", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=100)
+    parser.add_argument("--changed", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        per_user_ms = store_benchmark(args, tmp)
+
+        started = time.perf_counter()
+        synthetic_snapshot(args.rows, tmp / "synthetic")
+        write_s = time.perf_counter() - started
+        snapshot = PopulationSnapshot(tmp / "synthetic")
+        week_start = datetime.now().date() - timedelta(days=datetime.now().weekday())
+        queries = {
+            "open snapshot": lambda: PopulationSnapshot(tmp / "synthetic")["domain"],
+            "nutrition consistency, this week": lambda: snapshot.mean(
+                "consistency_rate", snapshot.where(domain="nutrition", active_since=week_start)
+            ),
+            "consistency by domain": lambda: snapshot.group_by("domain", "consistency_rate"),
+            "streak p90, week >= 4": lambda: np.percentile(
+                snapshot.streak()[snapshot.where(week_number=[4, 5, 6, 7, 8])], 90
+            ),
+            "adaptations by week_number": lambda: snapshot.group_by("week_number", "adaptation_count"),
+        }
+        print(f"{args.rows} snapshot rows (written in {write_s:.2f}s)")
+        for name, query in queries.items():
+            print(f"  {name:<36} {_ms(query):8.2f} ms")
+        if per_user_ms > 0:
+            print(f"  load + observe, extrapolated         {per_user_ms * args.rows / 1e3:8.0f} s")
+    if per_user_ms < 0:
+        sys.exit(1)
+    print("Snapshot OK: every row matches the loaded user, after export and after refresh")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Policy replay: parity against the dict-based agents, then throughput on a stored population.
+
+The parity check replays users under the baseline rules through replay_users and through
+the agents themselves. The agents run one iteration at a time, and each user draws from its
+own random.Random(f"{seed}:{user_id}") only when it acts. Every counter must match, and the
+final consistency must match to rounding. Exits non-zero on any mismatch before
+benchmarking. Then a sharded store of `--users` users is replayed under `--policies`
+candidate policies, once per `--workers` count. The reports must not depend on the worker
+count.
+
+Usage: python -m benchmarks.bench_replay [--parity-users 300] [--users 10000] [--policies 10] [--workers 1 2 4]
+"""
+import argparse
+import math
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from agents import PlannerAgent, DecisionAgent, FeedbackAgent, Tracer
+from engine import replay_policies
+from engine.cohort import INTERVENTIONS
+from engine.replay import check_policies, completion_rate, replay_users
+from tools import DataManager
+from benchmarks.bench_cohort import _dict_iteration
+from benchmarks.synthetic import make_user
+
+TIMING_KEYS = ("workers", "elapsed_s", "users_per_sec")
+
+
+def candidate_policies(count: int) -> dict:
+    """`count` policies sweeping the adaptation thresholds and limits."""
+    rng = random.Random(0)
+    return {
+        f"policy_{i}": {
+            "low_consistency": round(rng.uniform(0.3, 0.6), 2),
+            "high_consistency": round(rng.uniform(0.7, 0.9), 2),
+            "max_adaptations": rng.randint(3, 8),
+            "min_tasks_hard": rng.randint(2, 4),
+        }
+        for i in range(count)
+    }
+
+
+def check_parity(n_users: int, iterations: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    tracer = Tracer()
+    planner, decision_agent, feedback_agent = PlannerAgent(tracer), DecisionAgent(tracer), FeedbackAgent(tracer)
+    users = [make_user(f"user_{i}", rng, history=rng.randint(0, 12), planner=planner) for i in range(n_users)]
+    for user_data in users:
+        # Spread plans over the escalation and max-adaptation boundaries.
+        user_data["current_plan"]["week_number"] = rng.randint(1, 9)
+        user_data["current_plan"]["adaptation_count"] = rng.randint(0, 5)
+    replayed = replay_users([(u["user_id"], u) for u in users], check_policies({}), iterations, seed)["baseline"]
+
+    expected = {
+        "users": n_users,
+        "actions": 0,
+        "adaptations": 0,
+        "adapted_users": 0,
+        "escalations": 0,
+        "escalated_users": 0,
+        "consistency_sum": 0.0,
+        "interventions": [0] * len(INTERVENTIONS),
+    }
+    for user_data in users:
+        stream = random.Random(f"{seed}:{user_data['user_id']}")
+        rate = completion_rate(user_data)
+        adapted = escalated = False
+        for _ in range(iterations):
+            plan = user_data.get("current_plan")
+            acts = not plan or any(t.get("status") == "pending" for t in plan["weekly_schedule"])
+            draw = (0.0 if stream.random() < rate else 1.0) if acts else 1.0
+            feedback, adapted_now, intervention, escalated_now, _ = _dict_iteration(
+                user_data, draw, planner, decision_agent, feedback_agent
+            )
+            expected["actions"] += acts
+            expected["adaptations"] += adapted_now
+            expected["escalations"] += escalated_now
+            expected["interventions"][INTERVENTIONS.index(intervention)] += 1
+            adapted |= adapted_now
+            escalated |= escalated_now
+        expected["adapted_users"] += adapted
+        expected["escalated_users"] += escalated
+        expected["consistency_sum"] += feedback["consistency_rate"]
+        planner.reasoning_log.clear()
+        decision_agent.decision_log.clear()
+        feedback_agent.observation_log.clear()
+
+    mismatches = []
+    for key, value in expected.items():
+        same = math.isclose(value, replayed[key]) if key == "consistency_sum" else value == replayed[key]
+        if not same:
+            mismatches.append({"field": key, "dict": value, "replay": replayed[key]})
+    return mismatches
+
+
+def build_store(data_dir: Path, users: int, history: int, seed: int) -> None:
+    manager = DataManager(str(data_dir), backend="sharded")
+    rng = random.Random(seed)
+    planner = PlannerAgent(Tracer())
+    for u in range(users):
+        user_data = make_user(f"user_{u}", rng, history, planner)
+        user_data["current_plan"]["week_number"] = rng.randint(1, 9)
+        manager.save_user_data(user_data, f"user_{u}")
+    manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--parity-users", type=int, default=300)
+    parser.add_argument("--parity-iterations", type=int, default=12)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--history", type=int, default=30)
+    parser.add_argument("--policies", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    mismatches = check_parity(args.parity_users, args.parity_iterations)
+    if mismatches:
+        print(f"PARITY FAILED: {len(mismatches)} mismatches, first: {mismatches[0]}")
+        sys.exit(1)
+    print(f"Parity OK: {args.parity_users} users x {args.parity_iterations} iterations")
+
+    policies = candidate_policies(args.policies)
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        build_store(Path(tmp), args.users, args.history, seed=1)
+        print(f"Built a store of {args.users} users in {time.perf_counter() - started:.1f}s")
+        reference = None
+        for workers in args.workers:
+            report = replay_policies(
+                policies, tmp, backend="sharded", iterations=args.iterations, seed=7, workers=workers
+            )
+            per_100k = 1e5 / report["users_per_sec"] / 60
+            print(
+                f"  {workers:>2} workers: {report['elapsed_s']:7.2f}s, {report['users_per_sec']:8.0f} users/sec "
+                f"x {len(report['policies'])} policies ({per_100k:.1f} min per 100k users)"
+            )
+            stats = {k: v for k, v in report.items() if k not in TIMING_KEYS}
+            if reference is None:
+                reference = stats
+            elif stats != reference:
+                print(f"MISMATCH: the report with {workers} workers differs from {args.workers[0]} workers")
+                sys.exit(1)
+    print("Replay OK: reports are identical for every worker count")
+
+
+if __name__ == "__main__":
+    main()
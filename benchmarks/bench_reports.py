@@ -0,0 +1,134 @@
+"""
+Report rendering: FitnessTools.write_reports throughput vs rendering one user at a time.
+
+A pool of `--pool` synthetic users (all domains, mixed task statuses) is cycled under
+`--users` distinct IDs. First every pool user's format_plan_display must equal the
+previous `+=` implementation, kept below, and every JSON report must parse back to the
+plan's tasks; exits non-zero otherwise. Then `--users` reports are streamed to a file in
+each format, next to rendering each user from scratch: the previous text rendering, and
+one json.dumps per user. calculate_progress costs the same on both sides, so the plan
+rendering alone is timed first.
+
+Usage: python -m benchmarks.bench_reports [--users 100000] [--pool 1000] [--history 30]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from tools import FitnessTools
+from tools.fitness_tools import REPORT_FORMATS, _task_line_cache
+from benchmarks.synthetic import make_user
+
+
+def concat_plan_display(plan) -> str:
+    """format_plan_display as it was: `+=` per line, status icon chain per task."""
+    if not plan:
+        return "No plan available"
+    goal = plan.get("goal", {})
+    schedule = plan.get("weekly_schedule", [])
+    output = "\n=== PLAN ===\n"
+    output += f"Goal: {goal.get('description', 'N/A')}\n"
+    output += f"Week: {plan.get('week_number', 1)}\n\nSchedule:\n"
+    for task in schedule:
+        status_icon = "✓" if task.get("status") == "completed" else "○" if task.get("status") == "skipped" else "□"
+        label = task.get("type", "task")
+        detail = task.get("practice") or task.get("task") or ", ".join(task.get("items", [])) or ""
+        duration = ""
+        if "duration_minutes" in task:
+            duration = f" ({task.get('duration_minutes', 0)} min, {task.get('intensity', 'N/A')})"
+        output += f"  {status_icon} {task.get('day', 'N/A')}: {label} {detail}{duration}\n"
+    return output
+
+
+def check(pool) -> int:
+    bad = 0
+    for user_id, user_data in pool:
+        plan = user_data["current_plan"]
+        bad += FitnessTools.format_plan_display(plan) != concat_plan_display(plan)
+        report = json.loads(FitnessTools.render_report(user_data, user_id, "json"))
+        tasks = [(t["day"], t["status"], t["duration_minutes"]) for t in report["tasks"]]
+        bad += tasks != [(t["day"], t["status"], t.get("duration_minutes")) for t in plan["weekly_schedule"]]
+    bad += FitnessTools.format_plan_display(None) != concat_plan_display(None)
+    return bad
+
+
+def text_from_scratch(users, out) -> None:
+    for user_id, user_data in users:
+        progress = FitnessTools.calculate_progress(user_data)
+        out.write(f"=== USER {user_id} ===")
+        out.write(concat_plan_display(user_data["current_plan"]))
+        out.write(f"Progress: {progress['message']} ({progress['progress_percent']:.1f}%)\n\n")
+
+
+def json_from_scratch(users, out) -> None:
+    for user_id, user_data in users:
+        plan = user_data["current_plan"]
+        report = {
+            "user_id": user_id,
+            "goal": plan["goal"].get("description"),
+            "week_number": plan.get("week_number", 1),
+            "progress": FitnessTools.calculate_progress(user_data),
+            "tasks": plan["weekly_schedule"],
+        }
+        out.write(json.dumps(report, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--pool", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = [(f"user_{i}", make_user(f"user_{i}", rng, args.history)) for i in range(args.pool)]
+    for _, user_data in pool:
+        user_data["current_plan"]["week_number"] = rng.randint(1, 8)
+    bad = check(pool)
+    if bad:
+        print(f"MISMATCH: {bad} rendered plans or JSON reports differ from the plan")
+        sys.exit(1)
+    print(f"Render OK: {args.pool} plans match the previous output, JSON reports parse back")
+
+    def users():
+        for i, (_, user_data) in zip(range(args.users), itertools.cycle(pool)):
+            yield f"user_{i}", user_data
+
+    plans = [user_data["current_plan"] for _, user_data in pool]
+    print(f"{args.users} plans")
+    renderers = (("+= per line", concat_plan_display), ("format_plan_display", FitnessTools.format_plan_display))
+    for name, render in renderers:
+        started = time.perf_counter()
+        for _, plan in zip(range(args.users), itertools.cycle(plans)):
+            render(plan)
+        elapsed = time.perf_counter() - started
+        print(f"  {name:<24} {elapsed:7.2f}s  {args.users / elapsed:9.0f} plans/sec")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reports")
+        print(f"{args.users} users, {args.history} past workouts each")
+        for name, write in (("text, from scratch", text_from_scratch), ("json, from scratch", json_from_scratch)):
+            started = time.perf_counter()
+            with open(path, "w", encoding="utf-8") as f:
+                write(users(), f)
+            elapsed = time.perf_counter() - started
+            print(f"  {name:<24} {elapsed:7.2f}s  {args.users / elapsed:9.0f} users/sec")
+        for fmt in REPORT_FORMATS:
+            _task_line_cache.clear()
+            started = time.perf_counter()
+            count = FitnessTools.write_reports(users(), path, fmt)
+            elapsed = time.perf_counter() - started
+            size = os.path.getsize(path) / 2**20
+            print(
+                f"  {'write_reports ' + fmt:<24} {elapsed:7.2f}s  {count / elapsed:9.0f} users/sec  "
+                f"{size:7.1f} MB, {len(_task_line_cache)} distinct task lines"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Plan-week rollover: correctness over simulated weeks, then tick cost vs population size.
+
+A sharded store of `--users` users gets plans created at random times over the past
+`--weeks` weeks. The schedule is built once (RolloverScheduler.init). Then the clock
+advances in `--step-hours` steps over `--weeks` more weeks. Each tick uses a fresh
+DataManager and scheduler, as after a restart. Every tick must process exactly the users
+whose boundary it crossed. At the end, every user's week_number, archived weeks and
+pending statuses must match their plan's age. Exits non-zero otherwise. Then, for each
+of `--sizes` users, a store with `--due` users due is ticked once. Its time should not
+grow with the store.
+
+Usage: python -m benchmarks.bench_rollover [--users 2000] [--weeks 4] [--sizes 1000 4000 16000] [--due 100]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from agents import PlannerAgent, Tracer
+from tools import DataManager, RolloverScheduler
+from tools.rollover import WEEK_US, week_due
+from tools.time_index import to_micros
+from benchmarks.synthetic import make_user
+
+WEEK = timedelta(weeks=1)
+
+
+def build_store(data_dir: Path, created: list, seed: int) -> None:
+    """One user per plan creation time in `created`, with random task statuses."""
+    manager = DataManager(str(data_dir), backend="sharded")
+    rng = random.Random(seed)
+    planner = PlannerAgent(Tracer())
+    for u, created_at in enumerate(created):
+        user_data = make_user(f"user_{u}", rng, history=0, planner=planner)
+        user_data["current_plan"]["created_at"] = created_at.isoformat()
+        manager.save_user_data(user_data, f"user_{u}")
+    manager.close()
+
+
+def weeks_elapsed(created_at: datetime, now: datetime) -> int:
+    return (to_micros(now) - to_micros(created_at)) // WEEK_US
+
+
+def simulate(args, tmp: Path) -> int:
+    rng = random.Random(0)
+    start = datetime(2026, 1, 5, 9, 30)
+    created = [start - timedelta(seconds=rng.uniform(0, args.weeks * WEEK.total_seconds())) for _ in range(args.users)]
+    build_store(tmp, created, seed=0)
+    with DataManager(str(tmp), backend="sharded") as manager:
+        started = time.perf_counter()
+        RolloverScheduler.init(manager)
+        init_s = time.perf_counter() - started
+
+    bad = 0
+    ticks = due = 0
+    tick_s = 0.0
+    now = start
+    end = start + args.weeks * WEEK
+    while now < end:
+        previous, now = now, now + timedelta(hours=args.step_hours)
+        crossed = sum(weeks_elapsed(c, now) > weeks_elapsed(c, previous) for c in created)
+        with DataManager(str(tmp), backend="sharded") as manager:
+            started = time.perf_counter()
+            result = RolloverScheduler(manager).tick(now)
+            tick_s += time.perf_counter() - started
+        ticks += 1
+        due += result["due"]
+        if ticks == 1:
+            # The first tick catches up every plan older than a week.
+            bad += result["weeks"] != sum(weeks_elapsed(c, now) for c in created)
+        else:
+            bad += result["due"] != crossed or result["rolled"] != crossed
+
+    with DataManager(str(tmp), backend="sharded") as manager:
+        for u, created_at in enumerate(created):
+            user_data = manager.load_user_data(f"user_{u}")
+            plan = user_data["current_plan"]
+            elapsed = weeks_elapsed(created_at, now)
+            history = user_data.get("week_history", [])
+            expected_ends = [(created_at + (n + 1) * WEEK).isoformat() for n in range(elapsed)]
+            bad += plan["week_number"] != elapsed + 1
+            bad += [w["ended_at"] for w in history] != expected_ends
+            bad += [w["week_number"] for w in history] != list(range(1, elapsed + 1))
+            bad += bool(elapsed) and any(t["status"] != "pending" for t in plan["weekly_schedule"])
+            bad += week_due(plan) <= to_micros(now)
+    print(f"{args.users} users over {args.weeks} weeks, {ticks} ticks {args.step_hours}h apart")
+    print(f"  init (one full scan)     {init_s:8.2f}s")
+    print(f"  ticks                    {tick_s:8.2f}s  ({due} users due, {tick_s / max(1, due) * 1e3:.2f} ms per due user)")
+    return bad
+
+
+def tick_cost(size: int, due: int, tmp: Path) -> float:
+    now = datetime(2026, 1, 5, 9, 30)
+    rng = random.Random(size)
+    # `due` users crossed a boundary in the last hour; the others' boundaries are spread over the next week.
+    created = [now - WEEK - timedelta(seconds=rng.uniform(0, 3600)) for _ in range(due)]
+    created += [now - timedelta(seconds=rng.uniform(0, WEEK.total_seconds() - 3600)) for _ in range(size - due)]
+    build_store(tmp, created, seed=size)
+    with DataManager(str(tmp), backend="sharded") as manager:
+        RolloverScheduler.init(manager)
+    with DataManager(str(tmp), backend="sharded") as manager:
+        started = time.perf_counter()
+        result = RolloverScheduler(manager).tick(now)
+        elapsed = time.perf_counter() - started
+    if result["rolled"] != due:
+        print(f"MISMATCH: {result['rolled']} users rolled over, expected {due}")
+        sys.exit(1)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--step-hours", type=int, default=6)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--due", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bad = simulate(args, Path(tmp))
+    if bad:
+        print(f"MISMATCH: {bad} ticks or users differ from the plans' ages")
+        sys.exit(1)
+    print("Rollover OK: every tick processed exactly the users it crossed, every week is archived")
+
+    print(f"One tick with {args.due} users due")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            elapsed = tick_cost(size, args.due, Path(tmp))
+        print(f"  {size:>8} users   {elapsed * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Storage benchmark: JSON single-file backend vs SQLite backend.
+
+Usage: python -m benchmarks.bench_storage [--sizes 1000 10000 100000] [--ops 50] [--json-ops 5]
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from tools import DataManager, migrate_json_to_sqlite
+from benchmarks.synthetic import make_population
+
+
+def _time_ops(manager: DataManager, user_ids, ops: int) -> dict:
+    rng = random.Random(1)
+    sample = [rng.choice(user_ids) for _ in range(ops)]
+
+    start = time.perf_counter()
+    records = [manager.load_user_data(uid) for uid in sample]
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for uid, record in zip(sample, records):
+        record["workouts"].append({"day": "Monday", "type": "Cardio", "status": "completed", "date": "2026-01-01"})
+        manager.save_user_data(record, uid)
+    save_s = time.perf_counter() - start
+    return {"load_ms": load_s / ops * 1000, "save_ms": save_s / ops * 1000}
+
+
+def run(sizes, ops: int, json_ops: int) -> list:
+    results = []
+    for size in sizes:
+        population = make_population(size)
+        user_ids = list(population)
+        with tempfile.TemporaryDirectory() as tmp:
+            json_dir = Path(tmp) / "json"
+            json_dir.mkdir()
+            with open(json_dir / "user_data.json", "w") as f:
+                json.dump(population, f, indent=2)
+
+            sqlite_dir = Path(tmp) / "sqlite"
+            sqlite_dir.mkdir()
+            start = time.perf_counter()
+            migrate_json_to_sqlite(str(json_dir / "user_data.json"), str(sqlite_dir / "user_data.db"))
+            migrate_s = time.perf_counter() - start
+
+            # The JSON backend rewrites the whole file per save, so it gets fewer ops at large sizes.
+            for backend, data_dir, n in (("json", json_dir, json_ops), ("sqlite", sqlite_dir, ops)):
+                manager = DataManager(str(data_dir), backend=backend)
+                timings = _time_ops(manager, user_ids, n)
+                manager.close()
+                results.append({"users": size, "backend": backend, **timings})
+            results[-1]["migrate_s"] = migrate_s
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--ops", type=int, default=50)
+    parser.add_argument("--json-ops", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'backend':>8} {'load ms':>10} {'save ms':>10}")
+    for r in run(args.sizes, args.ops, args.json_ops):
+        print(f"{r['users']:>8} {r['backend']:>8} {r['load_ms']:>10.3f} {r['save_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
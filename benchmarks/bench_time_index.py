@@ -0,0 +1,125 @@
+"""
+Windowed consistency queries: TimeIndex (bisect + prefix counts) vs scanning the history.
+
+Checks index results against a plain scan on randomized histories (back-dated appends,
+in-place edits, malformed dates), then times 7/30/90-day windows plus a 12-week rollup
+on long histories. Exits non-zero on mismatch.
+
+Usage: python -m benchmarks.bench_time_index [--lengths 10000 100000 1000000] [--queries 200] [--scan-calls 3]
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from tools import WorkoutHistory, time_index
+from tools.time_index import to_micros
+from benchmarks.synthetic import make_workouts
+
+
+def _scan_counts(workouts, start, end) -> dict:
+    """The straightforward way: parse every date and filter."""
+    lo, hi = to_micros(start), to_micros(end)
+    total = completed = skipped = 0
+    for w in workouts:
+        ts = to_micros(w.get("date", ""))
+        if ts is not None and lo <= ts < hi:
+            total += 1
+            completed += w.get("status") == "completed"
+            skipped += w.get("status") == "skipped"
+    return {"total": total, "completed": completed, "skipped": skipped, "completion_rate": completed / total if total else 0}
+
+
+def _scan_windows(workouts, now, days=(7, 30, 90)) -> dict:
+    today = now.date()
+    return {
+        f"{d}d": {**_scan_counts(workouts, today - timedelta(days=d - 1), today + timedelta(days=1)), "days": d}
+        for d in days
+    }
+
+
+def _scan_weekly(workouts, now, weeks) -> list:
+    monday = now.date() - timedelta(days=now.weekday())
+    starts = [monday - timedelta(weeks=k) for k in range(weeks - 1, -1, -1)]
+    return [{**_scan_counts(workouts, s, s + timedelta(weeks=1)), "week_start": s.isoformat()} for s in starts]
+
+
+def check_parity(histories: int = 100, steps: int = 80, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    now = datetime.now()
+    mismatches = []
+    for h in range(histories):
+        workouts = WorkoutHistory(make_workouts(rng, rng.randint(0, 60)))
+        for step in range(steps):
+            roll = rng.random()
+            if roll < 0.75:
+                date = now - timedelta(days=rng.choice([0, 0, 1, 2, rng.randint(3, 120)]), minutes=rng.randint(0, 600))
+                date_str = date.isoformat() if rng.random() > 0.05 else rng.choice(["bad", date.date().isoformat()])
+                workouts.append({"day": "Monday", "type": "x", "status": rng.choice(["completed", "skipped"]), "date": date_str})
+            elif roll < 0.9 and len(workouts):
+                workouts[rng.randrange(len(workouts))]["status"] = rng.choice(["completed", "skipped", "pending"])
+            elif len(workouts):
+                del workouts[rng.randrange(len(workouts))]
+
+            index = time_index(workouts)
+            actual = (index.windows(now=now), index.weekly(12, now=now))
+            expected = (_scan_windows(workouts, now), _scan_weekly(workouts, now, 12))
+            if actual != expected:
+                mismatches.append({"history": h, "step": step, "index": actual, "scan": expected})
+    return mismatches
+
+
+def bench(lengths, queries: int, scan_calls: int) -> list:
+    rng = random.Random(1)
+    now = datetime.now()
+    results = []
+    for length in lengths:
+        # A few entries per day so long histories stay inside datetime's range.
+        end = now - timedelta(days=length // 4)
+        workouts = WorkoutHistory(make_workouts(rng, min(length, 3 * 365), end=end))
+        while len(workouts) < length:
+            chunk_end = now - timedelta(days=rng.randint(0, length // 4))
+            workouts.extend(make_workouts(rng, min(length - len(workouts), 3 * 365), end=chunk_end))
+
+        started = time.perf_counter()
+        for _ in range(scan_calls):
+            _scan_windows(workouts, now)
+            _scan_weekly(workouts, now, 12)
+        scan_ms = (time.perf_counter() - started) / scan_calls * 1e3
+
+        started = time.perf_counter()
+        time_index(workouts)
+        build_ms = (time.perf_counter() - started) * 1e3
+
+        started = time.perf_counter()
+        for _ in range(queries):
+            workouts.append({"day": "Monday", "type": "Cardio", "status": "completed", "date": now.isoformat()})
+            index = time_index(workouts)
+            index.windows(now=now)
+            index.weekly(12, now=now)
+        query_us = (time.perf_counter() - started) / queries * 1e6
+        results.append({"history": length, "scan_ms": scan_ms, "build_ms": build_ms, "append_and_query_us": query_us})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-calls", type=int, default=3)
+    args = parser.parse_args()
+
+    mismatches = check_parity()
+    if mismatches:
+        print(f"PARITY FAILED: {len(mismatches)} mismatches, first: {mismatches[0]}")
+        sys.exit(1)
+    print("Parity OK: time index matches full scans")
+
+    print(f"{'history':>9} {'scan ms':>10} {'index build ms':>15} {'append+query us':>16}")
+    for r in bench(args.lengths, args.queries, args.scan_calls):
+        print(f"{r['history']:>9} {r['scan_ms']:>10.1f} {r['build_ms']:>15.1f} {r['append_and_query_us']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Tracing overhead: per-call cost of agent methods with console narration vs tracing off.
+
+"console" writes the same lines the agents used to print() (to /dev/null, so terminal
+speed does not dominate); "memory" keeps structured events; "off" is a disabled tracer.
+
+Usage: python -m benchmarks.bench_tracing [--calls 20000]
+"""
+import argparse
+import os
+import random
+import time
+
+from agents import PlannerAgent, DecisionAgent, FeedbackAgent, Tracer, ConsoleSink, MemorySink, NullSink
+from benchmarks.synthetic import make_user
+
+
+def _time_calls(tracer: Tracer, user_data: dict, calls: int) -> dict:
+    planner, decision_agent, feedback_agent = PlannerAgent(tracer), DecisionAgent(tracer), FeedbackAgent(tracer)
+    plan = user_data["current_plan"]
+    timings = {}
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        feedback = feedback_agent.aggregate_feedback(user_data)
+    timings["aggregate_feedback"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        decision_agent.should_adapt_plan(feedback, plan)
+        decision_agent.decide_intervention(feedback)
+        decision_agent.should_escalate_goal(plan, feedback)
+    timings["decision_agent"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        planner.identify_goal(user_data["profile"])
+    timings["identify_goal"] = time.perf_counter() - started
+    return {name: elapsed / calls * 1e6 for name, elapsed in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    user_data = make_user("bench", random.Random(0), history=30)
+    with open(os.devnull, "w") as devnull:
+        sinks = {"console": ConsoleSink(devnull), "memory": MemorySink(maxlen=1000), "off": NullSink()}
+        results = {name: _time_calls(Tracer(sink), user_data, args.calls) for name, sink in sinks.items()}
+
+    methods = list(results["off"])
+    print(f"{'sink':>8} " + " ".join(f"{m + ' us':>22}" for m in methods))
+    for name, timings in results.items():
+        print(f"{name:>8} " + " ".join(f"{timings[m]:>22.2f}" for m in methods))
+
+
+if __name__ == "__main__":
+    main()
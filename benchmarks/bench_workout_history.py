@@ -0,0 +1,91 @@
+"""
+Workout history footprint: list of dicts vs WorkoutHistory, in memory and on disk.
+
+Memory is measured with tracemalloc while building each container from fresh entries
+(as create_workout_entry would produce them); disk size is the JSON the file backends
+write (indent=2 list vs compact columnar form).
+
+Usage: python -m benchmarks.bench_workout_history [--sizes 10000 1000000]
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from tools.workout_history import WorkoutHistory, json_default
+from benchmarks.synthetic import DAYS
+
+
+def _entries(rng: random.Random, count: int) -> list:
+    """create_workout_entry-shaped dicts, a few per day so 1M entries stay within datetime range."""
+    end = datetime.now()
+    entries = []
+    for i in range(count):
+        date = end - timedelta(minutes=97 * (count - i), microseconds=rng.randrange(1000000))
+        entries.append(
+            {
+                "day": DAYS[date.weekday()],
+                "type": rng.choice(["Full Body", "Cardio", "Strength", "Flexibility"]),
+                "status": "completed" if rng.random() < 0.7 else "skipped",
+                "date": date.isoformat(),
+            }
+        )
+    return entries
+
+
+def _measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def bench(size: int) -> dict:
+    template = _entries(random.Random(size), size)
+    # Copy the strings so the list owns its entries, as records loaded from disk do.
+    workouts, list_bytes = _measure(lambda: [{k: "".join(v) for k, v in w.items()} for w in template])
+    history, history_bytes = _measure(lambda: WorkoutHistory(template))
+    assert history == workouts
+
+    started = time.perf_counter()
+    WorkoutHistory(template)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    completed = sum(1 for w in history if w.get("status") == "completed")
+    iterate_s = time.perf_counter() - started
+    assert completed == sum(1 for w in workouts if w.get("status") == "completed")
+
+    list_disk = len(json.dumps(workouts, indent=2))
+    history_disk = len(json.dumps(history, indent=2, default=json_default))
+    return {
+        "entries": size,
+        "list_mem_mb": list_bytes / 1e6,
+        "history_mem_mb": history_bytes / 1e6,
+        "list_disk_mb": list_disk / 1e6,
+        "history_disk_mb": history_disk / 1e6,
+        "build_s": build_s,
+        "iterate_s": iterate_s,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'entries':>9} {'list MB':>9} {'columnar MB':>12} {'list disk MB':>13} {'columnar disk MB':>17}"
+          f" {'build s':>8} {'iterate s':>10}")
+    for size in args.sizes:
+        r = bench(size)
+        print(f"{r['entries']:>9} {r['list_mem_mb']:>9.2f} {r['history_mem_mb']:>12.2f} {r['list_disk_mb']:>13.2f}"
+              f" {r['history_disk_mb']:>17.2f} {r['build_s']:>8.2f} {r['iterate_s']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
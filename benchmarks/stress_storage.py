@@ -0,0 +1,79 @@
+"""
+Concurrency stress check for the storage backends.
+
+Spawns many processes that append workouts to their own user (disjoint) and to a
+small set of shared users (overlapping) through DataManager.update_user_data,
+then verifies that every single append survived. Exits non-zero on lost updates.
+
+Usage: python -m benchmarks.stress_storage [--backend sharded] [--procs 16] [--writes 50]
+"""
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+
+from tools import DataManager
+
+SHARED_USERS = ["shared_0", "shared_1", "shared_2"]
+
+
+def _append(manager: DataManager, tag: str):
+    def mutator(user_data):
+        # Through DataManager, so event-sourced backends see the change as an event.
+        return manager.add_workout(user_data, {"day": "Monday", "type": "Stress", "status": "completed", "date": tag})
+
+    return mutator
+
+
+def _worker(data_dir: str, backend: str, proc: int, writes: int) -> None:
+    manager = DataManager(data_dir, backend=backend)
+    for i in range(writes):
+        manager.update_user_data(_append(manager, f"p{proc}-{i}"), f"own_{proc}")
+        manager.update_user_data(_append(manager, f"p{proc}-{i}"), SHARED_USERS[i % len(SHARED_USERS)])
+    manager.close()
+
+
+def run(backend: str, procs: int, writes: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        workers = [
+            multiprocessing.Process(target=_worker, args=(tmp, backend, p, writes)) for p in range(procs)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+
+        manager = DataManager(tmp, backend=backend)
+        lost = 0
+        for p in range(procs):
+            tags = {w["date"] for w in manager.load_user_data(f"own_{p}")["workouts"]}
+            lost += sum(1 for i in range(writes) if f"p{p}-{i}" not in tags)
+        shared_tags = set()
+        for user_id in SHARED_USERS:
+            shared_tags.update(w["date"] for w in manager.load_user_data(user_id)["workouts"])
+        lost += procs * writes - len(shared_tags)
+        manager.close()
+
+    return {"backend": backend, "writes": procs * writes * 2, "lost": lost, "elapsed_s": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default="sharded", choices=["json", "sharded", "sqlite", "events"])
+    parser.add_argument("--procs", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=50)
+    args = parser.parse_args()
+
+    result = run(args.backend, args.procs, args.writes)
+    print(
+        f"{result['backend']}: {result['writes']} writes in {result['elapsed_s']:.2f}s "
+        f"({result['writes'] / result['elapsed_s']:.0f}/s), lost updates: {result['lost']}"
+    )
+    sys.exit(1 if result["lost"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Benchmark suite: storage, agents and the full loop, as JSON results comparable across commits.
+
+Every case times one operation at a fixed input size (timeit-style: calibrated loop count,
+median over rounds), so results from two commits run with the same arguments line up by
+case name. `--output` writes them as JSON; `--baseline` compares against an earlier file and
+exits non-zero when a case got slower than its threshold allows. Thresholds are allowed
+slowdowns (0.25 = 25% slower), matched by fnmatch pattern against case names; the most
+specific (longest) matching pattern wins. Defaults come from benchmarks/thresholds.json.
+
+Cases:
+  storage.<backend>.load/save[users=N]   DataManager round trips over a population, no cache
+  feedback.aggregate_feedback[history=N] steady-state observation (incremental feedback state)
+  feedback.calculate_streak[history=N]   FeedbackAgent._calculate_streak over the full history
+  planner.create_plan / adapt_plan       random profiles / random feedback
+  decision.should_adapt_plan / decide_intervention / should_escalate_goal
+  loop.run_iteration[history=N]          one headless PAOA iteration, users cycled
+
+Usage: python -m benchmarks.suite [--output results.json] [--baseline previous.json]
+       [--threshold 0.25] [--thresholds benchmarks/thresholds.json] [--filter 'feedback.*']
+       [--users 2000] [--histories 100 1000 10000] [--backends sharded sqlite] [--metrics] [--quick]
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterator, Optional, Tuple
+
+from agents import DecisionAgent, FeedbackAgent, PlannerAgent, Tracer
+from engine import AgentLoop
+from tools import DataManager, get_default_metrics
+from tools.workout_history import attach
+from benchmarks.synthetic import make_decision_case, make_population, make_profile, make_user, make_workouts
+
+THRESHOLDS_FILE = Path(__file__).with_name("thresholds.json")
+Case = Tuple[str, Callable[[], Any]]
+
+
+def _cycle(items: list) -> Callable[[], Any]:
+    """Zero-argument callable returning the items round-robin."""
+    state = {"i": -1}
+
+    def next_item():
+        state["i"] = (state["i"] + 1) % len(items)
+        return items[state["i"]]
+
+    return next_item
+
+
+# Cases: generators of (name, zero-argument operation); setup happens outside the timed calls.
+def storage_cases(args, tmp: Path) -> Iterator[Case]:
+    population = make_population(args.users, seed=0, history=args.record_history)
+    user_ids = list(population)
+    for backend in args.backends:
+        manager = DataManager(str(tmp / backend), backend=backend)
+        for user_id, user_data in population.items():
+            manager.save_user_data(user_data, user_id)
+        pick = _cycle(random.Random(1).sample(user_ids, len(user_ids)))
+        yield f"storage.{backend}.load[users={args.users}]", lambda: manager.load_user_data(pick())
+        records = _cycle([(user_id, manager.load_user_data(user_id)) for user_id in user_ids[:100]])
+        yield f"storage.{backend}.save[users={args.users}]", lambda: manager.save_user_data(*records()[::-1])
+        manager.close()
+
+
+def feedback_cases(args, tmp: Path) -> Iterator[Case]:
+    agent = FeedbackAgent(Tracer())
+    rng = random.Random(2)
+    for history in args.histories:
+        user_data = attach(make_user("bench", rng, history))
+        agent.aggregate_feedback(user_data)  # build the incremental state once
+        yield f"feedback.aggregate_feedback[history={history}]", lambda u=user_data: agent.aggregate_feedback(u)
+        workouts = make_workouts(rng, history)
+        yield f"feedback.calculate_streak[history={history}]", lambda w=workouts: agent._calculate_streak(w)
+        agent.observation_log.clear()
+
+
+def planner_cases(args, tmp: Path) -> Iterator[Case]:
+    planner = PlannerAgent(Tracer())
+    rng = random.Random(3)
+    profiles = _cycle([(planner.identify_goal(p), p) for p in (make_profile(rng) for _ in range(200))])
+    yield "planner.create_plan", lambda: planner.create_plan(*profiles())
+    plans = [planner.create_plan(*profiles()) for _ in range(200)]
+    pairs = _cycle([(plan, make_decision_case(rng)[0]) for plan in plans])
+    yield "planner.adapt_plan", lambda: planner.adapt_plan(*pairs())
+
+
+def decision_cases(args, tmp: Path) -> Iterator[Case]:
+    agent = DecisionAgent(Tracer())
+    rng = random.Random(4)
+    cases = _cycle([make_decision_case(rng) for _ in range(1000)])
+    yield "decision.should_adapt_plan", lambda: agent.should_adapt_plan(*cases())
+    yield "decision.decide_intervention", lambda: agent.decide_intervention(cases()[0])
+    yield "decision.should_escalate_goal", lambda: agent.should_escalate_goal(*cases()[::-1])
+
+
+def loop_cases(args, tmp: Path) -> Iterator[Case]:
+    manager = DataManager(str(tmp / "loop"), backend="sharded")
+    loop = AgentLoop(manager)
+    rng = random.Random(5)
+    for history in args.histories:
+        users = [attach(make_user(f"user_{u}", rng, history)) for u in range(20)]
+        # The first iteration builds each user's feedback state in O(history); time the steady state.
+        users = [loop.run_iteration(user_data, rng) for user_data in users]
+        loop.clear_logs()
+        pick = _cycle(list(range(len(users))))
+
+        def iteration(users=users, pick=pick):
+            u = pick()
+            users[u] = loop.run_iteration(users[u], rng)
+            loop.clear_logs()
+
+        yield f"loop.run_iteration[history={history}]", iteration
+    manager.close()
+
+
+SUITES = {
+    "storage": storage_cases,
+    "feedback": feedback_cases,
+    "planner": planner_cases,
+    "decision": decision_cases,
+    "loop": loop_cases,
+}
+
+
+def measure(op: Callable[[], Any], rounds: int, min_time: float) -> Dict[str, Any]:
+    timer = timeit.Timer(op)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    per_op = [t / number * 1e6 for t in timer.repeat(rounds, number)]
+    return {
+        "median_us": statistics.median(per_op),
+        "min_us": min(per_op),
+        "stdev_us": statistics.stdev(per_op) if len(per_op) > 1 else 0.0,
+        "number": number,
+        "rounds": rounds,
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for prefix, suite in SUITES.items():
+            # Skip a suite's setup when no filter can match its cases.
+            if args.filter and not any("." not in f or fnmatch.fnmatchcase(prefix, f.split(".")[0]) for f in args.filter):
+                continue
+            for name, op in suite(args, Path(tmp)):
+                if args.filter and not any(fnmatch.fnmatchcase(name, f) for f in args.filter):
+                    continue
+                results[name] = measure(op, args.rounds, args.min_time)
+                print(f"{name:<45} {results[name]['median_us']:>12.2f} us", file=sys.stderr)
+    return results
+
+
+def _commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def threshold_for(name: str, thresholds: Dict[str, float], default: float) -> float:
+    matches = [pattern for pattern in thresholds if fnmatch.fnmatchcase(name, pattern)]
+    return thresholds[max(matches, key=len)] if matches else default
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], thresholds: Dict[str, float], default: float) -> list:
+    """Rows (name, baseline_us, current_us, change, allowed, regressed) for cases in both runs."""
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        change = result["median_us"] / before["median_us"] - 1 if before["median_us"] else 0.0
+        allowed = threshold_for(name, thresholds, default)
+        rows.append((name, before["median_us"], result["median_us"], change, allowed, change > allowed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown for cases without a pattern")
+    parser.add_argument("--thresholds", default=str(THRESHOLDS_FILE), help="JSON {pattern: allowed slowdown}")
+    parser.add_argument("--filter", nargs="+", help="only run cases matching these fnmatch patterns")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--record-history", type=int, default=200, help="past workouts per stored user")
+    parser.add_argument("--histories", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--backends", nargs="+", default=["sharded", "sqlite"])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per round")
+    parser.add_argument("--metrics", action="store_true", help="run with the default metrics enabled")
+    parser.add_argument("--quick", action="store_true", help="small sizes for smoke runs; compare only with --quick runs")
+    args = parser.parse_args()
+    if args.quick:
+        args.users, args.histories, args.rounds, args.min_time = 200, [100, 1000], 3, 0.02
+    get_default_metrics().enabled = args.metrics
+
+    report = {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "users": args.users,
+                "record_history": args.record_history,
+                "histories": args.histories,
+                "backends": args.backends,
+                "rounds": args.rounds,
+                "min_time": args.min_time,
+                "metrics": args.metrics,
+            },
+        },
+        "results": run(args),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(report['results'])} results to {args.output}")
+    if not args.baseline:
+        return
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("params") != report["meta"]["params"]:
+        print("WARNING: baseline was run with different parameters; sizes may not line up")
+    thresholds = {}
+    if args.thresholds and Path(args.thresholds).exists():
+        with open(args.thresholds, "r") as f:
+            thresholds = json.load(f)
+    rows = compare(report, baseline, thresholds, args.threshold)
+    print(f"vs {args.baseline} (commit {baseline['meta'].get('commit')})")
+    print(f"{'case':<45} {'baseline us':>12} {'current us':>12} {'change':>8} {'allowed':>8}")
+    for name, before, after, change, allowed, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<45} {before:>12.2f} {after:>12.2f} {change:>+8.1%} {allowed:>+8.0%}{flag}")
+    regressions = [row[0] for row in rows if row[5]]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"No regressions in {len(rows)} compared cases")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Synthetic data generators shared by the benchmark scripts.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Tuple
+
+from agents import PlannerAgent, Tracer
+
+DOMAINS = ["fitness", "nutrition", "mental_health", "preventive"]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+STATUSES = ["completed", "skipped"]
+DIFFICULTIES = ["moderate", "easy", "hard"]
+
+
+def make_profile(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "domain": rng.choice(DOMAINS),
+        "fitness_level": rng.choice(["beginner", "intermediate", "advanced"]),
+        "time_per_week": rng.randint(2, 5),
+        "preferences": ["general_fitness"],
+        "nutrition_goal": rng.choice(["balanced", "high_protein", "calorie_deficit"]),
+        "mental_focus": rng.choice(["stress_management", "mindfulness", "sleep_support"]),
+        "preventive_focus": rng.choice(["activity", "posture", "breaks"]),
+    }
+
+
+def make_workouts(rng: random.Random, count: int, end: datetime = None) -> List[Dict[str, Any]]:
+    """One entry per day ending at `end`, oldest first, roughly 70% completed."""
+    end = end or datetime.now()
+    start = end - timedelta(days=count - 1)
+    workouts = []
+    for i in range(count):
+        date = start + timedelta(days=i)
+        workouts.append(
+            {
+                "day": DAYS[date.weekday()],
+                "type": rng.choice(["Full Body", "Cardio", "Strength", "Flexibility"]),
+                "status": "completed" if rng.random() < 0.7 else "skipped",
+                "date": date.isoformat(),
+            }
+        )
+    return workouts
+
+
+def make_user(user_id: str, rng: random.Random, history: int = 20, planner: PlannerAgent = None) -> Dict[str, Any]:
+    planner = planner or PlannerAgent(Tracer())
+    profile = make_profile(rng)
+    goal = planner.identify_goal(profile)
+    plan = planner.create_plan(goal, profile)
+    planner.reasoning_log.clear()
+    for task in plan["weekly_schedule"]:
+        task["status"] = rng.choice(["completed", "skipped", "pending"])
+    return {
+        "user_id": user_id,
+        "profile": profile,
+        "current_plan": plan,
+        "workouts": make_workouts(rng, history),
+        "goal_history": [],
+        "created_at": datetime.now().isoformat(),
+    }
+
+
+def make_decision_case(rng: random.Random) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(feedback, plan) as FeedbackAgent and PlannerAgent produce them."""
+    total = rng.randint(0, 7)
+    completed = rng.randint(0, total)
+    skipped = rng.randint(0, total - completed)
+    feedback = {
+        "total_workouts": total,
+        "completed_workouts": completed,
+        "skipped_workouts": skipped,
+        "pending_workouts": total - completed - skipped,
+        "consistency_rate": (completed / total) if total > 0 else 0,
+        "current_streak": rng.choice([0, 0, 1, 2, 3, rng.randint(4, 14)]),
+        "difficulty": rng.choice(DIFFICULTIES),
+    }
+    plan = {
+        "goal": {"type": "general_fitness", "target_weeks": rng.choice([4, 8, 12])},
+        "week_number": rng.randint(1, 12),
+        "adaptation_count": rng.randint(0, 6),
+    }
+    return feedback, plan
+
+
+def make_population(count: int, seed: int = 0, history: int = 20) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(seed)
+    planner = PlannerAgent(Tracer())
+    return {f"user_{i}": make_user(f"user_{i}", rng, history, planner) for i in range(count)}
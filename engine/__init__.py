@@ -0,0 +1,28 @@
+"""
+Agentic Wellness System - Engine Module
+"""
+from .loop import AgentLoop, apply_user_action, simulate_user_action
+from .batch import run_batch, format_report
+from .cohort import CohortSimulator
+from .orchestrator import AsyncOrchestrator, run_async_batch
+from .analytics import CohortStats, cohort_stats, format_cohort_report
+from .replay import load_policies, replay_policies, format_replay_report
+from .reminders import schedule_interventions
+
+__all__ = [
+    "AgentLoop",
+    "apply_user_action",
+    "simulate_user_action",
+    "run_batch",
+    "format_report",
+    "CohortSimulator",
+    "AsyncOrchestrator",
+    "run_async_batch",
+    "CohortStats",
+    "cohort_stats",
+    "format_cohort_report",
+    "load_policies",
+    "replay_policies",
+    "format_replay_report",
+    "schedule_interventions",
+]
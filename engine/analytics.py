@@ -0,0 +1,200 @@
+"""
+Cohort analytics: population-wide statistics streamed over the user store.
+
+Every user is loaded once, reduced to what FeedbackAgent.observe_task_completion and
+DecisionAgent.decide_intervention see, and dropped. CohortStats keeps per group (any of
+GROUP_KEYS) exact frequencies of consistency rates, streaks, adaptation counts and
+intervention types, so its size depends on the number of groups and distinct values (plans
+have a handful of tasks, so there are few distinct rates), not on the number of users.
+Partial stats from worker processes merge by adding counters; user IDs are fed to the
+pool in chunks with a bounded number in flight (engine.batch.map_user_chunks).
+"""
+import os
+import time
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+from agents import DecisionAgent, FeedbackAgent, Tracer
+from tools import DataManager
+from .batch import load_chunk, map_user_chunks
+
+GROUP_KEYS = ("domain", "fitness_level", "week_number")
+CONSISTENCY_BINS = 10  # equal-width bins over [0, 1]; 1.0 falls in the last
+PERCENTILES = (50, 90, 99)
+
+
+def group_value(user_data: Dict[str, Any], key: str) -> Any:
+    if key == "week_number":
+        return (user_data.get("current_plan") or {}).get("week_number")
+    return (user_data.get("profile") or {}).get(key)
+
+
+def _percentile(counts: Counter, q: float) -> int:
+    """Nearest-rank percentile of the values counted in `counts`."""
+    total = sum(counts.values())
+    if not total:
+        return 0
+    rank = max(1, -(-q * total // 100))
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen >= rank:
+            return value
+    return max(counts)
+
+
+class _Group:
+    __slots__ = ("users", "rates", "streaks", "adaptations", "interventions")
+
+    def __init__(self):
+        self.users = 0
+        self.rates: Counter = Counter()
+        self.streaks: Counter = Counter()
+        self.adaptations: Counter = Counter()
+        self.interventions: Counter = Counter()
+
+    def merge(self, other: "_Group") -> None:
+        self.users += other.users
+        self.rates.update(other.rates)
+        self.streaks.update(other.streaks)
+        self.adaptations.update(other.adaptations)
+        self.interventions.update(other.interventions)
+
+    def summary(self) -> Dict[str, Any]:
+        # Summed in sorted order so the result does not depend on how partials were merged.
+        rates = sum(rate * n for rate, n in sorted(self.rates.items()))
+        histogram = [0] * CONSISTENCY_BINS
+        for rate, n in self.rates.items():
+            histogram[min(int(rate * CONSISTENCY_BINS), CONSISTENCY_BINS - 1)] += n
+        adaptations = sum(value * n for value, n in self.adaptations.items())
+        return {
+            "users": self.users,
+            "consistency_mean": rates / self.users if self.users else 0.0,
+            "consistency_histogram": histogram,
+            "streak_percentiles": {f"p{q}": _percentile(self.streaks, q) for q in PERCENTILES},
+            "streak_max": max(self.streaks, default=0),
+            "adaptation_mean": adaptations / self.users if self.users else 0.0,
+            "adaptation_counts": dict(sorted(self.adaptations.items())),
+            "interventions": dict(self.interventions.most_common()),
+        }
+
+
+class CohortStats:
+    """Mergeable partial aggregate keyed by the `by` values of each user (a tuple, () for no grouping)."""
+
+    def __init__(self, by: Sequence[str] = ()):
+        unknown = [key for key in by if key not in GROUP_KEYS]
+        if unknown:
+            raise ValueError(f"Cannot group by {', '.join(unknown)}; expected any of {', '.join(GROUP_KEYS)}")
+        self.by = tuple(by)
+        self.groups: Dict[Tuple, _Group] = {}
+        self.errors = 0
+        self._feedback_agent = None
+        self._decision_agent = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Agents stay in the process that made them; only the counters travel.
+        return {"by": self.by, "groups": self.groups, "errors": self.errors}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["by"])
+        self.groups = state["groups"]
+        self.errors = state["errors"]
+
+    @property
+    def users(self) -> int:
+        return sum(group.users for group in self.groups.values())
+
+    def observe(self, user_data: Dict[str, Any]) -> None:
+        if self._feedback_agent is None:
+            self._feedback_agent = FeedbackAgent(Tracer())
+            self._decision_agent = DecisionAgent(Tracer())
+        feedback = self._feedback_agent.observe_task_completion(user_data)
+        intervention = self._decision_agent.decide_intervention(feedback)
+        self._feedback_agent.observation_log.clear()
+        self._decision_agent.decision_log.clear()
+
+        key = tuple(group_value(user_data, k) for k in self.by)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = _Group()
+        group.users += 1
+        group.rates[feedback["consistency_rate"]] += 1
+        group.streaks[feedback["current_streak"]] += 1
+        group.adaptations[(user_data.get("current_plan") or {}).get("adaptation_count", 0)] += 1
+        group.interventions[intervention["type"]] += 1
+
+    def merge(self, other: "CohortStats") -> "CohortStats":
+        for key, group in other.groups.items():
+            if key in self.groups:
+                self.groups[key].merge(group)
+            else:
+                self.groups[key] = group
+        self.errors += other.errors
+        return self
+
+    def report(self) -> Dict[str, Any]:
+        """{"by", "users", "errors", "groups": [{"group": {key: value}, **stats}]}, largest group first."""
+        groups = sorted(self.groups.items(), key=lambda item: (-item[1].users, repr(item[0])))
+        return {
+            "by": list(self.by),
+            "users": self.users,
+            "errors": self.errors,
+            "groups": [{"group": dict(zip(self.by, key)), **group.summary()} for key, group in groups],
+        }
+
+
+def _aggregate(manager: DataManager, user_ids: List[str], by: Sequence[str]) -> CohortStats:
+    stats = CohortStats(by)
+    loaded, stats.errors = load_chunk(manager, user_ids)
+    for _, user_data in loaded:
+        try:
+            if user_data is not None:
+                stats.observe(user_data)
+        except Exception:
+            stats.errors += 1
+    return stats
+
+
+def cohort_stats(
+    data_dir: str = "data",
+    backend: Optional[str] = None,
+    by: Sequence[str] = ("domain",),
+    workers: Optional[int] = None,
+    chunk_size: int = 500,
+    user_ids: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Stream every stored user (or `user_ids`) through CohortStats and return its report plus
+    timing. workers=1 runs in this process; otherwise chunks go to a process pool with at
+    most two per worker in flight, so memory stays bounded by chunk_size, not the store size.
+    """
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    stats = CohortStats(by)
+    for _, partial in map_user_chunks(_aggregate, (by,), data_dir, backend, workers, chunk_size, user_ids):
+        stats.merge(partial)
+    elapsed = time.perf_counter() - started
+    report = stats.report()
+    report.update(workers=workers, elapsed_s=elapsed, users_per_sec=report["users"] / elapsed if elapsed else 0.0)
+    return report
+
+
+def format_cohort_report(report: Dict[str, Any]) -> str:
+    by = report["by"] or ["all"]
+    lines = [
+        f"{report['users']} users by {', '.join(by)} in {report['elapsed_s']:.2f}s "
+        f"({report['users_per_sec']:.0f} users/sec, {report['workers']} workers)",
+        f"{'group':<32} {'users':>8} {'consistency':>11} {'streak p50/p90/p99':>19} {'adapt':>6}  interventions",
+    ]
+    for row in report["groups"]:
+        name = "/".join(str(v) for v in row["group"].values()) or "all"
+        streaks = "/".join(str(v) for v in row["streak_percentiles"].values())
+        interventions = ", ".join(f"{k} {n / row['users']:.0%}" for k, n in row["interventions"].items())
+        lines.append(
+            f"{name:<32} {row['users']:>8} {row['consistency_mean']:>11.2%} {streaks:>19} "
+            f"{row['adaptation_mean']:>6.2f}  {interventions}"
+        )
+    if report["errors"]:
+        lines.append(f"Errors: {report['errors']} users could not be loaded")
+    return "\n".join(lines)
@@ -0,0 +1,212 @@
+"""
+Batch runner: headless PAOA iterations for many users across a process pool.
+"""
+import itertools
+import multiprocessing.util
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from tools import DataManager
+from tools.metrics import Metrics, get_default_metrics, set_default_metrics
+from .loop import AgentLoop, PHASES
+
+_worker_loop: Optional[AgentLoop] = None
+
+
+def _close_at_exit(manager: DataManager) -> DataManager:
+    # Pool workers leave through os._exit, skipping atexit; multiprocessing runs its own finalizers first.
+    multiprocessing.util.Finalize(manager, manager.close, exitpriority=10)
+    return manager
+
+
+def _init_worker(data_dir: str, backend: Optional[str], metrics: bool, codec: Optional[str]) -> None:
+    global _worker_loop
+    _worker_loop = AgentLoop(_close_at_exit(DataManager(data_dir, backend=backend, codec=codec)))
+    set_default_metrics(Metrics(enabled=metrics))
+
+
+def _run_users(loop: AgentLoop, user_ids: List[str], iterations: int, seed: Optional[int]) -> List[Dict[str, Any]]:
+    errors = []
+    for user_id in user_ids:
+        rng = random.Random(f"{seed}:{user_id}") if seed is not None else random.Random()
+        try:
+            loop.run_user(user_id, iterations, rng)
+        except Exception as e:
+            errors.append({"user_id": user_id, "error": repr(e)})
+    return errors
+
+
+def _run_chunk(user_ids: List[str], iterations: int, seed: Optional[int]) -> Dict[str, Any]:
+    loop = _worker_loop
+    for phase in PHASES:
+        loop.phase_stats[phase] = [0, 0.0, 0.0]
+    errors = _run_users(loop, user_ids, iterations, seed)
+    result = {"users": len(user_ids), "phase_stats": loop.phase_stats, "errors": errors}
+    metrics = get_default_metrics()
+    if metrics.enabled:
+        result["metrics"] = metrics.snapshot()
+        metrics.reset()
+    return result
+
+
+# Reader process state for map_user_chunks, set up once per process by _init_reader.
+_reader_manager: Optional[DataManager] = None
+
+
+def _init_reader(data_dir: str, backend: Optional[str]) -> None:
+    global _reader_manager
+    _reader_manager = _close_at_exit(DataManager(data_dir, backend=backend))
+
+
+def _read_chunk(fn: Callable[..., Any], index: int, user_ids: List[str], args: Tuple) -> Tuple[int, Any]:
+    return index, fn(_reader_manager, user_ids, *args)
+
+
+def iter_chunks(user_ids: Iterator[str], size: int) -> Iterator[List[str]]:
+    while True:
+        chunk = list(itertools.islice(user_ids, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_chunk(manager: DataManager, user_ids: List[str]) -> Tuple[List[Tuple[str, Optional[Dict[str, Any]]]], int]:
+    """
+    ([(user_id, record or None)], errors) for a chunk, read in one backend.load_many call (the
+    JSON backend reads its file once per chunk, not once per user). If the batch read fails,
+    users are loaded one by one so only the unreadable ones count as errors.
+    """
+    backend = manager.backend
+    try:
+        records = backend.load_many(user_ids)
+        return [(user_id, records[user_id]) for user_id in user_ids], 0
+    except Exception:
+        pass
+    loaded, errors = [], 0
+    for user_id in user_ids:
+        try:
+            loaded.append((user_id, backend.load(user_id)))
+        except Exception:
+            errors += 1
+    return loaded, errors
+
+
+def map_user_chunks(
+    fn: Callable[..., Any],
+    args: Tuple = (),
+    data_dir: str = "data",
+    backend: Optional[str] = None,
+    workers: int = 1,
+    chunk_size: int = 500,
+    user_ids: Optional[Iterable[str]] = None,
+) -> Iterator[Tuple[int, Any]]:
+    """
+    Call fn(manager, chunk, *args) for chunks of chunk_size stored user IDs (or `user_ids`)
+    and yield (chunk index, result) as chunks finish, in any order. workers=1 runs in this
+    process; otherwise fn (a module-level function) runs in a process pool with at most two
+    chunks per worker in flight, so memory stays bounded by chunk_size, not the store size.
+    """
+    with DataManager(data_dir, backend=backend) as manager:
+        ids = iter(user_ids) if user_ids is not None else manager.backend.iter_user_ids()
+        chunks = enumerate(iter_chunks(ids, chunk_size))
+        if workers == 1:
+            for index, chunk in chunks:
+                yield index, fn(manager, chunk, *args)
+            return
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_reader, initargs=(data_dir, backend)) as pool:
+            pending = set()
+            for index, chunk in chunks:
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(pool.submit(_read_chunk, fn, index, chunk, args))
+            for future in pending:
+                yield future.result()
+
+
+def run_batch(
+    user_ids: Iterable[str],
+    iterations: int = 5,
+    data_dir: str = "data",
+    backend: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 256,
+    seed: Optional[int] = None,
+    codec: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run `iterations` PAOA iterations for every user, saving each user once at the end.
+    Returns throughput and per-phase latency; users whose run or save failed are listed in
+    "errors". Use the "sharded" or "sqlite" backend for large populations: the JSON backend
+    rewrites one shared file per save. workers=1 runs in this process; otherwise, while the
+    default metrics are enabled, workers record theirs and they are merged in.
+    """
+    user_ids = list(user_ids)
+    workers = workers or os.cpu_count() or 1
+    metrics = get_default_metrics()
+    totals = {phase: [0, 0.0, 0.0] for phase in PHASES}
+    errors = []
+    done = 0
+
+    started = time.perf_counter()
+    if workers == 1:
+        with DataManager(data_dir, backend=backend, codec=codec) as manager:
+            loop = AgentLoop(manager)
+            errors = _run_users(loop, user_ids, iterations, seed)
+        done, totals = len(user_ids), loop.phase_stats
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(data_dir, backend, metrics.enabled, codec)
+        ) as pool:
+            chunks = iter_chunks(iter(user_ids), chunk_size)
+            futures = [pool.submit(_run_chunk, chunk, iterations, seed) for chunk in chunks]
+            for future in as_completed(futures):
+                result = future.result()
+                done += result["users"]
+                errors.extend(result["errors"])
+                if "metrics" in result:
+                    metrics.merge(result["metrics"])
+                for phase, (count, total, peak) in result["phase_stats"].items():
+                    totals[phase][0] += count
+                    totals[phase][1] += total
+                    totals[phase][2] = max(totals[phase][2], peak)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "users": done,
+        "iterations": iterations,
+        "workers": workers,
+        "elapsed_s": elapsed,
+        "users_per_sec": done / elapsed if elapsed else 0.0,
+        "phases": {
+            phase: {
+                "count": count,
+                "mean_ms": total / count * 1000 if count else 0.0,
+                "max_ms": peak * 1000,
+                "total_s": total,
+            }
+            for phase, (count, total, peak) in totals.items()
+        },
+        "errors": errors,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    if "concurrency" in report:
+        parallelism = f"concurrency {report['concurrency']}"
+    else:
+        parallelism = f"{report['workers']} workers"
+    lines = [
+        f"Processed {report['users']} users x {report['iterations']} iterations "
+        f"in {report['elapsed_s']:.2f}s ({report['users_per_sec']:.1f} users/sec, {parallelism})",
+        f"{'phase':>8} {'count':>10} {'mean ms':>10} {'max ms':>10}",
+    ]
+    for phase, stats in report["phases"].items():
+        lines.append(f"{phase:>8} {stats['count']:>10} {stats['mean_ms']:>10.3f} {stats['max_ms']:>10.3f}")
+    if report["errors"]:
+        lines.append(f"Errors: {len(report['errors'])} (first: {report['errors'][0]})")
+    return "\n".join(lines)
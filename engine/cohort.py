@@ -0,0 +1,358 @@
+"""
+CohortSimulator: NumPy-vectorized PAOA simulation for a whole cohort.
+
+Mirrors the dict-based agents one array operation at a time:
+  ACT      simulate_user_action (first pending task, completion probability)
+  OBSERVE  FeedbackAgent.observe_task_completion / collect_difficulty_feedback / _calculate_streak
+  ADAPT    DecisionAgent.should_adapt_plan, PlannerAgent.adapt_plan,
+           DecisionAgent.decide_intervention / should_escalate_goal
+
+The decisions are DecisionAgent's own rule tables (decision_rules.json), evaluated in batch
+over the cohort's columns; policy values override the tables' params.
+"""
+import copy
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from agents import DecisionRules, PlannerAgent, Tracer, get_default_rules
+
+MAX_TASKS = 7
+
+PAD, PENDING, COMPLETED, SKIPPED = -1, 0, 1, 2
+STATUS_CODES = {"pending": PENDING, "completed": COMPLETED, "skipped": SKIPPED}
+
+NO_INTENSITY, MODERATE, HIGH = 0, 1, 2
+INTENSITY_CODES = {"moderate": MODERATE, "high": HIGH}
+
+DOMAINS = ["fitness", "nutrition", "mental_health", "preventive"]
+DIFFICULTIES = ["moderate", "easy", "hard"]
+INTERVENTIONS = ["encouragement", "motivation", "celebration", "positive_reinforcement"]
+DIFF_MODERATE, DIFF_EASY, DIFF_HARD = 0, 1, 2
+ENCOURAGEMENT, MOTIVATION, CELEBRATION, POSITIVE_REINFORCEMENT = 0, 1, 2, 3
+
+# Thresholds hard-coded in the dict-based agents, plus DecisionAgent's rule params
+# (low_consistency / high_consistency are also PlannerAgent.adapt_plan's thresholds).
+DEFAULT_POLICY = {
+    "completion_probability": 0.7,
+    "difficulty_window": 5,
+    "hard_rate": 0.4,
+    "easy_rate": 0.8,
+    "duration_step": 5,
+    "min_duration": 20,
+    **get_default_rules().params,
+}
+
+
+class CohortSimulator:
+    """
+    Columnar cohort state. Per-task columns are (n_users, MAX_TASKS); tasks dropped by
+    _reduce_frequency become PAD, and completed/skipped counts are maintained incrementally.
+    Workout history is reduced to what the agents read: a ring of the last `difficulty_window`
+    statuses, the workout count and the running streak.
+    """
+
+    def __init__(self, n_users: int, policy: Optional[Dict[str, Any]] = None, seed: Optional[int] = None):
+        self.n = n_users
+        self.policy = {**DEFAULT_POLICY, **(policy or {})}
+        self.rules = DecisionRules(get_default_rules().spec, self.policy)
+        self.rng = np.random.default_rng(seed)
+        self.day = 0
+        # Per user, so a cohort can be given each user's own recorded completion rate.
+        self.completion_probability = np.full(n_users, self.policy["completion_probability"])
+
+        self.domain = np.zeros(n_users, dtype=np.int8)
+        self.status = np.full((n_users, MAX_TASKS), PAD, dtype=np.int8)
+        self.duration = np.zeros((n_users, MAX_TASKS), dtype=np.int16)
+        self.intensity = np.zeros((n_users, MAX_TASKS), dtype=np.int8)
+        self.n_tasks = np.zeros(n_users, dtype=np.int8)
+        self.completed_count = np.zeros(n_users, dtype=np.int8)
+        self.skipped_count = np.zeros(n_users, dtype=np.int8)
+        self.adaptation_count = np.zeros(n_users, dtype=np.int16)
+        self.week_number = np.ones(n_users, dtype=np.int16)
+        self.target_weeks = np.full(n_users, 8, dtype=np.int16)
+        self.has_plan = np.ones(n_users, dtype=bool)
+
+        # Fresh-plan template per user, used when a goal escalates and a new plan is created.
+        self.template_n_tasks = np.zeros(n_users, dtype=np.int8)
+        self.template_duration = np.zeros((n_users, MAX_TASKS), dtype=np.int16)
+        self.template_intensity = np.zeros((n_users, MAX_TASKS), dtype=np.int8)
+
+        window = self.policy["difficulty_window"]
+        self.recent = np.zeros((n_users, window), dtype=np.int8)
+        self.recent_completed = np.zeros(n_users, dtype=np.int8)
+        self.n_workouts = np.zeros(n_users, dtype=np.int64)
+        self.last_completed_day = np.full(n_users, np.iinfo(np.int32).min // 2, dtype=np.int32)
+        self.streak_run = np.zeros(n_users, dtype=np.int32)
+
+        self.totals = {"iterations": 0, "actions": 0, "adaptations": 0, "escalations": 0}
+        self.intervention_counts = np.zeros(len(INTERVENTIONS), dtype=np.int64)
+
+    # Construction
+    @classmethod
+    def synthetic(cls, n_users: int, seed: Optional[int] = None, policy: Optional[Dict[str, Any]] = None):
+        """Random cohort with the same plan shapes PlannerAgent produces."""
+        sim = cls(n_users, policy, seed)
+        rng = sim.rng
+        sim.domain[:] = rng.integers(0, len(DOMAINS), n_users)
+        beginner = rng.random(n_users) < 1 / 3
+        time_per_week = rng.integers(2, 6, n_users)
+        fitness = sim.domain == 0
+        sim.template_n_tasks[:] = np.where(fitness, np.minimum(time_per_week, 5), 5)
+        task_idx = np.arange(MAX_TASKS)
+        in_plan = task_idx[None, :] < sim.template_n_tasks[:, None]
+        timed = in_plan & fitness[:, None]
+        sim.template_duration[:] = np.where(timed, np.where(beginner, 30, 45)[:, None], 0)
+        sim.template_intensity[:] = np.where(timed, np.where(beginner, MODERATE, HIGH)[:, None], NO_INTENSITY)
+        sim.target_weeks[:] = np.where(sim.domain == 2, 6, 8)
+        sim._reset_plans(np.ones(n_users, dtype=bool))
+        sim._recount()
+        return sim
+
+    @classmethod
+    def from_users(cls, users: List[Dict[str, Any]], policy: Optional[Dict[str, Any]] = None, seed=None):
+        """Load state from user_data dicts (each must have a current_plan)."""
+        sim = cls(len(users), policy, seed)
+        planner = PlannerAgent(Tracer())
+        window = sim.policy["difficulty_window"]
+        today = datetime.now().date()
+        for i, user_data in enumerate(users):
+            profile = user_data.get("profile", {})
+            plan = user_data["current_plan"]
+            sim.domain[i] = DOMAINS.index(profile.get("domain", "fitness"))
+            sim.adaptation_count[i] = plan.get("adaptation_count", 0)
+            sim.week_number[i] = plan.get("week_number", 1)
+            sim.target_weeks[i] = plan.get("goal", {}).get("target_weeks", 8)
+            sim.n_tasks[i] = sim._load_schedule(i, plan.get("weekly_schedule", []), sim.status, sim.duration, sim.intensity)
+
+            fresh = planner.create_plan(planner.identify_goal(profile), profile)
+            planner.reasoning_log.clear()
+            sim.template_n_tasks[i] = sim._load_schedule(
+                i, fresh["weekly_schedule"], None, sim.template_duration, sim.template_intensity
+            )
+
+            workouts = user_data.get("workouts", [])
+            sim.n_workouts[i] = len(workouts)
+            start = max(0, len(workouts) - window)
+            for k in range(start, len(workouts)):
+                sim.recent[i, k % window] = STATUS_CODES.get(workouts[k].get("status"), PENDING)
+            sim._load_streak(i, workouts, today)
+        sim._recount()
+        return sim
+
+    def with_policy(self, policy: Optional[Dict[str, Any]] = None, seed: Optional[int] = None) -> "CohortSimulator":
+        """
+        Copy of the current cohort state run by another policy, with its counters reset. The
+        policy must keep difficulty_window: the status ring holds only that many workouts.
+        """
+        merged = {**DEFAULT_POLICY, **(policy or {})}
+        if merged["difficulty_window"] != self.recent.shape[1]:
+            raise ValueError("difficulty_window differs from this cohort's; load the cohort again with the policy")
+        sim = copy.copy(self)
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray):
+                setattr(sim, name, value.copy())
+        sim.policy = merged
+        sim.rules = DecisionRules(get_default_rules().spec, merged)
+        sim.rng = np.random.default_rng(seed)
+        if "completion_probability" in (policy or {}):
+            sim.completion_probability[:] = merged["completion_probability"]
+        sim.totals = dict.fromkeys(self.totals, 0)
+        sim.intervention_counts = np.zeros(len(INTERVENTIONS), dtype=np.int64)
+        return sim
+
+    def _load_schedule(self, i: int, schedule, status, duration, intensity) -> int:
+        for j, task in enumerate(schedule):
+            if status is not None:
+                status[i, j] = STATUS_CODES[task.get("status", "pending")]
+            duration[i, j] = task.get("duration_minutes", 0)
+            intensity[i, j] = INTENSITY_CODES.get(task.get("intensity"), NO_INTENSITY)
+        return len(schedule)
+
+    def _load_streak(self, i: int, workouts, today) -> None:
+        """Same day-run semantics as FeedbackAgent._calculate_streak, relative to simulated day 0."""
+        days = set()
+        for w in workouts:
+            if w.get("status") != "completed":
+                continue
+            try:
+                offset = (datetime.fromisoformat(w.get("date", "")).date() - today).days
+            except Exception:
+                continue
+            if offset <= 0:
+                days.add(offset)
+        if not days:
+            return
+        last = max(days)
+        run = 1
+        while last - run in days:
+            run += 1
+        self.last_completed_day[i] = self.day + last
+        self.streak_run[i] = run
+
+    # Simulation
+    def run(self, iterations: int) -> Dict[str, Any]:
+        for _ in range(iterations):
+            self.step()
+        return self.summary()
+
+    def step(self, draws: Optional[np.ndarray] = None, advance_days: int = 0) -> Dict[str, np.ndarray]:
+        """One PAOA iteration for every user. `draws` are U[0,1) samples, one per user."""
+        p = self.policy
+        self.day += advance_days
+
+        # PLAN: users whose goal escalated last iteration get a fresh plan.
+        if not self.has_plan.all():
+            self._reset_plans(~self.has_plan)
+
+        # ACT: first pending task is completed with probability completion_probability.
+        is_pending = self.status == PENDING
+        acting = is_pending.any(axis=1)
+        act_users = np.flatnonzero(acting)
+        if draws is None:
+            draws = self.rng.random(self.n)
+        completed_now = draws < self.completion_probability
+        act_done = completed_now[act_users]
+        action = np.where(act_done, COMPLETED, SKIPPED).astype(np.int8)
+        self.status[act_users, is_pending[act_users].argmax(axis=1)] = action
+        self.completed_count[act_users] += act_done
+        self.skipped_count[act_users] += ~act_done
+
+        window = self.recent.shape[1]
+        slot = self.n_workouts[act_users] % window
+        self.recent_completed[act_users] += act_done.astype(np.int8) - (self.recent[act_users, slot] == COMPLETED)
+        self.recent[act_users, slot] = action
+        self.n_workouts[act_users] += 1
+
+        done = act_users[act_done]
+        last = self.last_completed_day[done]
+        run = self.streak_run[done]
+        self.streak_run[done] = np.where(last == self.day, run, np.where(last == self.day - 1, run + 1, 1))
+        self.last_completed_day[done] = self.day
+
+        # OBSERVE
+        completed = self.completed_count
+        skipped = self.skipped_count
+        total = self.n_tasks
+        consistency = np.divide(completed, total, out=np.zeros(self.n), where=total > 0)
+        streak = np.where(self.last_completed_day == self.day, self.streak_run, 0)
+
+        recent_len = np.minimum(self.n_workouts, window)
+        rate = np.divide(self.recent_completed, recent_len, out=np.zeros(self.n), where=recent_len > 0)
+        has_recent = recent_len > 0
+        difficulty = np.full(self.n, DIFF_MODERATE, dtype=np.int8)
+        difficulty[has_recent & (rate < p["hard_rate"])] = DIFF_HARD
+        difficulty[has_recent & (rate > p["easy_rate"])] = DIFF_EASY
+
+        # ADAPT: DecisionAgent.should_adapt_plan
+        rules = self.rules
+        easy = difficulty == DIFF_EASY
+        hard = difficulty == DIFF_HARD
+        rule = rules.adapt.evaluate_batch(
+            {
+                "total_workouts": total,
+                "adaptation_count": self.adaptation_count,
+                "consistency_rate": consistency,
+                "difficulty": difficulty,
+            },
+            {"difficulty": DIFFICULTIES},
+        )
+        adapt = rules.adapt.outcome_column("decision")[rule]
+        adapt_users = np.flatnonzero(adapt)
+        # Snapshot before adapting: feedback is observed before the plan changes.
+        completed = completed.copy()
+        skipped = skipped.copy()
+        self._adapt_plans(adapt_users, easy, hard)
+
+        # DecisionAgent.decide_intervention
+        rule = rules.intervention.evaluate_batch(
+            {"skipped_workouts": skipped, "completed_workouts": completed, "current_streak": streak}
+        )
+        intervention = rules.intervention.outcome_column("type", INTERVENTIONS).astype(np.int8)[rule]
+
+        # DecisionAgent.should_escalate_goal
+        rule = rules.escalate.evaluate_batch(
+            {"week_number": self.week_number, "target_weeks": self.target_weeks, "consistency_rate": consistency}
+        )
+        escalate = rules.escalate.outcome_column("decision")[rule]
+        self.has_plan[escalate] = False
+
+        self.totals["iterations"] += 1
+        self.totals["actions"] += len(act_users)
+        self.totals["adaptations"] += len(adapt_users)
+        self.totals["escalations"] += int(escalate.sum())
+        self.intervention_counts += np.bincount(intervention, minlength=len(INTERVENTIONS))
+        return {
+            "acted": acting,
+            "completed": completed,
+            "skipped": skipped,
+            "consistency": consistency,
+            "difficulty": difficulty,
+            "streak": streak,
+            "adapted": adapt,
+            "intervention": intervention,
+            "escalated": escalate,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        total = self.n_tasks
+        consistency = np.divide(self.completed_count, total, out=np.zeros(self.n), where=total > 0)
+        return {
+            "users": self.n,
+            **self.totals,
+            "mean_consistency": float(consistency.mean()) if self.n else 0.0,
+            "mean_adaptation_count": float(self.adaptation_count.mean()) if self.n else 0.0,
+            "interventions": {name: int(c) for name, c in zip(INTERVENTIONS, self.intervention_counts)},
+        }
+
+    def _adapt_plans(self, users: np.ndarray, easy: np.ndarray, hard: np.ndarray) -> None:
+        """PlannerAgent.adapt_plan, which uses completed / (completed + skipped) as its consistency."""
+        if not len(users):
+            return
+        p = self.policy
+        self.adaptation_count[users] += 1
+        completed = self.completed_count[users]
+        acted = completed + self.skipped_count[users]
+        rate = np.divide(completed, acted, out=np.zeros(len(users)), where=acted > 0)
+        reduce_freq = rate < p["low_consistency"]
+        increase = ~reduce_freq & (rate > p["high_consistency"]) & easy[users]
+        ease = ~reduce_freq & ~increase & hard[users]
+
+        drop = users[reduce_freq & (self.n_tasks[users] > 2)]
+        last = self.n_tasks[drop] - 1
+        dropped = self.status[drop, last]
+        self.completed_count[drop] -= dropped == COMPLETED
+        self.skipped_count[drop] -= dropped == SKIPPED
+        self.status[drop, last] = PAD
+        self.n_tasks[drop] = last
+
+        up = users[increase]
+        duration = self.duration[up]
+        self.duration[up] = np.where(duration > 0, duration + p["duration_step"], duration)
+        intensity = self.intensity[up]
+        self.intensity[up] = np.where(intensity == MODERATE, HIGH, intensity)
+
+        down = users[ease]
+        duration = self.duration[down]
+        self.duration[down] = np.where(duration > 0, np.maximum(p["min_duration"], duration - p["duration_step"]), 0)
+        intensity = self.intensity[down]
+        self.intensity[down] = np.where(intensity == HIGH, MODERATE, intensity)
+
+    def _reset_plans(self, mask: np.ndarray) -> None:
+        task_idx = np.arange(MAX_TASKS)
+        in_plan = task_idx[None, :] < self.template_n_tasks[mask][:, None]
+        self.status[mask] = np.where(in_plan, PENDING, PAD)
+        self.duration[mask] = self.template_duration[mask]
+        self.intensity[mask] = self.template_intensity[mask]
+        self.n_tasks[mask] = self.template_n_tasks[mask]
+        self.completed_count[mask] = 0
+        self.skipped_count[mask] = 0
+        self.adaptation_count[mask] = 0
+        self.week_number[mask] = 1
+        self.has_plan[mask] = True
+
+    def _recount(self) -> None:
+        self.completed_count[:] = (self.status == COMPLETED).sum(axis=1)
+        self.skipped_count[:] = (self.status == SKIPPED).sum(axis=1)
+        self.recent_completed[:] = (self.recent == COMPLETED).sum(axis=1)
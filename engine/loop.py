@@ -0,0 +1,142 @@
+"""
+AgentLoop: headless Plan -> Act -> Observe -> Adapt iteration shared by the batch tooling.
+"""
+import random
+import time
+from typing import Dict, Any, Optional
+
+from agents import PlannerAgent, DecisionAgent, FeedbackAgent, Tracer
+from tools import DataManager, FitnessTools, events
+from tools.metrics import PHASE_SECONDS, get_default_metrics, key
+
+PHASES = ("plan", "act", "observe", "adapt", "save")
+PHASE_SERIES = {phase: key(PHASE_SECONDS, phase=phase) for phase in PHASES}
+
+
+def apply_user_action(user_data: Dict[str, Any], action: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Record a submitted action ({"day", "status"}, optionally "type") against the current plan."""
+    plan = user_data.get("current_plan")
+    if not plan:
+        return None
+    task = next((w for w in plan.get("weekly_schedule", []) if w.get("day") == action.get("day")), None)
+    if task is None:
+        return None
+    events.record(user_data, events.TASK_STATUS_SET, day=task.get("day"), status=action["status"])
+    return {"day": task.get("day"), "type": action.get("type", task.get("type")), "status": action["status"]}
+
+
+def simulate_user_action(user_data: Dict[str, Any], rng: random.Random = None) -> Optional[Dict[str, Any]]:
+    """Complete or skip the first pending task (70% completion), updating its status in place."""
+    rng = rng or random
+    plan = user_data.get("current_plan")
+    if not plan:
+        return None
+    schedule = plan.get("weekly_schedule", [])
+    pending = [w for w in schedule if w.get("status") == "pending"]
+    if not pending:
+        return None
+    workout = pending[0]
+    status = "completed" if rng.random() < 0.7 else "skipped"
+    events.record(user_data, events.TASK_STATUS_SET, day=workout.get("day"), status=status)
+    return {"day": workout.get("day"), "type": workout.get("type"), "status": status}
+
+
+class AgentLoop:
+    """
+    Runs PAOA iterations without console interaction and records per-phase latency.
+    Agents created here trace to `tracer`, which defaults to a disabled (null) tracer.
+    """
+
+    def __init__(
+        self,
+        data_manager: DataManager,
+        planner: PlannerAgent = None,
+        decision_agent: DecisionAgent = None,
+        feedback_agent: FeedbackAgent = None,
+        tracer: Tracer = None,
+    ):
+        tracer = tracer or Tracer()
+        self.data_manager = data_manager
+        self.planner = planner or PlannerAgent(tracer)
+        self.decision_agent = decision_agent or DecisionAgent(tracer)
+        self.feedback_agent = feedback_agent or FeedbackAgent(tracer)
+        self.fitness_tools = FitnessTools()
+        self.phase_stats = {phase: [0, 0.0, 0.0] for phase in PHASES}  # count, total_s, max_s
+
+    def run_user(self, user_id: str, iterations: int, rng: random.Random = None) -> Dict[str, Any]:
+        """Load, run `iterations` PAOA iterations and save once; raises IOError if the save failed."""
+        user_data = self.data_manager.load_user_data(user_id)
+        for log in self.logs():
+            log.set_context(user_id)
+        for _ in range(iterations):
+            user_data = self.run_iteration(user_data, rng)
+        started = time.perf_counter()
+        saved = self.data_manager.save_user_data(user_data, user_id)
+        self._record("save", started)
+        self.clear_logs()
+        if not saved:
+            raise IOError(f"Could not save user {user_id}")
+        return user_data
+
+    def run_iteration(
+        self, user_data: Dict[str, Any], rng: random.Random = None, action: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """One PAOA iteration; a submitted `action` replaces the simulated one in ACT."""
+        # PLAN
+        started = time.perf_counter()
+        current_plan = user_data.get("current_plan")
+        if not current_plan:
+            profile = user_data.get("profile") or self.data_manager._create_default_user("")["profile"]
+            user_data["profile"] = profile
+            goal = self.planner.identify_goal(profile)
+            current_plan = self.planner.create_plan(goal, profile)
+            user_data = self.data_manager.update_plan(user_data, current_plan)
+            if not user_data.get("created_at"):
+                user_data["created_at"] = current_plan["created_at"]
+        started = self._record("plan", started)
+
+        # ACT
+        if action is not None:
+            user_action = apply_user_action(user_data, action)
+        else:
+            user_action = simulate_user_action(user_data, rng)
+        if user_action:
+            workout_entry = self.fitness_tools.create_workout_entry(
+                user_action["day"], user_action["type"], user_action["status"]
+            )
+            user_data = self.data_manager.add_workout(user_data, workout_entry)
+        started = self._record("act", started)
+
+        # OBSERVE
+        feedback = self.feedback_agent.aggregate_feedback(user_data)
+        started = self._record("observe", started)
+
+        # ADAPT
+        if self.decision_agent.should_adapt_plan(feedback, current_plan):
+            current_plan = self.planner.adapt_plan(current_plan, feedback)
+            user_data = self.data_manager.update_plan(user_data, current_plan)
+        self.decision_agent.decide_intervention(feedback)
+        if self.decision_agent.should_escalate_goal(current_plan, feedback):
+            user_data = self.data_manager.retire_plan(user_data)
+        self._record("adapt", started)
+        return user_data
+
+    def logs(self):
+        return (self.planner.reasoning_log, self.decision_agent.decision_log, self.feedback_agent.observation_log)
+
+    def clear_logs(self) -> None:
+        for log in self.logs():
+            log.clear()
+
+    def _record(self, phase: str, started: float) -> float:
+        now = time.perf_counter()
+        elapsed = now - started
+        stats = self.phase_stats[phase]
+        stats[0] += 1
+        stats[1] += elapsed
+        if elapsed > stats[2]:
+            stats[2] = elapsed
+        metrics = get_default_metrics()
+        if metrics.enabled:
+            metrics.observe(PHASE_SERIES[phase], elapsed)
+        return now
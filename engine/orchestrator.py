@@ -0,0 +1,173 @@
+"""
+AsyncOrchestrator: PAOA iterations for many users concurrently on one asyncio event loop.
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Any, Iterable, List, Optional
+
+from tools import DataManager
+from .loop import AgentLoop, PHASES
+
+
+class AsyncOrchestrator:
+    """
+    DataManager calls (load, save) are blocking, so they run in a thread pool; the agents run
+    on the event loop thread between them. A submission's agent work never awaits, so the
+    shared agents and their logs are never interleaved between users.
+
+    At most `concurrency` submissions are in flight. Submissions for the same user run one at
+    a time, in the order they were made. Cancelling a submission before its save discards its
+    changes; once the save has started, cancellation waits for it to finish so the next
+    submission for that user loads what was written.
+    """
+
+    def __init__(
+        self,
+        data_manager: DataManager,
+        concurrency: int = 64,
+        io_threads: Optional[int] = None,
+        agent_loop: Optional[AgentLoop] = None,
+    ):
+        self.data_manager = data_manager
+        self.agent_loop = agent_loop or AgentLoop(data_manager)
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(
+            max_workers=io_threads or min(32, concurrency), thread_name_prefix="storage"
+        )
+        self._slots = asyncio.Semaphore(concurrency)
+        self._turns: Dict[str, List[Any]] = {}  # user_id -> [lock, submissions holding or waiting]
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def __aenter__(self) -> "AsyncOrchestrator":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    async def _io(self, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    @asynccontextmanager
+    async def _turn(self, user_id: str):
+        """Per-user FIFO lock (asyncio.Lock wakes waiters in order), then a concurrency slot."""
+        turn = self._turns.get(user_id)
+        if turn is None:
+            turn = self._turns[user_id] = [asyncio.Lock(), 0]
+        turn[1] += 1
+        try:
+            async with turn[0], self._slots:
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                try:
+                    yield
+                finally:
+                    self.in_flight -= 1
+        finally:
+            turn[1] -= 1
+            if not turn[1]:
+                del self._turns[user_id]
+
+    async def _save(self, user_data: Dict[str, Any], user_id: str) -> bool:
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor, self.data_manager.save_user_data, user_data, user_id
+        )
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            raise
+
+    async def submit(
+        self,
+        user_id: str,
+        action: Optional[Dict[str, Any]] = None,
+        iterations: int = 1,
+        rng: random.Random = None,
+    ) -> Dict[str, Any]:
+        """
+        Load the user, run `iterations` PAOA iterations and save. A submitted `action`
+        ({"day", "status"}) replaces the simulated ACT of the first iteration. Raises IOError
+        if the save failed.
+        """
+        async with self._turn(user_id):
+            user_data = await self._io(self.data_manager.load_user_data, user_id)
+            loop = self.agent_loop
+            for log in loop.logs():
+                log.set_context(user_id)
+            for i in range(iterations):
+                user_data = loop.run_iteration(user_data, rng, action if i == 0 else None)
+            loop.clear_logs()
+            started = time.perf_counter()
+            saved = await self._save(user_data, user_id)
+            loop._record("save", started)
+            if not saved:
+                raise IOError(f"Could not save user {user_id}")
+            return user_data
+
+    async def run_users(
+        self, user_ids: Iterable[str], iterations: int = 5, seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Every user once, `concurrency` at a time. Same report shape as engine.run_batch."""
+        loop = self.agent_loop
+        for phase in PHASES:
+            loop.phase_stats[phase] = [0, 0.0, 0.0]
+        pending = iter(user_ids)
+        errors = []
+        done = 0
+
+        async def worker():
+            nonlocal done
+            for user_id in pending:
+                rng = random.Random(f"{seed}:{user_id}") if seed is not None else random.Random()
+                try:
+                    await self.submit(user_id, iterations=iterations, rng=rng)
+                except Exception as e:
+                    errors.append({"user_id": user_id, "error": repr(e)})
+                done += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+        return {
+            "users": done,
+            "iterations": iterations,
+            "concurrency": self.concurrency,
+            "elapsed_s": elapsed,
+            "users_per_sec": done / elapsed if elapsed else 0.0,
+            "phases": {
+                phase: {
+                    "count": count,
+                    "mean_ms": total / count * 1000 if count else 0.0,
+                    "max_ms": peak * 1000,
+                    "total_s": total,
+                }
+                for phase, (count, total, peak) in loop.phase_stats.items()
+            },
+            "errors": errors,
+        }
+
+
+def run_async_batch(
+    user_ids: Iterable[str],
+    iterations: int = 5,
+    data_dir: str = "data",
+    backend: Optional[str] = None,
+    concurrency: int = 64,
+    seed: Optional[int] = None,
+    codec: Optional[str] = None,
+) -> Dict[str, Any]:
+    """run_batch on one event loop instead of a process pool."""
+
+    async def run():
+        with DataManager(data_dir, backend=backend, codec=codec) as data_manager:
+            async with AsyncOrchestrator(data_manager, concurrency) as orchestrator:
+                return await orchestrator.run_users(user_ids, iterations, seed)
+
+    return asyncio.run(run())
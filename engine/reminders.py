@@ -0,0 +1,80 @@
+"""
+Intervention scheduling: what to send each stored user later, queued on an InterventionQueue.
+
+Each user gets two kinds of message. The first is a reminder for today's task while it is
+pending, due at `reminder_hour`. The second is DecisionAgent's intervention for the user's
+current feedback (a streak celebration, motivation after skips, ...), due at
+`morning_hour` the next day. The queue coalesces them to one message per user per window,
+so scheduling the same users again only updates what changed.
+"""
+from datetime import datetime, time, timedelta
+from typing import Dict, Any, Iterable, Optional
+
+from agents import DecisionAgent, FeedbackAgent, Tracer
+from tools import DataManager
+from tools.interventions import InterventionQueue
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def task_reminder(user_data: Dict[str, Any], now: datetime) -> Optional[Dict[str, Any]]:
+    """A reminder for the plan's task on now's weekday while it is pending, else None."""
+    plan = user_data.get("current_plan")
+    if not plan:
+        return None
+    today = WEEKDAYS[now.weekday()]
+    task = next((t for t in plan.get("weekly_schedule", []) if t.get("day") == today), None)
+    if task is None or task.get("status") != "pending":
+        return None
+    label = task.get("type", "task")
+    detail = task.get("practice") or task.get("task") or ", ".join(task.get("items", [])) or ""
+    message = f"Today's {label} is still pending" + (f": {detail}" if detail else "")
+    return {"type": "reminder", "message": message, "action": "complete_task"}
+
+
+def schedule_user(
+    queue: InterventionQueue,
+    user_id: str,
+    user_data: Dict[str, Any],
+    intervention: Optional[Dict[str, Any]],
+    now: datetime,
+    reminder_hour: int = 18,
+    morning_hour: int = 9,
+) -> int:
+    """Queue today's task reminder and `intervention` for the user; returns how many changed the queue."""
+    changed = 0
+    reminder = task_reminder(user_data, now)
+    if reminder is not None:
+        changed += queue.enqueue(user_id, reminder, max(now, datetime.combine(now.date(), time(reminder_hour))))
+    if intervention is not None:
+        tomorrow = datetime.combine(now.date() + timedelta(days=1), time(morning_hour))
+        changed += queue.enqueue(user_id, intervention, tomorrow)
+    return changed
+
+
+def schedule_interventions(
+    queue: InterventionQueue,
+    data_manager: DataManager,
+    now: Optional[datetime] = None,
+    user_ids: Optional[Iterable[str]] = None,
+    reminder_hour: int = 18,
+    morning_hour: int = 9,
+) -> Dict[str, int]:
+    """Schedule every stored user (or `user_ids`) with a plan as of `now`; the queue is flushed."""
+    now = now or datetime.now()
+    tracer = Tracer()
+    feedback_agent, decision_agent = FeedbackAgent(tracer), DecisionAgent(tracer)
+    backend = data_manager.backend
+    result = {"users": 0, "queued": 0, "skipped": 0}
+    for user_id in user_ids if user_ids is not None else backend.iter_user_ids():
+        user_data = backend.load(user_id)
+        if not user_data or not user_data.get("current_plan"):
+            result["skipped"] += 1
+            continue
+        intervention = decision_agent.decide_intervention(feedback_agent.aggregate_feedback(user_data))
+        result["users"] += 1
+        result["queued"] += schedule_user(queue, user_id, user_data, intervention, now, reminder_hour, morning_hour)
+        decision_agent.decision_log.clear()
+        feedback_agent.observation_log.clear()
+    queue.flush()
+    return result
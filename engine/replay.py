@@ -0,0 +1,219 @@
+"""
+Counterfactual policy replay: how candidate decision policies would have played out for
+the users in the store.
+
+Users are loaded once per shard. CohortSimulator.from_users takes each user's recorded
+state: plan, difficulty window and streak. The recorded workouts also give the user's own
+completion rate. Every candidate policy (overrides of the DecisionRules params and the
+adaptation thresholds in DEFAULT_POLICY) then runs `iterations` PAOA iterations over a copy of
+that state. Users act on draws from their own stream, random.Random(f"{seed}:{user_id}")
+as in run_batch. A draw is consumed only when the user has a pending task, as in
+simulate_user_action. So every policy meets the same user behaviour, and the results do not
+depend on how users were sharded across worker processes.
+"""
+import json
+import os
+import random
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from agents import PlannerAgent, Tracer
+from tools import DataManager
+from .batch import load_chunk, map_user_chunks
+from .cohort import CohortSimulator, DEFAULT_POLICY, INTERVENTIONS
+
+BASELINE = "baseline"
+# completion_probability is user behaviour, not policy: replay takes it from each user's history.
+POLICY_PARAMS = tuple(k for k in DEFAULT_POLICY if k != "completion_probability")
+COUNTERS = ("users", "actions", "adaptations", "adapted_users", "escalations", "escalated_users")
+
+
+def check_policies(policies: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Validated copy of {name: overrides}, with the unmodified rules first as "baseline"."""
+    for name, overrides in policies.items():
+        unknown = [key for key in overrides if key not in POLICY_PARAMS]
+        if unknown:
+            raise ValueError(
+                f"Policy {name!r} sets unknown params {', '.join(unknown)}; expected any of {', '.join(POLICY_PARAMS)}"
+            )
+    return {BASELINE: {}, **policies}
+
+
+def load_policies(path: str) -> Dict[str, Dict[str, Any]]:
+    """Policies from a JSON file of {"name": {"param": value, ...}, ...}."""
+    with open(path, "r") as f:
+        return check_policies(json.load(f))
+
+
+def completion_rate(user_data: Dict[str, Any]) -> float:
+    """Share of the recorded workouts that were completed; the default policy's rate without any."""
+    completed = acted = 0
+    for workout in user_data.get("workouts", []):
+        status = workout.get("status")
+        if status == "completed":
+            completed += 1
+            acted += 1
+        elif status == "skipped":
+            acted += 1
+    return completed / acted if acted else DEFAULT_POLICY["completion_probability"]
+
+
+def _empty_partial() -> Dict[str, Any]:
+    return {**dict.fromkeys(COUNTERS, 0), "consistency_sum": 0.0, "interventions": [0] * len(INTERVENTIONS)}
+
+
+def _merge_partial(total: Dict[str, Any], partial: Dict[str, Any]) -> None:
+    for name in (*COUNTERS, "consistency_sum"):
+        total[name] += partial[name]
+    total["interventions"] = [a + b for a, b in zip(total["interventions"], partial["interventions"])]
+
+
+def replay_users(
+    users: List[Tuple[str, Dict[str, Any]]], policies: Dict[str, Dict[str, Any]], iterations: int, seed: int
+) -> Dict[str, Dict[str, Any]]:
+    """Replay (user_id, user_data) pairs under every policy; returns mergeable counters per policy."""
+    if not users:
+        return {name: _empty_partial() for name in policies}
+    planner = PlannerAgent(Tracer())
+    states, rates, streams = [], [], []
+    for user_id, user_data in users:
+        if not user_data.get("current_plan"):
+            # What the next PLAN phase would install.
+            plan = planner.create_plan(planner.identify_goal(user_data["profile"]), user_data["profile"])
+            user_data = {**user_data, "current_plan": plan}
+        states.append(user_data)
+        rates.append(completion_rate(user_data))
+        rng = random.Random(f"{seed}:{user_id}")
+        streams.append([rng.random() for _ in range(iterations)])
+    planner.reasoning_log.clear()
+
+    streams = np.array(streams, dtype=np.float64).reshape(len(states), iterations)
+    rows = np.arange(len(states))
+    bases: Dict[int, CohortSimulator] = {}
+    partials = {}
+    for name, overrides in policies.items():
+        window = overrides.get("difficulty_window", DEFAULT_POLICY["difficulty_window"])
+        if window not in bases:
+            bases[window] = CohortSimulator.from_users(states, {"difficulty_window": window})
+            bases[window].completion_probability[:] = rates
+        sim = bases[window].with_policy(overrides)
+        cursor = np.zeros(len(states), dtype=np.int64)
+        adapted = np.zeros(len(states), dtype=bool)
+        escalated = np.zeros(len(states), dtype=bool)
+        out = None
+        for _ in range(iterations):
+            out = sim.step(streams[rows, cursor])
+            cursor += out["acted"]
+            adapted |= out["adapted"]
+            escalated |= out["escalated"]
+        partials[name] = {
+            "users": len(states),
+            "actions": sim.totals["actions"],
+            "adaptations": sim.totals["adaptations"],
+            "adapted_users": int(adapted.sum()),
+            "escalations": sim.totals["escalations"],
+            "escalated_users": int(escalated.sum()),
+            # Consistency the agents observed in the last iteration.
+            "consistency_sum": float(out["consistency"].sum()),
+            "interventions": [int(c) for c in sim.intervention_counts],
+        }
+    return partials
+
+
+def _replay_chunk(
+    manager: DataManager, user_ids: List[str], policies: Dict[str, Dict[str, Any]], iterations: int, seed: int
+) -> Dict[str, Any]:
+    loaded, errors = load_chunk(manager, user_ids)
+    users = [(user_id, user_data) for user_id, user_data in loaded if user_data and user_data.get("profile")]
+    skipped = len(loaded) - len(users)
+    return {"skipped": skipped, "errors": errors, "policies": replay_users(users, policies, iterations, seed)}
+
+
+def replay_policies(
+    policies: Dict[str, Dict[str, Any]],
+    data_dir: str = "data",
+    backend: Optional[str] = None,
+    iterations: int = 10,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 2000,
+    user_ids: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Replay every stored user (or `user_ids`) under the baseline rules and each of `policies`
+    and report outcomes per policy. Without a seed one is drawn and reported, so any run can
+    be repeated. Shards of chunk_size users go to a process pool (workers=1: this process),
+    and partials are merged in shard order, so the report does not depend on `workers`.
+    """
+    if iterations < 1:
+        raise ValueError("iterations must be at least 1")
+    policies = check_policies(policies)
+    seed = seed if seed is not None else random.randrange(2**32)
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    args = (policies, iterations, seed)
+    results = dict(map_user_chunks(_replay_chunk, args, data_dir, backend, workers, chunk_size, user_ids))
+    elapsed = time.perf_counter() - started
+
+    totals = {name: _empty_partial() for name in policies}
+    skipped = errors = 0
+    for index in sorted(results):
+        skipped += results[index]["skipped"]
+        errors += results[index]["errors"]
+        for name, partial in results[index]["policies"].items():
+            _merge_partial(totals[name], partial)
+    users = totals[BASELINE]["users"]
+    return {
+        "seed": seed,
+        "iterations": iterations,
+        "users": users,
+        "skipped": skipped,
+        "errors": errors,
+        "workers": workers,
+        "elapsed_s": elapsed,
+        "users_per_sec": users / elapsed if elapsed else 0.0,
+        "policies": {
+            name: {"overrides": policies[name], **_policy_summary(total)} for name, total in totals.items()
+        },
+    }
+
+
+def _policy_summary(total: Dict[str, Any]) -> Dict[str, Any]:
+    users = total["users"] or 1
+    return {
+        "actions": total["actions"],
+        "adaptations": total["adaptations"],
+        "adaptation_rate": total["adapted_users"] / users,
+        "final_consistency": total["consistency_sum"] / users,
+        "escalations": total["escalations"],
+        "escalation_rate": total["escalated_users"] / users,
+        "interventions": dict(zip(INTERVENTIONS, total["interventions"])),
+    }
+
+
+def format_replay_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"Replayed {report['users']} users x {report['iterations']} iterations under {len(report['policies'])} "
+        f"policies in {report['elapsed_s']:.2f}s ({report['users_per_sec']:.0f} users/sec, "
+        f"{report['workers']} workers, seed {report['seed']})",
+        f"{'policy':<24} {'adapted':>8} {'adaptations':>11} {'consistency':>11} {'escalated':>9}  vs baseline",
+    ]
+    baseline = report["policies"][BASELINE]
+    for name, row in report["policies"].items():
+        delta = (
+            f"consistency {row['final_consistency'] - baseline['final_consistency']:+.2%}, "
+            f"adapted {row['adaptation_rate'] - baseline['adaptation_rate']:+.2%}"
+            if name != BASELINE
+            else "-"
+        )
+        lines.append(
+            f"{name:<24} {row['adaptation_rate']:>8.2%} {row['adaptations']:>11} {row['final_consistency']:>11.2%} "
+            f"{row['escalation_rate']:>9.2%}  {delta}"
+        )
+    if report["skipped"]:
+        lines.append(f"Skipped: {report['skipped']} users without a profile")
+    if report["errors"]:
+        lines.append(f"Errors: {report['errors']} users could not be loaded")
+    return "\n".join(lines)
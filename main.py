@@ -3,17 +3,52 @@ Agentic Wellness System - Main Application (CLI)
 Domains: fitness, nutrition, mental_health, preventive
 Agent Loop: Plan -> Act -> Observe -> Adapt
 """
-from datetime import datetime
+import argparse
+import json
 import random
-from agents import PlannerAgent, DecisionAgent, FeedbackAgent
-from tools import DataManager, FitnessTools
+import sys
+import time
+from datetime import datetime
+from agents import AgentLog, PlannerAgent, DecisionAgent, FeedbackAgent, Tracer, ConsoleSink, JsonlSink, NullSink
+from engine import (
+    simulate_user_action,
+    run_batch,
+    run_async_batch,
+    format_report,
+    cohort_stats,
+    format_cohort_report,
+    load_policies,
+    replay_policies,
+    format_replay_report,
+    schedule_interventions,
+)
+from engine.analytics import GROUP_KEYS
+from engine.loop import PHASE_SERIES
+from tools.fitness_tools import REPORT_FORMATS
+from tools.interventions import DELIVERY_SINKS, FileSink, StdoutSink, StubEndpointSink
+from tools import (
+    DataManager,
+    FitnessTools,
+    available_codecs,
+    export_population,
+    get_codec,
+    get_default_metrics,
+    refresh_population,
+    RolloverScheduler,
+    InterventionQueue,
+    InterventionDispatcher,
+)
 
 
 class AgenticWellnessCoach:
-    def __init__(self):
-        self.planner = PlannerAgent()
-        self.decision_agent = DecisionAgent()
-        self.feedback_agent = FeedbackAgent()
+    def __init__(self, tracer: Tracer = None, seed: int = None, log_dir: str = "data/agent_logs"):
+        self.seed = seed
+        self.rng = random.Random()
+        self.log_dir = log_dir
+        # Reasoning older than the in-memory window is spilled to log_dir and kept across runs.
+        self.planner = PlannerAgent(tracer, log=AgentLog(spill_dir=f"{log_dir}/planner"))
+        self.decision_agent = DecisionAgent(tracer, log=AgentLog(spill_dir=f"{log_dir}/decision"))
+        self.feedback_agent = FeedbackAgent(tracer, log=AgentLog(spill_dir=f"{log_dir}/feedback"))
         self.data_manager = DataManager()
         self.fitness_tools = FitnessTools()
 
@@ -30,17 +65,23 @@ class AgenticWellnessCoach:
         print("=" * 60)
 
         user_data = self.data_manager.load_user_data(user_id)
+        for log in self._logs():
+            log.set_context(user_id)
+        # Same per-user stream as `batch --seed`, so a seeded session can be repeated.
+        self.rng = random.Random(f"{self.seed}:{user_id}") if self.seed is not None else random.Random()
 
         if not user_data.get("current_plan"):
             print("\n[SYSTEM] Initializing new user profile...")
             user_data = self._initialize_user(user_data)
 
+        metrics = get_default_metrics()
         iteration = 0
         while iteration < max_iterations:
             iteration += 1
             print(f"\n{'=' * 60}")
             print(f"AGENT LOOP ITERATION {iteration}")
             print(f"{'=' * 60}")
+            started = time.perf_counter()
 
             # PLAN
             print("\n>>> PHASE 1: PLAN <<<")
@@ -50,6 +91,7 @@ class AgenticWellnessCoach:
                 current_plan = self.planner.create_plan(goal, user_data.get("profile", {}))
                 user_data = self.data_manager.update_plan(user_data, current_plan)
             print(self.fitness_tools.format_plan_display(current_plan))
+            started = metrics.lap(PHASE_SERIES["plan"], started)
 
             # ACT (simulate)
             print("\n>>> PHASE 2: ACT <<<")
@@ -61,10 +103,12 @@ class AgenticWellnessCoach:
                 )
                 user_data = self.data_manager.add_workout(user_data, workout_entry)
                 print(f"[SYSTEM] User action recorded: {user_action['status']} - {user_action['type']}")
+            started = metrics.lap(PHASE_SERIES["act"], started)
 
             # OBSERVE
             print("\n>>> PHASE 3: OBSERVE <<<")
             feedback = self.feedback_agent.aggregate_feedback(user_data)
+            started = metrics.lap(PHASE_SERIES["observe"], started)
 
             # ADAPT
             print("\n>>> PHASE 4: ADAPT <<<")
@@ -82,10 +126,11 @@ class AgenticWellnessCoach:
 
             if self.decision_agent.should_escalate_goal(current_plan, feedback):
                 print("\n[SYSTEM] Long-term goal achieved! Ready for new goal.")
-                user_data["current_plan"] = None
-                user_data["goal_history"].append(current_plan)
+                user_data = self.data_manager.retire_plan(user_data)
+            started = metrics.lap(PHASE_SERIES["adapt"], started)
 
             self.data_manager.save_user_data(user_data, user_id)
+            metrics.lap(PHASE_SERIES["save"], started)
 
             progress = self.fitness_tools.calculate_progress(user_data)
             print(f"\n[PROGRESS] {progress['message']} ({progress['progress_percent']:.1f}%)")
@@ -122,36 +167,335 @@ class AgenticWellnessCoach:
         return user_data
 
     def _simulate_user_action(self, user_data: dict) -> dict:
-        plan = user_data.get("current_plan")
-        if not plan:
-            return None
-        schedule = plan.get("weekly_schedule", [])
-        pending = [w for w in schedule if w.get("status") == "pending"]
-        if not pending:
-            return None
-        workout = pending[0]
-        status = "completed" if random.random() < 0.7 else "skipped"
-        for w in schedule:
-            if w.get("day") == workout.get("day"):
-                w["status"] = status
-        return {"day": workout.get("day"), "type": workout.get("type"), "status": status}
+        return simulate_user_action(user_data, self.rng)
+
+    def _logs(self):
+        return (
+            self.planner.get_reasoning_log(),
+            self.decision_agent.get_decision_log(),
+            self.feedback_agent.get_observation_log(),
+        )
 
     def _print_reasoning_summary(self):
         print("\n=== AGENT REASONING SUMMARY ===")
-        print(f"\nPlannerAgent reasoning steps: {len(self.planner.get_reasoning_log())}")
-        print(f"DecisionAgent decision steps: {len(self.decision_agent.get_decision_log())}")
-        print(f"FeedbackAgent observation steps: {len(self.feedback_agent.get_observation_log())}")
+        print(f"\nPlannerAgent reasoning steps: {self.planner.get_reasoning_log().total}")
+        print(f"DecisionAgent decision steps: {self.decision_agent.get_decision_log().total}")
+        print(f"FeedbackAgent observation steps: {self.feedback_agent.get_observation_log().total}")
         print("\nAll reasoning logs are printed above during execution.")
+        print(f"They are kept in {self.log_dir} (AgentLog.query).")
 
+    def close(self):
+        """Write the reasoning logs still in memory to log_dir."""
+        for log in self._logs():
+            log.close()
 
-if __name__ == "__main__":
-    coach = AgenticWellnessCoach()
+
+def run_batch_command(args):
+    if args.all:
+        data_manager = DataManager(args.data_dir, backend=args.backend, codec=args.codec)
+        user_ids = data_manager.backend.user_ids()
+        data_manager.close()
+    else:
+        user_ids = args.users or [f"{args.prefix}{i}" for i in range(args.count)]
+    if args.concurrency:
+        report = run_async_batch(
+            user_ids,
+            iterations=args.iterations,
+            data_dir=args.data_dir,
+            backend=args.backend,
+            concurrency=args.concurrency,
+            seed=args.seed,
+            codec=args.codec,
+        )
+        print(format_report(report))
+        return
+    report = run_batch(
+        user_ids,
+        iterations=args.iterations,
+        data_dir=args.data_dir,
+        backend=args.backend,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        codec=args.codec,
+    )
+    print(format_report(report))
+
+
+def run_compact_command(args):
+    data_manager = DataManager(args.data_dir, backend="events")
+    result = data_manager.backend.compact_all(args.min_events, keep_archive=not args.drop_archive)
+    data_manager.close()
+    print(f"Compacted {result['users']} users, moved {result['events']} events out of active logs")
+
+
+def run_cohort_command(args):
+    report = cohort_stats(args.data_dir, backend=args.backend, by=args.by, workers=args.workers)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    print(format_cohort_report(report))
+
+
+def run_replay_command(args):
+    report = replay_policies(
+        load_policies(args.policies),
+        args.data_dir,
+        backend=args.backend,
+        iterations=args.iterations,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    print(format_replay_report(report))
+
+
+def run_report_command(args):
+    data_manager = DataManager(args.data_dir, backend=args.backend)
+    backend = data_manager.backend
+    user_ids = args.users or backend.iter_user_ids()
+    users = ((user_id, user_data) for user_id in user_ids if (user_data := backend.load(user_id)) is not None)
+    started = time.perf_counter()
+    count = FitnessTools.write_reports(users, sys.stdout if args.out == "-" else args.out, args.format)
+    data_manager.close()
+    if args.out != "-":
+        print(f"Wrote {count} {args.format} reports to {args.out} in {time.perf_counter() - started:.2f}s")
+
+
+def run_rollover_command(args):
+    data_manager = DataManager(args.data_dir, backend=args.backend)
+    if args.init:
+        scheduler = RolloverScheduler.init(data_manager)
+        print(f"Scheduled {scheduler.wheel.pending()} plan-week boundaries in {scheduler.wheel.path}")
+    else:
+        try:
+            scheduler = RolloverScheduler(data_manager)
+        except FileNotFoundError as e:
+            print(f"Error: {e} (main.py rollover --init)")
+            data_manager.close()
+            return
+    try:
+        while True:
+            now = datetime.fromisoformat(args.now) if args.now else datetime.now()
+            started = time.perf_counter()
+            result = scheduler.tick(now)
+            print(
+                f"[{now.isoformat(timespec='seconds')}] {result['due']} due, {result['rolled']} users rolled "
+                f"over ({result['weeks']} weeks), {result['rescheduled']} rescheduled, {result['dropped']} without a "
+                f"plan, {result['failed']} failed in {time.perf_counter() - started:.2f}s"
+            )
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    data_manager.close()
+
+
+def build_sink(args):
+    if args.sink == "file":
+        return FileSink(args.sink_file)
+    if args.sink == "stub":
+        return StubEndpointSink(args.stub_latency_ms)
+    return StdoutSink()
+
+
+def run_interventions_command(args):
+    try:
+        queue = InterventionQueue(args.queue or f"{args.data_dir}/interventions", int(args.window_hours * 3600))
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
+    sink = build_sink(args)
+    dispatcher = InterventionDispatcher(queue, sink, args.batch_size, args.workers)
+    data_manager = DataManager(args.data_dir, backend=args.backend) if args.schedule else None
     try:
-        coach.run_agent_loop(user_id="default", max_iterations=5)
+        while True:
+            now = datetime.fromisoformat(args.now) if args.now else datetime.now()
+            stamp = now.isoformat(timespec="seconds")
+            if data_manager is not None:
+                started = time.perf_counter()
+                result = schedule_interventions(queue, data_manager, now)
+                print(
+                    f"[{stamp}] Scheduled {result['users']} users ({result['queued']} queue changes, "
+                    f"{result['skipped']} without a plan) in {time.perf_counter() - started:.2f}s"
+                )
+            started = time.perf_counter()
+            result = dispatcher.dispatch(now)
+            print(
+                f"[{stamp}] Delivered {result['sent']} interventions in {result['batches']} batches to {args.sink} "
+                f"in {time.perf_counter() - started:.2f}s, {len(queue)} pending"
+            )
+            if result["error"]:
+                print(f"Error delivering {result['failed']} interventions, retrying next tick: {result['error']}")
+            if not args.watch:
+                break
+            time.sleep(args.watch)
     except KeyboardInterrupt:
-        print("\n\nSystem interrupted by user.")
-    except Exception as e:
-        print(f"\n\nError: {e}")
-        import traceback
+        pass
+    dispatcher.close()
+    sink.close()
+    queue.close()
+    if data_manager is not None:
+        data_manager.close()
+
+
+def run_convert_command(args):
+    codec = get_codec(args.codec)
+    data_manager = DataManager(args.data_dir, backend=args.backend, codec=codec)
+    count = data_manager.backend.rewrite_all()
+    data_manager.close()
+    print(f"Rewrote {count} records with the {codec.name} codec")
+
+
+def run_snapshot_command(args):
+    data_manager = DataManager(args.data_dir, backend=args.backend)
+    started = time.perf_counter()
+    if args.full:
+        snapshot = export_population(data_manager, args.out)
+        print(f"Exported {len(snapshot)} users to {args.out} in {time.perf_counter() - started:.2f}s")
+    else:
+        result = refresh_population(data_manager, args.out)
+        print(
+            f"Refreshed {args.out} in {time.perf_counter() - started:.2f}s: {result['users']} users, "
+            f"{result['reread']} re-read ({result['added']} new), {result['removed']} removed"
+        )
+    data_manager.close()
+
+
+def build_tracer(args) -> Tracer:
+    if args.trace == "jsonl":
+        return Tracer(JsonlSink(args.trace_file))
+    if args.trace == "off":
+        return Tracer(NullSink())
+    return Tracer(ConsoleSink())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Agentic Wellness Coaching System")
+    parser.add_argument("--trace", choices=["console", "jsonl", "off"], default="console", help="Agent trace sink")
+    parser.add_argument("--trace-file", default="agent_trace.jsonl", help="Output path for --trace jsonl")
+    parser.add_argument(
+        "--metrics", help="Record latency histograms and I/O counters, written here on exit (.json, else Prometheus)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="Seed the interactive loop's simulated actions (and batch, replay)"
+    )
+    parser.add_argument("--log-dir", default="data/agent_logs", help="Where the interactive loop spills reasoning logs")
+    subparsers = parser.add_subparsers(dest="command")
+    batch = subparsers.add_parser("batch", help="Run the agent loop headless for many users in parallel")
+    batch.add_argument("--users", nargs="+", help="Explicit user IDs")
+    batch.add_argument("--count", type=int, default=1000, help="Generate user IDs <prefix>0..<count-1>")
+    batch.add_argument("--prefix", default="user_")
+    batch.add_argument("--all", action="store_true", help="Every user already in the store")
+    batch.add_argument("--iterations", type=int, default=5)
+    batch.add_argument("--data-dir", default="data")
+    batch.add_argument("--backend", choices=["json", "sharded", "sqlite", "events"], default=None)
+    batch.add_argument("--workers", type=int, default=None)
+    batch.add_argument("--chunk-size", type=int, default=256)
+    # SUPPRESS: an unset subcommand --seed must not overwrite the top-level one.
+    batch.add_argument("--seed", type=int, default=argparse.SUPPRESS)
+    batch.add_argument(
+        "--codec", choices=[*available_codecs(), "auto"], default=None, help="Record serialization (default: auto)"
+    )
+    batch.add_argument(
+        "--concurrency", type=int, default=None, help="Run users on one asyncio event loop, this many at a time"
+    )
+    compact = subparsers.add_parser("compact", help="Snapshot event-sourced users and archive their event logs")
+    compact.add_argument("--data-dir", default="data")
+    compact.add_argument("--min-events", type=int, default=1, help="Skip users with fewer events in the active log")
+    compact.add_argument("--drop-archive", action="store_true", help="Delete compacted events instead of archiving")
+    cohort = subparsers.add_parser("cohort", help="Consistency, streak, adaptation and intervention stats per group")
+    cohort.add_argument("--data-dir", default="data")
+    cohort.add_argument("--backend", choices=["json", "sharded", "sqlite", "events"], default=None)
+    cohort.add_argument("--by", nargs="*", choices=GROUP_KEYS, default=["domain"], help="Group keys (none: one group)")
+    cohort.add_argument("--workers", type=int, default=None)
+    cohort.add_argument("--json", help="Also write the full report (histograms, frequencies) here")
+    replay = subparsers.add_parser("replay", help="Replay stored users under candidate decision policies")
+    replay.add_argument("--policies", required=True, help='JSON file of {"name": {"param": value, ...}, ...}')
+    replay.add_argument("--data-dir", default="data")
+    replay.add_argument("--backend", choices=["json", "sharded", "sqlite", "events"], default=None)
+    replay.add_argument("--iterations", type=int, default=10)
+    replay.add_argument(
+        "--seed", type=int, default=argparse.SUPPRESS, help="Per-user action streams (default: drawn and reported)"
+    )
+    replay.add_argument("--workers", type=int, default=None)
+    replay.add_argument("--json", help="Also write the full report here")
+    report = subparsers.add_parser("report", help="Stream plan and progress reports for stored users")
+    report.add_argument("--data-dir", default="data")
+    report.add_argument("--backend", choices=["json", "sharded", "sqlite", "events"], default=None)
+    report.add_argument("--users", nargs="+", help="Only these user IDs (default: every stored user)")
+    report.add_argument("--format", choices=REPORT_FORMATS, default="text")
+    report.add_argument("--out", default="-", help="Output file ('-': stdout)")
+    rollover = subparsers.add_parser("rollover", help="Advance plan weeks whose boundary has passed")
+    rollover.add_argument("--data-dir", default="data")
+    rollover.add_argument("--backend", choices=["json", "sharded", "sqlite", "events"], default=None)
+    rollover.add_argument("--init", action="store_true", help="Create the schedule from every stored user (once)")
+    rollover.add_argument("--now", help="Roll over as of this ISO time instead of now")
+    rollover.add_argument("--watch", type=float, default=None, help="Keep ticking, this many seconds apart")
+    interventions = subparsers.add_parser("interventions", help="Queue reminders and deliver the due ones")
+    interventions.add_argument("--data-dir", default="data")
+    interventions.add_argument("--backend", choices=["json", "sharded", "sqlite", "events"], default=None)
+    interventions.add_argument("--queue", help="Queue directory (default: <data-dir>/interventions)")
+    interventions.add_argument(
+        "--schedule", action="store_true", help="First queue each stored user's task reminder and intervention"
+    )
+    interventions.add_argument("--window-hours", type=float, default=24, help="One message per user per window")
+    interventions.add_argument("--sink", choices=DELIVERY_SINKS, default="stdout")
+    interventions.add_argument("--sink-file", default="interventions.jsonl", help="Output path for --sink file")
+    interventions.add_argument("--stub-latency-ms", type=float, default=50.0, help="Batch latency of --sink stub")
+    interventions.add_argument("--batch-size", type=int, default=500)
+    interventions.add_argument("--workers", type=int, default=4, help="Batches in flight at once")
+    interventions.add_argument("--now", help="Schedule and deliver as of this ISO time instead of now")
+    interventions.add_argument("--watch", type=float, default=None, help="Keep ticking, this many seconds apart")
+    snapshot = subparsers.add_parser("snapshot", help="Export or refresh the memory-mapped population snapshot")
+    snapshot.add_argument("--data-dir", default="data")
+    snapshot.add_argument("--backend", choices=["json", "sharded", "sqlite", "events"], default=None)
+    snapshot.add_argument("--out", default="data/population")
+    snapshot.add_argument("--full", action="store_true", help="Re-read every user instead of changed ones only")
+    convert = subparsers.add_parser("convert", help="Re-encode stored records with another serialization codec")
+    convert.add_argument("--data-dir", default="data")
+    convert.add_argument("--backend", choices=["json", "sharded", "sqlite", "events"], default=None)
+    convert.add_argument("--codec", choices=[*available_codecs(), "auto"], required=True)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    get_default_metrics().enabled = bool(args.metrics)
+    if args.command == "batch":
+        run_batch_command(args)
+    elif args.command == "compact":
+        run_compact_command(args)
+    elif args.command == "convert":
+        run_convert_command(args)
+    elif args.command == "snapshot":
+        run_snapshot_command(args)
+    elif args.command == "cohort":
+        run_cohort_command(args)
+    elif args.command == "replay":
+        run_replay_command(args)
+    elif args.command == "report":
+        run_report_command(args)
+    elif args.command == "rollover":
+        run_rollover_command(args)
+    elif args.command == "interventions":
+        run_interventions_command(args)
+    else:
+        coach = AgenticWellnessCoach(build_tracer(args), seed=args.seed, log_dir=args.log_dir)
+        try:
+            coach.run_agent_loop(user_id="default", max_iterations=5)
+        except KeyboardInterrupt:
+            print("\n\nSystem interrupted by user.")
+        except Exception as e:
+            print(f"\n\nError: {e}")
+            import traceback
 
-        traceback.print_exc()
\ No newline at end of file
+            traceback.print_exc()
+        finally:
+            coach.close()
+    if args.metrics:
+        get_default_metrics().write(args.metrics)
+        print(f"Metrics written to {args.metrics}")
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Agentic Wellness System - Cohort Analytics (admin page)
+Population-wide consistency, streak, adaptation and intervention stats per group.
+"""
+import os
+
+import streamlit as st
+from engine import cohort_stats
+from engine.analytics import CONSISTENCY_BINS, GROUP_KEYS
+
+st.set_page_config(page_title="Cohort Analytics", page_icon="📊", layout="wide")
+
+
+# Streams the whole store, so results are shared across sessions until Recompute or the TTL.
+@st.cache_data(ttl=600, show_spinner=False)
+def load_report(data_dir, backend, by, workers):
+    return cohort_stats(data_dir, backend=backend, by=list(by), workers=workers)
+
+
+def group_name(row):
+    return " / ".join(str(v) for v in row["group"].values()) or "all users"
+
+
+st.title("📊 Cohort Analytics")
+st.markdown("---")
+
+with st.sidebar:
+    st.header("Query")
+    with st.form("cohort_form"):
+        data_dir = st.text_input("Data directory", "data")
+        backend = st.selectbox("Backend", ["json", "sharded", "sqlite", "events"])
+        by = st.multiselect("Group by", GROUP_KEYS, default=["domain"])
+        workers = st.number_input("Worker processes", min_value=1, max_value=64, value=os.cpu_count() or 1)
+        if st.form_submit_button("Compute", type="primary"):
+            st.session_state.cohort_query = (data_dir, backend, tuple(by), int(workers))
+
+query = st.session_state.get("cohort_query")
+if query is None:
+    st.info("Choose the store and the groups in the sidebar, then press Compute.")
+    st.stop()
+
+with st.spinner("Streaming users..."):
+    try:
+        report = load_report(*query)
+    except Exception as e:
+        st.error(f"Could not compute cohort stats: {e}")
+        st.stop()
+
+col_caption, col_recompute = st.columns([4, 1])
+col_caption.caption(
+    f"{report['users']} users in {report['elapsed_s']:.2f}s "
+    f"({report['users_per_sec']:.0f} users/sec, {report['workers']} workers)"
+)
+if col_recompute.button("🔄 Recompute"):
+    load_report.clear()
+    st.rerun()
+if report["errors"]:
+    st.warning(f"{report['errors']} users could not be loaded")
+if not report["groups"]:
+    st.info("No users in this store.")
+    st.stop()
+
+st.header("Summary")
+st.dataframe(
+    [
+        {
+            "group": group_name(row),
+            "users": row["users"],
+            "consistency": f"{row['consistency_mean']:.1%}",
+            "streak p50": row["streak_percentiles"]["p50"],
+            "streak p90": row["streak_percentiles"]["p90"],
+            "streak p99": row["streak_percentiles"]["p99"],
+            "adaptations (mean)": round(row["adaptation_mean"], 2),
+            "top intervention": next(iter(row["interventions"]), "-"),
+        }
+        for row in report["groups"]
+    ],
+    width="stretch",
+    hide_index=True,
+)
+
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("Consistency rate distribution")
+    bins = [f"{i * 100 // CONSISTENCY_BINS}-{(i + 1) * 100 // CONSISTENCY_BINS}%" for i in range(CONSISTENCY_BINS)]
+    st.bar_chart(
+        [{"consistency": label, **{group_name(row): row["consistency_histogram"][i] for row in report["groups"]}}
+         for i, label in enumerate(bins)],
+        x="consistency",
+    )
+with col2:
+    st.subheader("Intervention types")
+    types = sorted({t for row in report["groups"] for t in row["interventions"]})
+    st.bar_chart(
+        [{"intervention": t, **{group_name(row): row["interventions"].get(t, 0) for row in report["groups"]}}
+         for t in types],
+        x="intervention",
+    )
+
+st.subheader("Adaptation counts")
+counts = sorted({int(c) for row in report["groups"] for c in row["adaptation_counts"]})
+st.dataframe(
+    [
+        {"group": group_name(row), **{str(c): row["adaptation_counts"].get(c, 0) for c in counts}}
+        for row in report["groups"]
+    ],
+    width="stretch",
+    hide_index=True,
+)
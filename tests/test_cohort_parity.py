@@ -0,0 +1,20 @@
+"""
+CohortSimulator must match the dict-based agents step for step.
+
+benchmarks.bench_cohort.check_parity drives both with the same uniform draws and compares
+plan state, feedback, decisions and interventions after every iteration; small cohorts
+with different seeds cover the escalation and max-adaptation boundaries.
+"""
+import pytest
+
+from benchmarks.bench_cohort import check_parity
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+def test_simulator_matches_dict_agents(seed):
+    mismatches = check_parity(n_users=50, iterations=12, seed=seed)
+    assert mismatches == [], f"{len(mismatches)} mismatches, first: {mismatches[0]}"
+
+
+def test_single_user_cohort():
+    assert check_parity(n_users=1, iterations=20, seed=7) == []
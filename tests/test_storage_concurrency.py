@@ -0,0 +1,55 @@
+"""
+Concurrent writers through DataManager.update_user_data must not lose updates.
+
+Writer processes append workouts to their own user (disjoint) and to a few shared users
+(overlapping) on the same store. Afterwards every user must hold exactly the workouts
+written to it, each once.
+"""
+import multiprocessing
+from collections import Counter
+
+import pytest
+
+from tools import DataManager
+
+PROCS = 6
+WRITES = 50
+SHARED_USERS = ["shared_0", "shared_1", "shared_2"]
+BACKENDS = ["json", "sharded", "sqlite", "events"]
+
+
+def _append(manager: DataManager, tag: str):
+    def mutator(user_data):
+        return manager.add_workout(user_data, {"day": "Monday", "type": "Stress", "status": "completed", "date": tag})
+
+    return mutator
+
+
+def _writer(data_dir: str, backend: str, proc: int) -> None:
+    manager = DataManager(data_dir, backend=backend)
+    for i in range(WRITES):
+        manager.update_user_data(_append(manager, f"p{proc}-{i}"), f"own_{proc}")
+        manager.update_user_data(_append(manager, f"p{proc}-{i}"), SHARED_USERS[i % len(SHARED_USERS)])
+    manager.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_concurrent_writers_lose_no_updates(tmp_path, backend):
+    DataManager(str(tmp_path), backend=backend).close()  # create the store before the writers race to
+    writers = [multiprocessing.Process(target=_writer, args=(str(tmp_path), backend, p)) for p in range(PROCS)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(timeout=120)
+    assert [writer.exitcode for writer in writers] == [0] * PROCS
+
+    manager = DataManager(str(tmp_path), backend=backend)
+    for p in range(PROCS):
+        tags = [w["date"] for w in manager.load_user_data(f"own_{p}")["workouts"]]
+        assert sorted(tags) == sorted(f"p{p}-{i}" for i in range(WRITES))
+    for s, user_id in enumerate(SHARED_USERS):
+        tags = Counter(w["date"] for w in manager.load_user_data(user_id)["workouts"])
+        expected = {f"p{p}-{i}" for p in range(PROCS) for i in range(s, WRITES, len(SHARED_USERS))}
+        assert set(tags) == expected
+        assert max(tags.values()) == 1
+    manager.close()
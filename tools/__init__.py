@@ -1,7 +1,51 @@
 """
 Agentic Fitness Coaching System - Tools Module
 """
+from . import events, feedback_state, metrics, plan_versions, serialization
 from .data_manager import DataManager
 from .fitness_tools import FitnessTools
+from .user_cache import UserCache, WriteBehindBuffer
+from .workout_history import WorkoutHistory, WorkoutRow
+from .time_index import TimeIndex, time_index
+from .storage import (
+    StorageBackend,
+    JsonFileBackend,
+    ShardedFileBackend,
+    SQLiteBackend,
+    migrate_json_to_sqlite,
+)
+from .event_store import EventLogBackend
+from .metrics import Metrics, get_default_metrics, set_default_metrics
+from .serialization import Codec, available_codecs, get_codec
+from .population import PopulationSnapshot, export_population, refresh_population
+from .rollover import RolloverScheduler
+from .interventions import InterventionQueue, InterventionDispatcher
 
-__all__ = ['DataManager', 'FitnessTools']
\ No newline at end of file
+__all__ = [
+    'DataManager',
+    'FitnessTools',
+    'UserCache',
+    'WriteBehindBuffer',
+    'WorkoutHistory',
+    'WorkoutRow',
+    'TimeIndex',
+    'time_index',
+    'StorageBackend',
+    'JsonFileBackend',
+    'ShardedFileBackend',
+    'SQLiteBackend',
+    'migrate_json_to_sqlite',
+    'EventLogBackend',
+    'Metrics',
+    'get_default_metrics',
+    'set_default_metrics',
+    'Codec',
+    'available_codecs',
+    'get_codec',
+    'PopulationSnapshot',
+    'export_population',
+    'refresh_population',
+    'RolloverScheduler',
+    'InterventionQueue',
+    'InterventionDispatcher',
+]
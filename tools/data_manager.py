@@ -1,43 +1,228 @@
 """
 DataManager: Handles user data persistence.
 """
-import json
+import logging
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional, Union
 
+from . import events
+from .event_store import EventLogBackend
+from .metrics import instrumented, timed
+from .rollover import WHEEL_DIR, RolloverWheel, week_due
+from .serialization import Codec, get_codec
+from .storage import StorageBackend, JsonFileBackend, ShardedFileBackend, SQLiteBackend
+from .user_cache import UserCache, WriteBehindBuffer
+from .workout_history import WorkoutHistory
 
+logger = logging.getLogger(__name__)
+
+
+def _sqlite_backend(data_dir: Path, codec: Union[str, Codec, None]) -> SQLiteBackend:
+    # SQLite columns are always JSON text; a binary codec would silently not apply.
+    if codec is not None and get_codec(codec).header:
+        raise ValueError(f"The sqlite backend stores JSON columns and cannot use the {get_codec(codec).name} codec")
+    return SQLiteBackend(data_dir / "user_data.db")
+
+
+BACKENDS = {
+    "json": lambda data_dir, codec: JsonFileBackend(data_dir / "user_data.json", codec=codec),
+    "sqlite": _sqlite_backend,
+    "sharded": lambda data_dir, codec: ShardedFileBackend(data_dir / "users", codec=codec),
+    "events": lambda data_dir, codec: EventLogBackend(data_dir / "events", codec=codec),
+}
+
+
+@instrumented
 class DataManager:
-    def __init__(self, data_dir: str = "data"):
+    """
+    Loads and saves user records through a StorageBackend.
+
+    With cache_size > 0, deserialized records are kept in an LRU cache and revalidated against
+    the backend's version token; the cached dict is returned as-is, so callers share it.
+    With write_behind=True, saves only mark the record dirty; dirty records are flushed every
+    flush_interval seconds, once flush_threshold users are dirty, on flush(), or on close().
+    File backends write records with `codec` (see tools.serialization) and read any codec's files.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = "data",
+        backend: Union[str, StorageBackend, None] = None,
+        cache_size: int = 0,
+        write_behind: bool = False,
+        flush_interval: Optional[float] = 5.0,
+        flush_threshold: int = 100,
+        codec: Union[str, Codec, None] = None,
+    ):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         self.data_file = self.data_dir / "user_data.json"
+        if backend is None or isinstance(backend, str):
+            backend = BACKENDS[backend or "json"](self.data_dir, codec)
+        self.backend = backend
+
+        self._lock = threading.RLock()
+        # Write-behind keeps dirty records in the cache, so it always needs one.
+        capacity = cache_size if cache_size > 0 else (flush_threshold if write_behind else 0)
+        self.cache = UserCache(capacity) if capacity else None
+        self.write_buffer = WriteBehindBuffer(flush_threshold) if write_behind else None
+        self._stop_flusher = threading.Event()
+        self._flusher = None
+        self.rollover: Optional[RolloverWheel] = None
+        self._rollover_due: Dict[str, int] = {}
+        if (self.data_dir / WHEEL_DIR).is_dir():
+            self.attach_rollover(RolloverWheel(self.data_dir / WHEEL_DIR))
+        if write_behind and flush_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, args=(flush_interval,), daemon=True)
+            self._flusher.start()
+
+    def __enter__(self) -> "DataManager":
+        return self
 
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @timed("datamanager_seconds", op="load")
     def load_user_data(self, user_id: str = "default") -> Dict[str, Any]:
-        if not self.data_file.exists():
-            return self._create_default_user(user_id)
+        if self.cache is None:
+            return self._load_uncached(user_id)
+        with self._lock:
+            dirty = self.write_buffer is not None and user_id in self.write_buffer.dirty
+            if dirty:
+                user_data = self.cache.get(user_id, check_version=False)
+                if user_data is not None:
+                    return user_data
+            try:
+                version = self.backend.version(user_id)
+            except Exception:
+                version = None
+            user_data = self.cache.get(user_id, version)
+            if user_data is not None:
+                return user_data
+            user_data = self._load_uncached(user_id, default=False)
+            if user_data is None:
+                return self._create_default_user(user_id)
+            self.cache.put(user_id, user_data, version, self._pinned())
+            return user_data
+
+    @timed("datamanager_seconds", op="save")
+    def save_user_data(self, user_data: Dict[str, Any], user_id: str = "default") -> bool:
+        if self.write_buffer is not None:
+            with self._lock:
+                self.cache.put(user_id, user_data, None, self._pinned())
+                should_flush = self.write_buffer.add(user_id, user_data)
+            return self.flush() if should_flush else True
         try:
-            with open(self.data_file, "r") as f:
-                all_data = json.load(f)
-                return all_data.get(user_id, self._create_default_user(user_id))
+            self.backend.save(user_id, user_data)
+            if self.cache is not None:
+                with self._lock:
+                    self.cache.put(user_id, user_data, self.backend.version(user_id))
         except Exception:
-            return self._create_default_user(user_id)
+            logger.exception("Could not save user %s", user_id)
+            return False
+        self._schedule_rollover(user_id, user_data)
+        return True
 
-    def save_user_data(self, user_data: Dict[str, Any], user_id: str = "default") -> bool:
+    @timed("datamanager_seconds", op="update")
+    def update_user_data(
+        self, mutator: Callable[[Dict[str, Any]], Dict[str, Any]], user_id: str = "default"
+    ) -> Optional[Dict[str, Any]]:
+        """Apply mutator to the freshest stored record under the backend's write lock."""
+        if self.write_buffer is not None and user_id in self.write_buffer.dirty:
+            self.flush()
         try:
-            all_data = {}
-            if self.data_file.exists():
-                with open(self.data_file, "r") as f:
-                    all_data = json.load(f)
-            all_data[user_id] = user_data
-            with open(self.data_file, "w") as f:
-                json.dump(all_data, f, indent=2)
+            user_data = self.backend.update(
+                user_id, lambda stored: mutator(stored if stored is not None else self._create_default_user(user_id))
+            )
+        except Exception:
+            logger.exception("Could not update user %s", user_id)
+            return None
+        if self.cache is not None:
+            with self._lock:
+                self.cache.put(user_id, user_data, self.backend.version(user_id), self._pinned())
+        self._schedule_rollover(user_id, user_data)
+        return user_data
+
+    @timed("datamanager_seconds", op="flush")
+    def flush(self) -> bool:
+        """Write every dirty record to the backend. Failed records stay dirty for the next flush."""
+        if self.write_buffer is None:
             return True
-        except Exception as e:
-            print(f"Error saving data: {e}")
-            return False
+        with self._lock:
+            dirty = self.write_buffer.drain()
+            if not dirty:
+                return True
+            started = time.perf_counter()
+            ok = True
+            for user_id, user_data in dirty.items():
+                try:
+                    self.backend.save(user_id, user_data)
+                    self.cache.set_version(user_id, self.backend.version(user_id))
+                except Exception:
+                    logger.exception("Could not flush user %s; kept dirty for the next flush", user_id)
+                    self.write_buffer.dirty.setdefault(user_id, user_data)
+                    ok = False
+                    continue
+                self._schedule_rollover(user_id, user_data)
+            self.write_buffer.record_flush(len(dirty), started)
+            self.cache.trim(self.write_buffer.dirty)
+            return ok
+
+    def cache_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {"cache": self.cache.stats() if self.cache is not None else None}
+            stats["write_behind"] = self.write_buffer.stats() if self.write_buffer is not None else None
+            return stats
+
+    def close(self) -> None:
+        self._stop_flusher.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self.backend.close()
+
+    def _load_uncached(self, user_id: str, default: bool = True) -> Optional[Dict[str, Any]]:
+        try:
+            user_data = self.backend.load(user_id)
+        except Exception:
+            user_data = None
+        if user_data is None and default:
+            return self._create_default_user(user_id)
+        return user_data
+
+    def attach_rollover(self, wheel: RolloverWheel) -> None:
+        """Schedule each saved plan's next week boundary on `wheel` (see tools.rollover)."""
+        self.rollover = wheel
+
+    def _schedule_rollover(self, user_id: str, user_data: Dict[str, Any]) -> None:
+        if self.rollover is None:
+            return
+        due = week_due(user_data.get("current_plan"))
+        # Only boundaries this process has not scheduled yet; repeated saves of a plan add nothing.
+        if due is None or self._rollover_due.get(user_id) == due:
+            return
+        try:
+            self.rollover.add([(user_id, due)])
+        except Exception:
+            # Not remembered as scheduled, so the user's next save tries again.
+            logger.exception("Could not schedule the week rollover of user %s", user_id)
+            return
+        if len(self._rollover_due) >= 100000:
+            self._rollover_due.clear()
+        self._rollover_due[user_id] = due
+
+    def _pinned(self):
+        return self.write_buffer.dirty if self.write_buffer is not None else ()
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._stop_flusher.wait(interval):
+            self.flush()
 
     def _create_default_user(self, user_id: str) -> Dict[str, Any]:
-        return {
+        user_data = {
             "user_id": user_id,
             "profile": {
                 "domain": "fitness",
@@ -49,16 +234,35 @@ class DataManager:
                 "preventive_focus": "activity",
             },
             "current_plan": None,
-            "workouts": [],
+            "workouts": WorkoutHistory(),
             "goal_history": [],
             "created_at": None,
         }
+        if self.backend.event_sourced:
+            events.track(user_data, created=True)
+        return user_data
 
+    # Mutations are events (tools.events): applied in place, and logged by event-sourced backends.
     def add_workout(self, user_data: Dict[str, Any], workout: Dict[str, Any]) -> Dict[str, Any]:
-        user_data.setdefault("workouts", [])
-        user_data["workouts"].append(workout)
-        return user_data
+        return events.record(user_data, events.ACTION_RECORDED, workout=workout)
+
+    def update_plan(self, user_data: Dict[str, Any], plan: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        event_type = events.PLAN_ADAPTED if user_data.get("current_plan") else events.PLAN_CREATED
+        return events.record(user_data, event_type, plan=plan)
+
+    def retire_plan(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Goal achieved: version the final plan, reference it from goal_history and clear current_plan."""
+        return events.record(user_data, events.GOAL_ESCALATED)
 
-    def update_plan(self, user_data: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
-        user_data["current_plan"] = plan
-        return user_data
\ No newline at end of file
+    def set_task_status(self, user_data: Dict[str, Any], day: str, status: str) -> Dict[str, Any]:
+        return events.record(user_data, events.TASK_STATUS_SET, day=day, status=status)
+
+    def roll_over_week(self, user_data: Dict[str, Any], ended_at: Optional[str] = None) -> Dict[str, Any]:
+        """Close the current plan week: archive its statuses and start the next week with every task pending."""
+        plan = user_data["current_plan"]
+        week = {
+            "week_number": plan.get("week_number", 1),
+            "ended_at": ended_at or datetime.now().isoformat(),
+            "statuses": {task.get("day"): task.get("status") for task in plan.get("weekly_schedule", [])},
+        }
+        return events.record(user_data, events.WEEK_ROLLED_OVER, week=week)
\ No newline at end of file
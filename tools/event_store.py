@@ -0,0 +1,323 @@
+"""
+EventLogBackend: event-sourced user records, an append-only event log per user plus snapshots.
+
+Layout under root/<shard>/ (shard as in ShardedFileBackend), per user:
+  <id>.events          header line {"log_start": n}, then one JSON event per line
+  <id>.snapshot        {"seq", "log_start", "offset", "state"}: the record after `seq` events
+  <id>.<n>.archive.gz  events n.. moved out of the active log by compaction
+
+Snapshots are written with `codec` (see tools.serialization); event lines are always JSON.
+Saving appends the record's pending events (see tools.events) instead of rewriting it, and
+writes a snapshot every `snapshot_every` events. A record that is not tracked is logged whole
+and snapshotted; the caller's dict is not modified. Loading reads the snapshot and replays the
+events after it. Compaction snapshots the record, moves the active log's events to a gzip
+archive (the audit trail stays complete, see history()) and starts an empty log.
+
+A crash can leave a torn last line, which is ignored on load and cut off before the next
+append, or a snapshot newer than the log it was taken from, which replay detects through
+the log header and skips the events already covered.
+"""
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote, unquote
+
+from . import events, feedback_state, serialization
+from .metrics import get_default_metrics
+from .serialization import Codec, json_loads
+from .storage import (
+    PARSE_SECONDS,
+    READ_BYTES,
+    WRITTEN_BYTES,
+    Mutator,
+    StorageBackend,
+    _stat_version,
+    atomic_write_record,
+    file_lock,
+    read_record,
+)
+from .workout_history import attach
+
+LOG_SUFFIX = ".events"
+SNAPSHOT_SUFFIX = ".snapshot"
+ARCHIVE_SUFFIX = ".archive.gz"
+SNAPSHOT_EVERY = 100
+
+
+class EventLogBackend(StorageBackend):
+    event_sourced = True
+
+    def __init__(
+        self,
+        root: Path,
+        snapshot_every: int = SNAPSHOT_EVERY,
+        shard_chars: int = 2,
+        fsync: bool = True,
+        codec: Union[str, Codec, None] = None,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self.shard_chars = shard_chars
+        self.fsync = fsync
+        self.codec = serialization.get_codec(codec)
+
+    def _base(self, user_id: str) -> Path:
+        shard = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[: self.shard_chars]
+        return self.root / shard / quote(user_id, safe="")
+
+    def _paths(self, user_id: str) -> Tuple[Path, Path, Path]:
+        base = self._base(user_id)
+        return (
+            base.with_name(base.name + LOG_SUFFIX),
+            base.with_name(base.name + SNAPSHOT_SUFFIX),
+            base.with_name(base.name + ".lock"),
+        )
+
+    # Reading
+    def _read_snapshot(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "rb") as f:
+                return read_record(f)
+        except FileNotFoundError:
+            return None
+
+    def _replay(self, user_id: str) -> Optional[Dict[str, Any]]:
+        log_path, snapshot_path, _ = self._paths(user_id)
+        snapshot = self._read_snapshot(snapshot_path)
+        state = attach(snapshot["state"]) if snapshot else None
+        seq = snapshot["seq"] if snapshot else 0
+        replayed = 0
+        started = time.perf_counter()
+        try:
+            with open(log_path, "rb") as f:
+                header = f.readline()
+                log_start = json.loads(header)["log_start"] if header.endswith(b"\n") else seq
+                if snapshot and snapshot["log_start"] == log_start:
+                    f.seek(snapshot["offset"])
+                    skip = 0
+                else:
+                    # Snapshot taken after compaction, but the old log is still in place.
+                    skip = seq - log_start
+                begin = f.tell() - len(header)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn append; cut off by the next save
+                    if skip > 0:
+                        skip -= 1
+                        continue
+                    if state is None:
+                        state = {}
+                    events.apply(state, json_loads(line))
+                    replayed += 1
+                read = f.tell() - begin
+        except FileNotFoundError:
+            read = 0
+        metrics = get_default_metrics()
+        if metrics.enabled and read:
+            metrics.observe(PARSE_SECONDS, time.perf_counter() - started)
+            metrics.inc(READ_BYTES, read)
+        if state is None:
+            return None
+        return events.track(state, seq + replayed, replayed)
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self._replay(user_id)
+
+    def version(self, user_id: str) -> Any:
+        log_path, snapshot_path, _ = self._paths(user_id)
+        return _stat_version(log_path), _stat_version(snapshot_path)
+
+    # Writing
+    def _append(self, log_path: Path, lines: List[str], log_start: int) -> int:
+        """Append `lines` (dropping a torn last line first) and return the log's new size."""
+        with open(log_path, "a+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    f.seek(0)
+                    size = f.read().rfind(b"\n") + 1
+                    f.truncate(size)
+            if not size:
+                f.write(json.dumps({"log_start": log_start}).encode() + b"\n")
+            f.write("".join(line + "\n" for line in lines).encode())
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            end = f.tell()
+        metrics = get_default_metrics()
+        if metrics.enabled:
+            metrics.inc(WRITTEN_BYTES, end - size)
+        return end
+
+    def _log_start(self, log_path: Path) -> int:
+        with open(log_path, "rb") as f:
+            return json.loads(f.readline())["log_start"]
+
+    def _count(self, user_id: str) -> Tuple[int, int]:
+        """(events recorded in total, events in the active log), without replaying."""
+        log_path, snapshot_path, _ = self._paths(user_id)
+        try:
+            with open(log_path, "rb") as f:
+                header = f.readline()
+                if header.endswith(b"\n"):
+                    active = sum(1 for line in f if line.endswith(b"\n"))
+                    return json.loads(header)["log_start"] + active, active
+        except FileNotFoundError:
+            pass
+        snapshot = self._read_snapshot(snapshot_path)
+        return (snapshot["seq"] if snapshot else 0), 0
+
+    def _write_snapshot(self, snapshot_path: Path, user_data: Dict[str, Any], seq: int, log_start: int, offset: int):
+        state = {k: v for k, v in user_data.items() if k != events.EVENTS_KEY}
+        snapshot = {"seq": seq, "log_start": log_start, "offset": offset, "state": state}
+        atomic_write_record(snapshot_path, snapshot, self.codec)
+
+    def _save(self, user_id: str, user_data: Dict[str, Any]) -> None:
+        log_path, snapshot_path, _ = self._paths(user_id)
+        replaced = not events.is_tracked(user_data)
+        if replaced:
+            # A record built or edited outside the event path: log it whole and snapshot a tracked
+            # copy. The caller's dict is left as it was, so its next save is logged whole again.
+            user_data = attach(dict(user_data))
+            feedback_state.get_state(user_data)  # build derived state once, into the snapshot
+            event = {"type": events.RECORD_REPLACED, "at": datetime.now().isoformat(), "record": user_data}
+            lines = [events.encode(event)]
+            events.track(user_data, self._count(user_id)[0])
+        else:
+            lines = events.drain(user_data)
+        if not lines:
+            return
+        meta = user_data[events.EVENTS_KEY]
+        end = self._append(log_path, lines, meta["seq"])
+        meta["seq"] += len(lines)
+        meta["since_snapshot"] += len(lines)
+        # A whole record was just written anyway; snapshot it rather than replay it on every load.
+        if replaced or meta["since_snapshot"] >= self.snapshot_every:
+            self._write_snapshot(snapshot_path, user_data, meta["seq"], self._log_start(log_path), end)
+            meta["since_snapshot"] = 0
+
+    def save(self, user_id: str, user_data: Dict[str, Any]) -> None:
+        log_path, _, lock_path = self._paths(user_id)
+        log_path.parent.mkdir(exist_ok=True)
+        with file_lock(lock_path):
+            self._save(user_id, user_data)
+
+    def update(self, user_id: str, mutator: Mutator) -> Dict[str, Any]:
+        log_path, _, lock_path = self._paths(user_id)
+        log_path.parent.mkdir(exist_ok=True)
+        with file_lock(lock_path):
+            user_data = mutator(self._replay(user_id))
+            self._save(user_id, user_data)
+        return user_data
+
+    def delete(self, user_id: str) -> None:
+        log_path, snapshot_path, lock_path = self._paths(user_id)
+        with file_lock(lock_path):
+            for path in [log_path, snapshot_path, *self._archives(user_id)]:
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+
+    def user_ids(self) -> List[str]:
+        ids = set()
+        for suffix in (LOG_SUFFIX, SNAPSHOT_SUFFIX):
+            ids.update(unquote(p.name[: -len(suffix)]) for p in self.root.glob(f"*/*{suffix}"))
+        return sorted(ids)
+
+    def iter_user_ids(self) -> Iterator[str]:
+        for shard in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if not shard.is_dir():
+                continue
+            ids = set()
+            for entry in os.scandir(shard.path):
+                for suffix in (LOG_SUFFIX, SNAPSHOT_SUFFIX):
+                    if entry.name.endswith(suffix):
+                        ids.add(unquote(entry.name[: -len(suffix)]))
+            yield from sorted(ids)
+
+    def rewrite_all(self) -> int:
+        """Re-encode snapshots with the backend's codec; the event logs stay JSON lines."""
+        rewritten = 0
+        for user_id in self.user_ids():
+            _, snapshot_path, lock_path = self._paths(user_id)
+            with file_lock(lock_path):
+                snapshot = self._read_snapshot(snapshot_path)
+                if snapshot is not None:
+                    atomic_write_record(snapshot_path, snapshot, self.codec)
+                    rewritten += 1
+        return rewritten
+
+    # Compaction and audit trail
+    def _archives(self, user_id: str) -> List[Path]:
+        base = self._base(user_id)
+        start = len(base.name) + 1
+        return sorted(
+            p
+            for p in base.parent.glob(f"{base.name}.*{ARCHIVE_SUFFIX}")
+            if len(p.name) == start + 12 + len(ARCHIVE_SUFFIX) and p.name[start : start + 12].isdigit()
+        )
+
+    def compact(self, user_id: str, keep_archive: bool = True) -> int:
+        """Snapshot the record and empty its log; returns the number of events moved out."""
+        log_path, snapshot_path, lock_path = self._paths(user_id)
+        with file_lock(lock_path):
+            user_data = self._replay(user_id)
+            if user_data is None or not log_path.exists():
+                return 0
+            seq = user_data[events.EVENTS_KEY]["seq"]
+            with open(log_path, "rb") as f:
+                log_start = json.loads(f.readline())["log_start"]
+                body = f.read()
+            body = body[: body.rfind(b"\n") + 1]
+            if not body:
+                return 0
+            if keep_archive:
+                archive = log_path.with_name(f"{self._base(user_id).name}.{log_start:012d}{ARCHIVE_SUFFIX}")
+                with gzip.open(archive, "wb") as f:
+                    f.write(body)
+            header = json.dumps({"log_start": seq}).encode() + b"\n"
+            self._write_snapshot(snapshot_path, user_data, seq, seq, len(header))
+            tmp = log_path.with_name(log_path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(header)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, log_path)
+            return seq - log_start
+
+    def compact_all(self, min_events: int = 1, keep_archive: bool = True) -> Dict[str, int]:
+        """Compact every user whose active log holds at least `min_events` events."""
+        compacted = moved = 0
+        for user_id in self.user_ids():
+            if self._count(user_id)[1] >= min_events:
+                count = self.compact(user_id, keep_archive)
+                compacted += bool(count)
+                moved += count
+        return {"users": compacted, "events": moved}
+
+    def history(self, user_id: str) -> Iterator[Dict[str, Any]]:
+        """Every event recorded for the user, archived ones included, oldest first, with its seq."""
+        seq = None
+        for archive in self._archives(user_id):
+            seq = int(archive.name[: -len(ARCHIVE_SUFFIX)].rsplit(".", 1)[1])
+            with gzip.open(archive, "rb") as f:
+                for line in f:
+                    yield {"seq": seq, **json.loads(line)}
+                    seq += 1
+        log_path, _, _ = self._paths(user_id)
+        try:
+            with open(log_path, "rb") as f:
+                seq = json.loads(f.readline())["log_start"]
+                for line in f:
+                    if line.endswith(b"\n"):
+                        yield {"seq": seq, **json.loads(line)}
+                        seq += 1
+        except FileNotFoundError:
+            return
@@ -0,0 +1,163 @@
+"""
+User state changes as events.
+
+Every DataManager mutation is an event applied to user_data in place:
+  ActionRecorded  {"workout"}         a workout entry appended to the history
+  TaskStatusSet   {"day", "status"}   a task of the current plan marked done/skipped/pending
+  PlanCreated     {"plan"}            a plan installed where there was none
+  PlanAdapted     {"plan"}            the current plan replaced (or cleared, plan None)
+  GoalEscalated   {}                  the current plan retired to goal_history and cleared
+  WeekRolledOver  {"week"}            the plan week closed: its statuses archived to week_history,
+                                      week_number advanced and every task pending again
+  UserCreated / RecordReplaced {"record"}  a whole record, for new users and untracked saves
+  RecordUpdated   {"fields"}          the other top-level fields (profile, created_at, ...) after
+                                      they were changed directly
+
+For records that are tracked (loaded from or created for an event-sourced backend), applied
+events are also encoded right away into user_data["_events"]["pending"], so later in-place
+edits of the plan or workout dicts can't change what was recorded. The backend appends the
+pending lines on save. Replay applies the same events to rebuild the record.
+"""
+import json
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from . import feedback_state, plan_versions
+from .workout_history import WorkoutHistory, attach, json_default
+
+ACTION_RECORDED = "ActionRecorded"
+TASK_STATUS_SET = "TaskStatusSet"
+PLAN_CREATED = "PlanCreated"
+PLAN_ADAPTED = "PlanAdapted"
+GOAL_ESCALATED = "GoalEscalated"
+WEEK_ROLLED_OVER = "WeekRolledOver"
+USER_CREATED = "UserCreated"
+RECORD_REPLACED = "RecordReplaced"
+RECORD_UPDATED = "RecordUpdated"
+
+EVENTS_KEY = "_events"
+WEEKS_KEY = "week_history"
+# Fields only ever changed through events; everything else is compared on save.
+EVENT_FIELDS = frozenset(
+    {"workouts", "current_plan", "plan_versions", "goal_history", WEEKS_KEY, feedback_state.STATE_KEY, EVENTS_KEY}
+)
+
+
+def encode(event: Dict[str, Any]) -> str:
+    return json.dumps(event, separators=(",", ":"), default=json_default)
+
+
+def fields_fingerprint(user_data: Dict[str, Any]) -> str:
+    return encode({k: v for k, v in user_data.items() if k not in EVENT_FIELDS})
+
+
+def is_tracked(user_data: Dict[str, Any]) -> bool:
+    return EVENTS_KEY in user_data
+
+
+def track(user_data: Dict[str, Any], seq: int = 0, since_snapshot: int = 0, created: bool = False) -> Dict[str, Any]:
+    """
+    Start recording events for `user_data`, whose stored log already holds `seq` events.
+    With created=True the record is new and its initial state is the first pending event.
+    """
+    pending = []
+    if created:
+        pending.append(encode({"type": USER_CREATED, "at": datetime.now().isoformat(), "record": user_data}))
+    user_data[EVENTS_KEY] = {
+        "seq": seq,
+        "since_snapshot": since_snapshot,
+        "pending": pending,
+        "fields": fields_fingerprint(user_data),
+    }
+    return user_data
+
+
+def untrack(user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return user_data.pop(EVENTS_KEY, None)
+
+
+def record(user_data: Dict[str, Any], event_type: str, **fields) -> Dict[str, Any]:
+    """Apply an event to `user_data` and, if the record is tracked, queue it for the log."""
+    event = {"type": event_type, "at": datetime.now().isoformat(), **fields}
+    apply(user_data, event)
+    meta = user_data.get(EVENTS_KEY)
+    if meta is not None:
+        meta["pending"].append(encode(event))
+    return user_data
+
+
+def drain(user_data: Dict[str, Any]) -> list:
+    """
+    Pending lines for the log, plus a RecordUpdated line if top-level fields were changed
+    directly since the last save. The caller advances meta["seq"] once they are written.
+    """
+    meta = user_data[EVENTS_KEY]
+    lines, meta["pending"] = meta["pending"], []
+    fingerprint = fields_fingerprint(user_data)
+    if fingerprint != meta["fields"]:
+        changed = {k: v for k, v in user_data.items() if k not in EVENT_FIELDS}
+        lines.append(encode({"type": RECORD_UPDATED, "at": datetime.now().isoformat(), "fields": changed}))
+        meta["fields"] = fingerprint
+    return lines
+
+
+def _install(user_data: Dict[str, Any], plan: Optional[Dict[str, Any]]) -> None:
+    if plan is not None:
+        plan_versions.record(user_data, plan)
+    user_data["current_plan"] = plan
+
+
+def _replace(user_data: Dict[str, Any], event: Dict[str, Any]) -> None:
+    record = attach(dict(event["record"]))
+    user_data.clear()
+    user_data.update(record)
+
+
+def _action_recorded(user_data: Dict[str, Any], event: Dict[str, Any]) -> None:
+    user_data.setdefault("workouts", WorkoutHistory())
+    user_data["workouts"].append(event["workout"])
+    feedback_state.record_workout(user_data, event["workout"])
+
+
+def _goal_escalated(user_data: Dict[str, Any], event: Dict[str, Any]) -> None:
+    if user_data.get("current_plan"):
+        plan_versions.retire(user_data, user_data["current_plan"], retired_at=event["at"])
+    _install(user_data, None)
+
+
+def _week_rolled_over(user_data: Dict[str, Any], event: Dict[str, Any]) -> None:
+    week = event["week"]
+    user_data.setdefault(WEEKS_KEY, []).append({**week, "statuses": dict(week["statuses"])})
+    plan = user_data["current_plan"]
+    schedule = [{**task, "status": "pending"} for task in plan.get("weekly_schedule", [])]
+    _install(user_data, {**plan, "week_number": week["week_number"] + 1, "weekly_schedule": schedule})
+
+
+def _task_status_set(user_data: Dict[str, Any], event: Dict[str, Any]) -> None:
+    for task in user_data["current_plan"].get("weekly_schedule", []):
+        if task.get("day") == event["day"]:
+            task["status"] = event["status"]
+
+
+def _record_updated(user_data: Dict[str, Any], event: Dict[str, Any]) -> None:
+    for key in [k for k in user_data if k not in EVENT_FIELDS and k not in event["fields"]]:
+        del user_data[key]
+    user_data.update(event["fields"])
+
+
+HANDLERS = {
+    ACTION_RECORDED: _action_recorded,
+    TASK_STATUS_SET: _task_status_set,
+    PLAN_CREATED: lambda user_data, e: _install(user_data, e["plan"]),
+    PLAN_ADAPTED: lambda user_data, e: _install(user_data, e["plan"]),
+    GOAL_ESCALATED: _goal_escalated,
+    WEEK_ROLLED_OVER: _week_rolled_over,
+    USER_CREATED: _replace,
+    RECORD_REPLACED: _replace,
+    RECORD_UPDATED: _record_updated,
+}
+
+
+def apply(user_data: Dict[str, Any], event: Dict[str, Any]) -> Dict[str, Any]:
+    HANDLERS[event["type"]](user_data, event)
+    return user_data
@@ -0,0 +1,140 @@
+"""
+Incremental feedback state kept in user_data["feedback_state"].
+
+Maintains what FeedbackAgent reads on every observation so that cost no longer grows
+with workout history: the last few workout statuses (difficulty window) and the running
+completed-day streak. Updated in O(1) by DataManager.add_workout; rebuilt from scratch
+only when missing or when the workout list was changed other than by appends (a length
+that does not match, or a WorkoutHistory edit such as WorkoutRow.__setitem__). Plan
+status counts are not stored: plan_counts() counts the plan's handful of tasks on every
+read, so a status set directly on a task is never missed.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from .workout_history import WorkoutHistory
+
+STATE_KEY = "feedback_state"
+RECENT_WINDOW = 5
+PLAN_STATUSES = ("completed", "skipped", "pending")
+
+
+def _parse_day(date_str: Any) -> Optional[date]:
+    try:
+        return datetime.fromisoformat(date_str).date()
+    except Exception:
+        return None
+
+
+def plan_counts(user_data: Dict[str, Any]) -> Dict[str, int]:
+    """Completed, skipped and pending tasks of the current plan, plus its task count."""
+    schedule = (user_data.get("current_plan") or {}).get("weekly_schedule", [])
+    counts = dict.fromkeys(PLAN_STATUSES, 0)
+    for task in schedule:
+        if task.get("status") in counts:
+            counts[task.get("status")] += 1
+    counts["tasks"] = len(schedule)
+    return counts
+
+
+def _completed_run(days: set) -> Dict[str, Any]:
+    if not days:
+        return {"last_day": None, "run": 0}
+    last = max(days)
+    run = 1
+    while last - timedelta(days=run) in days:
+        run += 1
+    return {"last_day": last.isoformat(), "run": run}
+
+
+def build_state(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Full O(history) rebuild."""
+    workouts = user_data.get("workouts", [])
+    completed_days = set()
+    for w in workouts:
+        if w.get("status") == "completed":
+            d = _parse_day(w.get("date", ""))
+            if d is not None:
+                completed_days.add(d)
+    if isinstance(workouts, WorkoutHistory):
+        # Edit count the state accounts for; kept on the history object, whose count starts at 0 on load.
+        workouts._feedback_edits = workouts.edits
+    return {
+        "recent": [w.get("status") for w in workouts[-RECENT_WINDOW:]],
+        "workout_count": len(workouts),
+        "streak": _completed_run(completed_days),
+    }
+
+
+def _in_step(state: Optional[Dict[str, Any]], workouts: Any, appended: int = 0) -> bool:
+    """The state accounts for all but the last `appended` workouts, and none was edited since."""
+    if state is None or state.get("workout_count") != len(workouts) - appended:
+        return False
+    return getattr(workouts, "edits", 0) == getattr(workouts, "_feedback_edits", 0)
+
+
+def get_state(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    state = user_data.get(STATE_KEY)
+    if not _in_step(state, user_data.get("workouts", [])):
+        state = user_data[STATE_KEY] = build_state(user_data)
+    return state
+
+
+def record_workout(user_data: Dict[str, Any], workout: Dict[str, Any]) -> None:
+    """Account for a workout that has just been appended to user_data["workouts"]."""
+    state = user_data.get(STATE_KEY)
+    if not _in_step(state, user_data["workouts"], appended=1):
+        user_data[STATE_KEY] = build_state(user_data)
+        return
+    state["workout_count"] += 1
+    recent = state["recent"]
+    recent.append(workout.get("status"))
+    if len(recent) > RECENT_WINDOW:
+        del recent[0]
+
+    if workout.get("status") != "completed":
+        return
+    d = _parse_day(workout.get("date", ""))
+    if d is None:
+        return
+    streak = state["streak"]
+    last = date.fromisoformat(streak["last_day"]) if streak["last_day"] else None
+    if last is None or d > last + timedelta(days=1):
+        state["streak"] = {"last_day": d.isoformat(), "run": 1}
+    elif d == last + timedelta(days=1):
+        state["streak"] = {"last_day": d.isoformat(), "run": streak["run"] + 1}
+    elif d == last - timedelta(days=streak["run"]):
+        # Back-dated entry that bridges the run to older history: only a rebuild knows how far.
+        state["streak"] = build_state(user_data)["streak"]
+    # Otherwise the day is already inside the run, or too old to touch it.
+
+
+def current_streak(user_data: Dict[str, Any], today: Optional[date] = None) -> int:
+    """Same value as FeedbackAgent._calculate_streak(user_data["workouts"])."""
+    today = today or datetime.now().date()
+    streak = get_state(user_data)["streak"]
+    if streak["last_day"] is None:
+        return 0
+    last = date.fromisoformat(streak["last_day"])
+    if last == today:
+        return streak["run"]
+    if last < today:
+        return 0
+    # Future-dated entries are ignored by the original scan; rare, so fall back to it.
+    return _scan_streak(user_data.get("workouts", []), today)
+
+
+def recent_statuses(user_data: Dict[str, Any]) -> List[Any]:
+    return get_state(user_data)["recent"]
+
+
+def _scan_streak(workouts: List[Dict[str, Any]], today: date) -> int:
+    days = set()
+    for w in workouts:
+        if w.get("status") == "completed":
+            d = _parse_day(w.get("date", ""))
+            if d is not None and d <= today:
+                days.add(d)
+    if today not in days:
+        return 0
+    return _completed_run(days)["run"]
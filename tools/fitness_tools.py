@@ -4,7 +4,66 @@ FitnessTools: Utility functions for fitness calculations and formatting.
 """
 FitnessTools: Utility functions for formatting and progress.
 """
-from typing import Dict, Any, List
+import json
+from typing import Dict, Any, IO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .time_index import time_index
+
+REPORT_FORMATS = ("text", "markdown", "json")
+STATUS_ICONS = {"completed": "✓", "skipped": "○"}
+PENDING_ICON = "□"
+TASK_LINE_CACHE_SIZE = 4096
+
+UserRecord = Union[Dict[str, Any], Tuple[str, Dict[str, Any]]]
+
+_ABSENT = object()
+# (fmt, day, type, detail fields, duration, intensity, status) -> rendered task line.
+_task_line_cache: Dict[Tuple, str] = {}
+
+
+def _render_task_line(task: Dict[str, Any], fmt: str) -> str:
+    icon = STATUS_ICONS.get(task.get("status"), PENDING_ICON)
+    label = task.get("type", "task")
+    detail = task.get("practice") or task.get("task") or ", ".join(task.get("items", [])) or ""
+    day = task.get("day", "N/A")
+    if fmt == "json":
+        fields = {"day": day, "type": label, "detail": detail, "duration_minutes": None, "intensity": None}
+        if "duration_minutes" in task:
+            fields["duration_minutes"] = task.get("duration_minutes", 0)
+            fields["intensity"] = task.get("intensity", "N/A")
+        fields["status"] = task.get("status")
+        return json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+    duration = ""
+    if "duration_minutes" in task:
+        duration = f" ({task.get('duration_minutes', 0)} min, {task.get('intensity', 'N/A')})"
+    if fmt == "markdown":
+        return f"- {icon} **{day}**: {label} {detail}{duration}"
+    return f"  {icon} {day}: {label} {detail}{duration}"
+
+
+def _task_lines(schedule: List[Dict[str, Any]], fmt: str) -> List[str]:
+    """Rendered task lines; plans share a handful of distinct tasks, so most lines are cache hits."""
+    cache = _task_line_cache
+    lines = []
+    for task in schedule:
+        get = task.get
+        items = get("items")
+        key = (
+            fmt,
+            get("day", _ABSENT),
+            get("type", _ABSENT),
+            get("practice") or get("task") or (tuple(items) if items else None),
+            get("duration_minutes", _ABSENT),
+            get("intensity", _ABSENT),
+            get("status"),
+        )
+        line = cache.get(key)
+        if line is None:
+            if len(cache) >= TASK_LINE_CACHE_SIZE:
+                cache.clear()
+            line = cache[key] = _render_task_line(task, fmt)
+        lines.append(line)
+    return lines
 
 
 class FitnessTools:
@@ -14,26 +73,25 @@ class FitnessTools:
             return "No plan available"
 
         goal = plan.get("goal", {})
-        schedule = plan.get("weekly_schedule", [])
-        output = "\n=== PLAN ===\n"
-        output += f"Goal: {goal.get('description', 'N/A')}\n"
-        output += f"Week: {plan.get('week_number', 1)}\n\nSchedule:\n"
-
-        for task in schedule:
-            status_icon = "✓" if task.get("status") == "completed" else "○" if task.get("status") == "skipped" else "□"
-            label = task.get("type", "task")
-            detail = task.get("practice") or task.get("task") or ", ".join(task.get("items", [])) or ""
-            duration = ""
-            if "duration_minutes" in task:
-                duration = f" ({task.get('duration_minutes', 0)} min, {task.get('intensity', 'N/A')})"
-            output += f"  {status_icon} {task.get('day', 'N/A')}: {label} {detail}{duration}\n"
-        return output
+        return "\n".join(
+            [
+                "",
+                "=== PLAN ===",
+                f"Goal: {goal.get('description', 'N/A')}",
+                f"Week: {plan.get('week_number', 1)}",
+                "",
+                "Schedule:",
+                *_task_lines(plan.get("weekly_schedule", []), "text"),
+                "",
+            ]
+        )
 
     @staticmethod
     def calculate_progress(user_data: Dict[str, Any]) -> Dict[str, Any]:
         plan = user_data.get("current_plan")
+        windows = time_index(user_data.get("workouts", [])).windows()
         if not plan:
-            return {"progress_percent": 0, "completed": 0, "total": 0, "message": "No active plan"}
+            return {"progress_percent": 0, "completed": 0, "total": 0, "message": "No active plan", "windows": windows}
 
         schedule = plan.get("weekly_schedule", [])
         total_expected = len(schedule)
@@ -45,8 +103,69 @@ class FitnessTools:
             "completed": completed,
             "total": total_expected,
             "message": f"{completed}/{total_expected} tasks completed",
+            "windows": windows,
         }
 
+    @staticmethod
+    def render_report(user_data: Dict[str, Any], user_id: Optional[str] = None, fmt: str = "text") -> str:
+        """Weekly plan and progress report for one user, in one of REPORT_FORMATS, newline-terminated."""
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format {fmt!r}; expected one of {', '.join(REPORT_FORMATS)}")
+        user_id = user_id or user_data.get("user_id", "N/A")
+        plan = user_data.get("current_plan")
+        progress = FitnessTools.calculate_progress(user_data)
+        windows = progress["windows"]
+        if fmt == "json":
+            head = {
+                "user_id": user_id,
+                "goal": (plan.get("goal") or {}).get("description") if plan else None,
+                "week_number": plan.get("week_number", 1) if plan else None,
+                "progress": progress,
+            }
+            tasks = ",".join(_task_lines(plan.get("weekly_schedule", []), fmt)) if plan else ""
+            return json.dumps(head, ensure_ascii=False, separators=(",", ":"))[:-1] + f',"tasks":[{tasks}]}}\n'
+
+        rates = " | ".join(
+            f"{name}: {w['completed']}/{w['total']} ({w['completion_rate']:.0%})" for name, w in windows.items()
+        )
+        summary = f"{progress['message']} ({progress['progress_percent']:.1f}%)"
+        if fmt == "markdown":
+            lines = [f"## {user_id}", ""]
+            if plan:
+                goal = (plan.get("goal") or {}).get("description", "N/A")
+                lines += [f"**Goal:** {goal}  ", f"**Week:** {plan.get('week_number', 1)}", ""]
+                lines += _task_lines(plan.get("weekly_schedule", []), fmt)
+                lines.append("")
+            lines += [f"**Progress:** {summary}  ", f"**Recent:** {rates}", "", ""]
+            return "\n".join(lines)
+        plan_text = FitnessTools.format_plan_display(plan) if plan else "\nNo plan available\n"
+        return f"=== USER {user_id} ==={plan_text}Progress: {summary}\nRecent: {rates}\n\n"
+
+    @staticmethod
+    def render_reports(users: Iterable[UserRecord], fmt: str = "text") -> Iterator[str]:
+        """
+        Lazily render one report per user record, or per (user_id, record) pair, so any number
+        of users can be streamed out without holding more than one record or report at a time.
+        """
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format {fmt!r}; expected one of {', '.join(REPORT_FORMATS)}")
+        for user in users:
+            user_id, user_data = user if isinstance(user, tuple) else (None, user)
+            yield FitnessTools.render_report(user_data, user_id, fmt)
+
+    @staticmethod
+    def write_reports(users: Iterable[UserRecord], out: Union[str, IO[str]], fmt: str = "text") -> int:
+        """Stream render_reports into a text stream or a file path; returns the number of reports."""
+        if isinstance(out, str):
+            with open(out, "w", encoding="utf-8") as f:
+                return FitnessTools.write_reports(users, f, fmt)
+        count = 0
+        write = out.write
+        for report in FitnessTools.render_reports(users, fmt):
+            write(report)
+            count += 1
+        return count
+
     @staticmethod
     def create_workout_entry(day: str, workout_type: str, status: str = "completed") -> Dict[str, Any]:
         from datetime import datetime
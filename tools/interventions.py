@@ -0,0 +1,408 @@
+"""
+Timed intervention delivery: a persisted, heap-ordered queue of interventions due per user,
+and a dispatcher that sends the due ones in batches to a pluggable sink.
+
+The queue is a heapq of entries ordered by (due, seq), in memory. It is backed by an
+append-only journal, <path>/queue.log, which gets one JSON line per change:
+  {"op": "add", "seq", "user_id", "due", "priority", "intervention"}
+  {"op": "drop", "seq"}                    superseded by a coalesced entry
+  {"op": "sent", "seq", "user_id", "due"}  delivered
+  {"op": "clock", "seq": null, "due"}      pop_due() was called for this time
+Opening replays the journal and heapifies the live entries. After that, enqueue and
+dequeue are O(log n). Once the journal has doubled since it was last rewritten, it is
+rewritten with only the live entries.
+
+Coalescing: a user gets at most one message per `window_seconds` window (epoch-aligned, so
+a day window runs midnight to midnight). An intervention queued into a window that already
+has one pending keeps the higher-priority intervention (PRIORITIES) at the earlier of the
+two due times. An intervention queued into a window that was already delivered is
+dropped. One due before the queue's clock (the latest time pop_due() was called for)
+counts as due at the clock. Sent markers for windows before the clock's can then be
+forgotten. Superseded entries stay in the heap and are skipped when they surface.
+
+Delivery is at least once. pop_due() hands entries out, and only ack() records them as
+sent. A crash in between re-delivers them on the next run. A failed batch goes back with
+release().
+"""
+import heapq
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, NamedTuple, Optional, TextIO, Union
+
+from . import serialization
+from .serialization import json_loads
+from .time_index import to_micros
+
+try:
+    import fcntl
+except ImportError:  # Windows: nothing stops a second process opening the queue
+    fcntl = None
+
+JOURNAL = "queue.log"
+# Which intervention a user's window keeps when two land in it; unknown types rank lowest.
+PRIORITIES = {"motivation": 4, "reminder": 3, "celebration": 2, "positive_reinforcement": 1, "encouragement": 0}
+DELIVERY_SINKS = ("stdout", "file", "stub")
+
+_SENT = -1  # window marker: this window's message has gone out
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _iso(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+class Pending(NamedTuple):
+    """A queued intervention; heap order is (due, seq), seq being unique."""
+
+    due: int
+    seq: int
+    user_id: str
+    priority: int
+    intervention: Dict[str, Any]
+
+    def message(self) -> Dict[str, Any]:
+        return {"user_id": self.user_id, "due": _iso(self.due), **self.intervention}
+
+
+class InterventionQueue:
+    """
+    Interventions due per user, persisted under `path`. One process owns a queue at a time
+    (an exclusive lock is held while it is open), and it is not thread-safe.
+    """
+
+    def __init__(
+        self, path: Union[str, Path], window_seconds: int = 86400, fsync: bool = True, compact_min: int = 10000
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.window_us = window_seconds * 10**6
+        self.fsync = fsync
+        self.compact_min = compact_min
+        self._codec = serialization.get_codec()
+        self._lock_file = open(self.path / ".lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._lock_file.close()
+                raise RuntimeError(f"The intervention queue at {self.path} is open in another process")
+        self._entries: Dict[int, Pending] = {}  # seq -> live entry
+        self._inflight: Dict[int, Pending] = {}  # popped, not yet acked
+        self._windows: Dict[tuple, int] = {}  # (user_id, window) -> seq, or _SENT
+        self._next_seq = 1
+        self._records = 0
+        self._clock = 0  # latest pop_due() time, journaled
+        self._replay()
+        self._compacted = len(self._entries) + len(self._windows)
+        self._heap = list(self._entries.values())
+        heapq.heapify(self._heap)
+        self._file = open(self.path / JOURNAL, "ab", buffering=1 << 16)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        """Entries waiting to be delivered, not counting those handed out by pop_due."""
+        return len(self._entries)
+
+    def _replay(self) -> None:
+        journal = self.path / JOURNAL
+        try:
+            f = open(journal, "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            end = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn append; cut off below
+                end += len(line)
+                self._records += 1
+                record = json_loads(line)
+                op, seq = record["op"], record["seq"]
+                if op == "add":
+                    entry = Pending(record["due"], seq, record["user_id"], record["priority"], record["intervention"])
+                    self._entries[seq] = entry
+                    self._windows[(entry.user_id, entry.due // self.window_us)] = seq
+                    self._next_seq = max(self._next_seq, seq + 1)
+                elif op == "drop":
+                    self._entries.pop(seq, None)
+                elif op == "sent":
+                    self._entries.pop(seq, None)
+                    self._windows[(record["user_id"], record["due"] // self.window_us)] = _SENT
+                elif op == "clock":
+                    self._clock = max(self._clock, record["due"])
+            f.truncate(end)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(self._codec.encode(record) + b"\n")
+        self._records += 1
+
+    def enqueue(self, user_id: str, intervention: Dict[str, Any], due: Union[int, str, datetime]) -> bool:
+        """
+        Queue `intervention` ({"type", "message", ...}) for `user_id` at `due` (a datetime,
+        ISO string or epoch microseconds). Returns False when it was coalesced into the
+        window's existing message unchanged.
+        """
+        due = due if isinstance(due, int) else to_micros(due)
+        if due is None:
+            raise ValueError("Intervention due time must be a datetime, ISO string or epoch microseconds")
+        due = max(due, self._clock)
+        key = (user_id, due // self.window_us)
+        priority = PRIORITIES.get(intervention.get("type"), 0)
+        seq = self._windows.get(key)
+        if seq is not None:
+            current = self._entries.get(seq)
+            if current is None:
+                return False  # already sent, or being sent, in this window
+            same = priority == current.priority and intervention == current.intervention
+            if priority < current.priority or same:
+                if current.due <= due:
+                    return False
+                priority, intervention = current.priority, current.intervention
+            due = min(due, current.due)
+            del self._entries[seq]
+            self._write({"op": "drop", "seq": seq})
+        entry = Pending(due, self._next_seq, user_id, priority, intervention)
+        self._next_seq += 1
+        self._write(
+            {
+                "op": "add",
+                "seq": entry.seq,
+                "user_id": user_id,
+                "due": due,
+                "priority": priority,
+                "intervention": intervention,
+            }
+        )
+        self._entries[entry.seq] = entry
+        self._windows[key] = entry.seq
+        heapq.heappush(self._heap, entry)
+        return True
+
+    def next_due(self) -> Optional[int]:
+        """Epoch microseconds of the earliest pending entry, or None when the queue is empty."""
+        heap = self._heap
+        while heap and self._entries.get(heap[0].seq) is not heap[0]:
+            heapq.heappop(heap)
+        return heap[0].due if heap else None
+
+    def pop_due(self, now: Union[int, datetime, None] = None, limit: int = 500) -> List[Pending]:
+        """Hand out up to `limit` entries due by `now`, earliest first; ack() or release() each."""
+        now_us = now if isinstance(now, int) else to_micros(now or datetime.now())
+        if now_us > self._clock:
+            self._clock = now_us
+            self._write({"op": "clock", "seq": None, "due": now_us})
+        heap, entries = self._heap, self._entries
+        batch = []
+        while heap and len(batch) < limit and heap[0].due <= now_us:
+            entry = heapq.heappop(heap)
+            if entries.get(entry.seq) is entry:
+                del entries[entry.seq]
+                self._inflight[entry.seq] = entry
+                batch.append(entry)
+        return batch
+
+    def ack(self, batch: List[Pending]) -> None:
+        """Record `batch` as delivered; its windows take no further messages."""
+        for entry in batch:
+            del self._inflight[entry.seq]
+            self._windows[(entry.user_id, entry.due // self.window_us)] = _SENT
+            self._write({"op": "sent", "seq": entry.seq, "user_id": entry.user_id, "due": entry.due})
+        if self._records > max(self.compact_min, 2 * self._compacted):
+            self.compact()
+
+    def release(self, batch: List[Pending]) -> None:
+        """Put back entries whose delivery failed, to be handed out again."""
+        for entry in batch:
+            del self._inflight[entry.seq]
+            self._entries[entry.seq] = entry
+            heapq.heappush(self._heap, entry)
+
+    def flush(self) -> None:
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def compact(self) -> None:
+        """
+        Rewrite the journal with only the pending entries and the sent markers of windows
+        that are not over yet (as of the last pop_due), and rebuild the heap without
+        superseded entries.
+        """
+        current = self._clock // self.window_us
+        self._windows = {
+            key: seq
+            for key, seq in self._windows.items()
+            if seq in self._entries or seq in self._inflight or (seq == _SENT and key[1] >= current)
+        }
+        self._file.close()
+        tmp = self.path / f".{JOURNAL}.tmp"
+        self._records = 0
+        self._file = open(tmp, "wb", buffering=1 << 16)
+        self._write({"op": "clock", "seq": None, "due": self._clock})
+        for (user_id, window), seq in self._windows.items():
+            if seq == _SENT:
+                self._write({"op": "sent", "seq": None, "user_id": user_id, "due": window * self.window_us})
+        for entry in sorted((*self._entries.values(), *self._inflight.values()), key=lambda e: e.seq):
+            self._write(
+                {
+                    "op": "add",
+                    "seq": entry.seq,
+                    "user_id": entry.user_id,
+                    "due": entry.due,
+                    "priority": entry.priority,
+                    "intervention": entry.intervention,
+                }
+            )
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(tmp, self.path / JOURNAL)
+        self._compacted = self._records
+        self._file = open(self.path / JOURNAL, "ab", buffering=1 << 16)
+        self._heap = list(self._entries.values())
+        heapq.heapify(self._heap)
+
+    def close(self) -> None:
+        """Flush the journal and release the queue; entries still handed out will be re-delivered."""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        self._lock_file.close()
+
+
+class DeliverySink:
+    """Receives batches of {"user_id", "due", "type", "message", "action"}; send() may run on several threads."""
+
+    def send(self, messages: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class StdoutSink(DeliverySink):
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def send(self, messages: List[Dict[str, Any]]) -> None:
+        text = "".join(f"[DELIVERY] {m['due']} {m['user_id']}: {m['message']}\n" for m in messages)
+        with self.lock:
+            stream = self.stream or sys.stdout
+            stream.write(text)
+            stream.flush()
+
+
+class FileSink(DeliverySink):
+    """One JSON line per message, appended to `path`; each batch is on disk before send() returns."""
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.file = open(path, "ab")
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self._codec = serialization.get_codec()
+
+    def send(self, messages: List[Dict[str, Any]]) -> None:
+        data = b"".join(self._codec.encode(m) + b"\n" for m in messages)
+        with self.lock:
+            self.file.write(data)
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class StubEndpointSink(DeliverySink):
+    """
+    Stands in for a remote push endpoint: every batch takes `latency_ms`, and a share
+    `failure_rate` of batches is rejected with ConnectionError. Counts what it accepted.
+    """
+
+    def __init__(self, latency_ms: float = 50.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.received = 0
+        self.batches = 0
+
+    def send(self, messages: List[Dict[str, Any]]) -> None:
+        time.sleep(self.latency)
+        with self.lock:
+            if self.failure_rate and self.rng.random() < self.failure_rate:
+                raise ConnectionError(f"Stub endpoint rejected a batch of {len(messages)}")
+            self.received += len(messages)
+            self.batches += 1
+
+
+class InterventionDispatcher:
+    """
+    Delivers what is due on `queue` to `sink`, in batches of `batch_size` with up to
+    `workers` batches in flight. Sends run on worker threads; the queue is only touched
+    from the thread calling dispatch().
+    """
+
+    def __init__(self, queue: InterventionQueue, sink: DeliverySink, batch_size: int = 500, workers: int = 4):
+        self.queue = queue
+        self.sink = sink
+        self.batch_size = batch_size
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def dispatch(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Send everything due by `now`. A failed batch goes back on the queue and ends this
+        dispatch (the sink is likely down), to be retried on the next one.
+        """
+        now_us = to_micros(now or datetime.now())
+        result = {"sent": 0, "batches": 0, "failed": 0, "error": None}
+        while not result["failed"]:
+            batches = []
+            for _ in range(self.workers):
+                batch = self.queue.pop_due(now_us, self.batch_size)
+                if not batch:
+                    break
+                batches.append(batch)
+            if not batches:
+                break
+            messages = [[entry.message() for entry in batch] for batch in batches]
+            if self._pool is None:
+                outcomes = [self._send(messages[0])]
+            else:
+                outcomes = list(self._pool.map(self._send, messages))
+            for batch, error in zip(batches, outcomes):
+                if error is None:
+                    self.queue.ack(batch)
+                    result["sent"] += len(batch)
+                    result["batches"] += 1
+                else:
+                    self.queue.release(batch)
+                    result["failed"] += len(batch)
+                    result["error"] = f"{type(error).__name__}: {error}"
+            self.queue.flush()
+        return result
+
+    def _send(self, messages: List[Dict[str, Any]]) -> Optional[Exception]:
+        try:
+            self.sink.send(messages)
+        except Exception as e:
+            return e
+        return None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
@@ -0,0 +1,273 @@
+"""
+Metrics: fixed-bucket latency histograms and counters, cheap enough to leave on.
+
+Series are keyed by (name, labels) tuples built once with key(); hot paths guard on
+`metrics.enabled` the way agents guard on `tracer.info`, so disabled metrics cost an
+attribute lookup and no timer calls. Methods marked @timed on @instrumented classes cost
+nothing while the default metrics are disabled: the timing wrappers are only installed on
+the classes while they are enabled. Observing is a bisect over the bucket bounds plus
+three additions under a lock. Export as Prometheus text (to_prometheus) or a JSON
+snapshot (snapshot); write() picks the format from the file suffix.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+# Upper bounds in seconds, 10us .. 10s.
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# Series names shared across modules.
+AGENT_SECONDS = "agent_method_seconds"
+PHASE_SECONDS = "loop_phase_seconds"
+
+
+def key(name: str, **labels) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot: above the largest bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def clear(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def quantile(self, q: float) -> float:
+        """Estimate, interpolating linearly inside the bucket that holds the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bounds": list(self.bounds),
+            "counts": list(self.counts),
+            "sum": self.sum,
+            "count": self.count,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[Key, Histogram] = {}
+        self.counters: Dict[Key, float] = {}
+        self._lock = threading.Lock()
+        self.enabled = enabled
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        self._enabled = bool(value)
+        if self is _default_metrics:
+            _install_timers()
+
+    def histogram(self, series: Key) -> Histogram:
+        with self._lock:
+            histogram = self.histograms.get(series)
+            if histogram is None:
+                histogram = self.histograms[series] = Histogram(self.buckets)
+            return histogram
+
+    def observe(self, series: Key, value: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(series)
+            if histogram is None:
+                histogram = self.histograms[series] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, series: Key, value: float = 1) -> None:
+        with self._lock:
+            self.counters[series] = self.counters.get(series, 0) + value
+
+    def lap(self, series: Key, started: float) -> float:
+        """Observe the time since `started` (perf_counter) if enabled; returns now."""
+        now = time.perf_counter()
+        if self.enabled:
+            self.observe(series, now - started)
+        return now
+
+    def reset(self) -> None:
+        # Histograms are zeroed in place: timed() keeps references to them.
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.clear()
+            self.counters.clear()
+
+    # Export
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "histograms": [
+                    {"name": name, "labels": dict(labels), **h.to_dict()}
+                    for (name, labels), h in sorted(self.histograms.items())
+                    if h.count
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+            }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """Add another process's snapshot (same buckets) into this one."""
+        with self._lock:
+            for h in snapshot["histograms"]:
+                series = key(h["name"], **h["labels"])
+                histogram = self.histograms.get(series)
+                if histogram is None:
+                    histogram = self.histograms[series] = Histogram(tuple(h["bounds"]))
+                histogram.counts = [a + b for a, b in zip(histogram.counts, h["counts"])]
+                histogram.sum += h["sum"]
+                histogram.count += h["count"]
+            for c in snapshot["counters"]:
+                series = key(c["name"], **c["labels"])
+                self.counters[series] = self.counters.get(series, 0) + c["value"]
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        typed = set()
+        snapshot = self.snapshot()
+        for h in snapshot["histograms"]:
+            if h["name"] not in typed:
+                typed.add(h["name"])
+                lines.append(f"# TYPE {h['name']} histogram")
+            cumulative = 0
+            for bound, count in zip(h["bounds"] + ["+Inf"], h["counts"]):
+                cumulative += count
+                lines.append(f"{h['name']}_bucket{_labels(h['labels'], le=bound)} {cumulative}")
+            lines.append(f"{h['name']}_sum{_labels(h['labels'])} {h['sum']:.9g}")
+            lines.append(f"{h['name']}_count{_labels(h['labels'])} {h['count']}")
+        for c in snapshot["counters"]:
+            if c["name"] not in typed:
+                typed.add(c["name"])
+                lines.append(f"# TYPE {c['name']} counter")
+            lines.append(f"{c['name']}{_labels(c['labels'])} {c['value']:.9g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """JSON snapshot for *.json, Prometheus text format otherwise; replaced atomically."""
+        path = Path(path)
+        if path.suffix == ".json":
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.to_prometheus()
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+def _labels(labels: Dict[str, str], **extra) -> str:
+    pairs = {**labels, **{k: v if isinstance(v, str) else f"{v:g}" for k, v in extra.items()}}
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs.items()) + "}"
+
+
+_instrumented: List[type] = []
+_default_metrics: Optional[Metrics] = None  # Metrics.enabled compares against it, so bind it first
+_default_metrics = Metrics()
+
+
+def get_default_metrics() -> Metrics:
+    return _default_metrics
+
+
+def set_default_metrics(metrics: Metrics) -> None:
+    """Metrics recorded by the agents, AgentLoop and DataManager."""
+    global _default_metrics
+    _default_metrics = metrics
+    _install_timers()
+
+
+def timed(name: str, **labels) -> Callable:
+    """Mark a method of an @instrumented class to have its latency observed in histogram `name`."""
+    series = key(name, **labels)
+
+    def mark(fn: Callable) -> Callable:
+        fn.metrics_series = series
+        return fn
+
+    return mark
+
+
+def _timer(fn: Callable) -> Callable:
+    series = fn.metrics_series
+    cached = [None, None]  # metrics, its histogram for `series`
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        metrics = _default_metrics
+        if cached[0] is not metrics:
+            cached[:] = metrics, metrics.histogram(series)
+        histogram = cached[1]
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with metrics._lock:
+                histogram.observe(elapsed)
+
+    wrapper.timer_for = fn
+    return wrapper
+
+
+def _install_timers() -> None:
+    """Swap the @timed methods of instrumented classes to match the default metrics' state."""
+    enabled = _default_metrics is not None and _default_metrics.enabled
+    for cls in _instrumented:
+        for name, attr in list(vars(cls).items()):
+            original = getattr(attr, "timer_for", attr)
+            if not hasattr(original, "metrics_series"):
+                continue
+            if enabled and attr is original:
+                setattr(cls, name, _timer(original))
+            elif not enabled and attr is not original:
+                setattr(cls, name, original)
+
+
+def instrumented(cls: type) -> type:
+    """Class decorator: register `cls` so its @timed methods are timed while metrics are enabled."""
+    _instrumented.append(cls)
+    _install_timers()
+    return cls
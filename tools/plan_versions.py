@@ -0,0 +1,150 @@
+"""
+Plan version history kept in user_data["plan_versions"].
+
+Every plan DataManager installs (creation, each adaptation, and the final state of a plan
+whose goal is retired) becomes a version. A version is stored as a compact delta against
+the previous one: changed top-level fields, changed task fields by schedule position,
+and a new schedule length when tasks are dropped or added. A full snapshot is stored for
+the first version of each goal and after every `snapshot_every` deltas, so rebuilding
+any version applies at most that many deltas.
+
+Stored values are private copies, so later in-place edits of the live plan (task status,
+adaptation) can never rewrite an old version. goal_history then holds small references
+({"version", "goal", "created_at", "retired_at"}) instead of whole plan dicts.
+
+user_data["current_plan"] is kept as its own full dict rather than rebuilt from the chain:
+it is the live plan every agent reads and task statuses are set on it in place without
+becoming a version, it is None after retirement while the versions remain, and records
+without plan_versions must still load. It costs one plan (about 2% of a record with a
+long version history) and saves applying up to `snapshot_every` deltas on every load.
+"""
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+VERSIONS_KEY = "plan_versions"
+SNAPSHOT_EVERY = 10
+SCHEDULE = "weekly_schedule"
+
+
+def _clone(value: Any) -> Any:
+    """Deep copy for JSON-shaped data; much cheaper than copy.deepcopy."""
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+def _diff_fields(old: Dict[str, Any], new: Dict[str, Any], skip: Optional[str] = None) -> Dict[str, Any]:
+    changes = {}
+    changed = {k: _clone(v) for k, v in new.items() if k != skip and (k not in old or old[k] != v)}
+    removed = [k for k in old if k != skip and k not in new]
+    if changed:
+        changes["set"] = changed
+    if removed:
+        changes["unset"] = removed
+    return changes
+
+
+def _patch_fields(target: Dict[str, Any], changes: Dict[str, Any]) -> None:
+    for k in changes.get("unset", ()):
+        target.pop(k, None)
+    for k, v in changes.get("set", {}).items():
+        target[k] = _clone(v)
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Delta turning `old` into `new`. Schedules are compared task by task, by position."""
+    old_tasks, new_tasks = old.get(SCHEDULE), new.get(SCHEDULE)
+    if not isinstance(old_tasks, list) or not isinstance(new_tasks, list):
+        return _diff_fields(old, new)
+    delta = _diff_fields(old, new, skip=SCHEDULE)
+    tasks = {}
+    for i in range(min(len(old_tasks), len(new_tasks))):
+        if old_tasks[i] != new_tasks[i]:
+            tasks[str(i)] = _diff_fields(old_tasks[i], new_tasks[i])
+    if tasks:
+        delta["tasks"] = tasks
+    if len(new_tasks) != len(old_tasks):
+        delta["length"] = len(new_tasks)
+        if len(new_tasks) > len(old_tasks):
+            delta["append"] = _clone(new_tasks[len(old_tasks):])
+    return delta
+
+
+def apply(plan: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply `delta` to `plan` in place and return it."""
+    _patch_fields(plan, delta)
+    schedule = plan.get(SCHEDULE)
+    for i, changes in delta.get("tasks", {}).items():
+        _patch_fields(schedule[int(i)], changes)
+    if "length" in delta:
+        del schedule[delta["length"]:]
+        schedule.extend(_clone(delta.get("append", [])))
+    return plan
+
+
+def _store(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    return user_data.setdefault(VERSIONS_KEY, {"snapshot_every": SNAPSHOT_EVERY, "entries": [], "snapshots": []})
+
+
+def count(user_data: Dict[str, Any]) -> int:
+    return len(user_data.get(VERSIONS_KEY, {}).get("entries", []))
+
+
+def get_version(user_data: Dict[str, Any], version: int = -1) -> Optional[Dict[str, Any]]:
+    """Rebuild version `version` (negative counts from the latest) as a fresh dict the caller owns."""
+    store = user_data.get(VERSIONS_KEY)
+    if not store or not store["entries"]:
+        return None
+    entries = store["entries"]
+    if version < 0:
+        version += len(entries)
+    if not 0 <= version < len(entries):
+        raise IndexError(f"plan version {version} out of range")
+    base = store["snapshots"][bisect_right(store["snapshots"], version) - 1]
+    plan = _clone(entries[base]["snapshot"])
+    for entry in entries[base + 1 : version + 1]:
+        apply(plan, entry["delta"])
+    return plan
+
+
+def record(user_data: Dict[str, Any], plan: Dict[str, Any]) -> int:
+    """Store `plan` as the next version and return its number. Unchanged plans are not re-recorded."""
+    store = _store(user_data)
+    entries, snapshots = store["entries"], store["snapshots"]
+    previous = get_version(user_data) if entries else None
+    if previous is not None and previous == plan:
+        return len(entries) - 1
+    since_snapshot = len(entries) - 1 - snapshots[-1] if snapshots else None
+    if previous is None or previous.get("goal") != plan.get("goal") or since_snapshot >= store["snapshot_every"]:
+        snapshots.append(len(entries))
+        entries.append({"snapshot": _clone(plan)})
+    else:
+        entries.append({"delta": diff(previous, plan)})
+    return len(entries) - 1
+
+
+def retire(user_data: Dict[str, Any], plan: Dict[str, Any], retired_at: Optional[str] = None) -> Dict[str, Any]:
+    """Record the final state of a plan whose goal is done and append a reference to goal_history."""
+    version = record(user_data, plan)
+    ref = {
+        "version": version,
+        "goal": _clone(plan.get("goal")),
+        "created_at": plan.get("created_at"),
+        "retired_at": retired_at or datetime.now().isoformat(),
+    }
+    user_data.setdefault("goal_history", []).append(ref)
+    return ref
+
+
+def history(user_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Every recorded version, oldest first (rebuilt incrementally, one pass)."""
+    store = user_data.get(VERSIONS_KEY)
+    plans = []
+    plan = None
+    for entry in (store or {}).get("entries", []):
+        plan = _clone(entry["snapshot"]) if "snapshot" in entry else apply(plan, entry["delta"])
+        plans.append(_clone(plan))
+    return plans
@@ -0,0 +1,371 @@
+"""
+Population snapshot: per-user summary columns for every stored user, memory-mapped for analytics.
+
+export_population() loads each user once and writes one fixed-width little-endian column
+file per field (see COLUMNS); PopulationSnapshot maps them back with numpy.memmap, so
+opening a snapshot parses nothing but a small meta.json and aggregations are array
+operations over the mapped pages. refresh_population() re-reads only users whose storage
+version token changed (or the user_ids given), reusing every other row.
+
+Layout under path/:
+  CURRENT              name of the live generation directory
+  gen-NNNNNN/          meta.json, <column>.bin, user_ids.bin + user_ids.idx (utf-8 blob, offsets)
+
+Each export or refresh writes a new generation and then swaps CURRENT, so readers never
+see a half-written snapshot; the previous generation is kept until the next swap.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from . import feedback_state
+from .storage import StorageBackend
+from .time_index import to_micros
+from .workout_history import NO_TS
+
+FORMAT = "population/columnar-1"
+CURRENT = "CURRENT"
+NO_DAY = np.iinfo(np.int32).min
+
+# Fixed-width column dtypes. Categorical columns hold codes into meta.json's label tables (-1: missing).
+COLUMNS = {
+    "domain": "<i1",
+    "fitness_level": "<i1",
+    "has_plan": "<u1",
+    "week_number": "<i2",
+    "adaptation_count": "<i4",
+    "completed": "<i2",  # current plan's tasks, per status
+    "skipped": "<i2",
+    "pending": "<i2",
+    "tasks": "<i2",
+    "workout_count": "<i4",
+    "streak_day": "<i4",  # last day of the latest completed-day run, days since the epoch
+    "streak_run": "<i4",
+    "last_activity": "<i8",  # latest workout date, microseconds since the epoch (NO_TS: none)
+    "version": "<i8",  # hash of the storage version token when read; 0: unknown, always re-read
+}
+CATEGORICAL = ("domain", "fitness_level")
+DERIVED = ("consistency_rate", "streak")
+
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def _day_number(value: date) -> int:
+    return value.toordinal() - _EPOCH_DAY
+
+
+def _version_hash(backend: StorageBackend, user_id: str) -> int:
+    """Storage version as a stable int64; 0 when the backend has no token that outlives its connection."""
+    if not backend.durable_versions:
+        return 0
+    token = backend.version(user_id)
+    if token is None:
+        return 0
+    digest = hashlib.blake2b(repr(token).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True) or 1
+
+
+def _last_activity(workouts) -> int:
+    ts = getattr(workouts, "ts", None)
+    if ts is not None:
+        return max(ts, default=NO_TS)  # entries kept verbatim have NO_TS and are skipped
+    stamps = [to_micros(w.get("date")) for w in workouts]
+    return max((s for s in stamps if s is not None), default=NO_TS)
+
+
+class _Labels:
+    """Label tables for the categorical columns; codes are assigned in order of appearance."""
+
+    def __init__(self, tables: Optional[Dict[str, List[str]]] = None):
+        self.tables = {column: list((tables or {}).get(column, [])) for column in CATEGORICAL}
+        self._codes = {column: {label: i for i, label in enumerate(t)} for column, t in self.tables.items()}
+
+    def code(self, column: str, label: Any) -> int:
+        if label is None:
+            return -1
+        codes = self._codes[column]
+        if label not in codes:
+            codes[label] = len(self.tables[column])
+            self.tables[column].append(label)
+        return codes[label]
+
+
+def extract_row(user_data: Dict[str, Any], labels: _Labels, version: int = 0) -> Tuple:
+    """One user's values, in COLUMNS order."""
+    profile = user_data.get("profile") or {}
+    plan = user_data.get("current_plan") or {}
+    counts = feedback_state.plan_counts(user_data)
+    state = feedback_state.get_state(user_data)
+    streak = state["streak"]
+    return (
+        labels.code("domain", profile.get("domain", "fitness")),
+        labels.code("fitness_level", profile.get("fitness_level")),
+        bool(user_data.get("current_plan")),
+        plan.get("week_number", 0),
+        plan.get("adaptation_count", 0),
+        counts["completed"],
+        counts["skipped"],
+        counts["pending"],
+        counts["tasks"],
+        state["workout_count"],
+        _day_number(date.fromisoformat(streak["last_day"])) if streak["last_day"] else NO_DAY,
+        streak["run"],
+        _last_activity(user_data.get("workouts", [])),
+        version,
+    )
+
+
+def _empty_columns(count: int) -> Dict[str, np.ndarray]:
+    return {name: np.zeros(count, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def _read_users(backend: StorageBackend, user_ids: Iterable[str], labels: _Labels) -> Tuple[List[str], List[Tuple]]:
+    """(ids, rows) for the users that exist; the version is taken before loading, so a write in between re-reads."""
+    ids, rows = [], []
+    for user_id in user_ids:
+        version = _version_hash(backend, user_id)
+        user_data = backend.load(user_id)
+        if user_data is not None:
+            ids.append(user_id)
+            rows.append(extract_row(user_data, labels, version))
+    return ids, rows
+
+
+def _fill(columns: Dict[str, np.ndarray], positions: np.ndarray, rows: List[Tuple]) -> None:
+    if not rows:
+        return
+    for name, values in zip(COLUMNS, zip(*rows)):
+        columns[name][positions] = values
+
+
+def write_snapshot(path, user_ids: List[str], columns: Dict[str, np.ndarray], labels: Dict[str, List[str]]) -> Path:
+    """Write a new generation under `path` and make it current; returns its directory."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    current = _current_generation(path)
+    number = int(current.name.split("-")[1]) + 1 if current else 1
+    generation = path / f"gen-{number:06d}"
+    shutil.rmtree(generation, ignore_errors=True)  # left over from a crashed write
+    generation.mkdir()
+
+    for name, dtype in COLUMNS.items():
+        np.ascontiguousarray(columns[name], dtype=dtype).tofile(generation / f"{name}.bin")
+    encoded = [user_id.encode("utf-8") for user_id in user_ids]
+    offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    offsets.tofile(generation / "user_ids.idx")
+    with open(generation / "user_ids.bin", "wb") as f:
+        f.write(b"".join(encoded))
+    meta = {
+        "format": FORMAT,
+        "count": len(user_ids),
+        "columns": COLUMNS,
+        "labels": labels,
+        "created_at": datetime.now().isoformat(),
+    }
+    with open(generation / "meta.json", "w") as f:
+        json.dump(meta, f, indent=2)
+
+    tmp = path / (CURRENT + ".tmp")
+    tmp.write_text(generation.name)
+    os.replace(tmp, path / CURRENT)
+    # Keep the generation just replaced for readers that opened it but have not mapped every column yet.
+    for old in path.glob("gen-*"):
+        if old not in (generation, current):
+            shutil.rmtree(old, ignore_errors=True)
+    return generation
+
+
+def _current_generation(path: Path) -> Optional[Path]:
+    try:
+        return path / (path / CURRENT).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def export_population(data_manager, path) -> "PopulationSnapshot":
+    """Full export: every stored user. Flushes write-behind saves first."""
+    data_manager.flush()
+    backend = data_manager.backend
+    labels = _Labels()
+    ids, rows = _read_users(backend, backend.user_ids(), labels)
+    columns = _empty_columns(len(ids))
+    _fill(columns, np.arange(len(ids)), rows)
+    write_snapshot(path, ids, columns, labels.tables)
+    return PopulationSnapshot(path)
+
+
+def refresh_population(data_manager, path, user_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    Incremental export. Without user_ids, every stored user's version token is checked and
+    only changed, new and removed users are touched; with user_ids, only those users are.
+    Falls back to a full export when there is no snapshot yet.
+    """
+    path = Path(path)
+    if _current_generation(path) is None:
+        count = len(export_population(data_manager, path))
+        return {"users": count, "reread": count, "added": count, "removed": 0}
+    data_manager.flush()
+    backend = data_manager.backend
+    old = PopulationSnapshot(path)
+    labels = _Labels(old.labels)
+    old_ids = old.user_ids()
+    index = {user_id: i for i, user_id in enumerate(old_ids)}
+
+    if user_ids is None:
+        stored = backend.user_ids()
+        stored_set = set(stored)
+        removed = [user_id for user_id in old_ids if user_id not in stored_set]
+        versions = old["version"]
+        candidates = []
+        for user_id in stored:
+            row = index.get(user_id)
+            if row is None or not versions[row] or versions[row] != _version_hash(backend, user_id):
+                candidates.append(user_id)
+    else:
+        candidates = list(dict.fromkeys(user_ids))
+        removed = []
+    ids, rows = _read_users(backend, candidates, labels)
+    found = set(ids)
+    removed += [user_id for user_id in candidates if user_id not in found and user_id in index]
+
+    keep = np.ones(len(old_ids), dtype=bool)
+    keep[[index[user_id] for user_id in removed]] = False
+    added = [user_id for user_id in ids if user_id not in index]
+    new_ids = [user_id for user_id, kept in zip(old_ids, keep) if kept] + added
+    columns = {
+        name: np.concatenate([old[name][keep], np.zeros(len(added), dtype=dtype)]) for name, dtype in COLUMNS.items()
+    }
+    new_index = np.cumsum(keep) - 1  # old row -> row among the kept ones
+    kept_count = int(keep.sum())
+    added_at = {user_id: kept_count + i for i, user_id in enumerate(added)}
+    positions = np.array(
+        [added_at[user_id] if user_id in added_at else new_index[index[user_id]] for user_id in ids], dtype=np.int64
+    )
+    _fill(columns, positions, rows)
+    old.close()
+    write_snapshot(path, new_ids, columns, labels.tables)
+    return {"users": len(new_ids), "reread": len(ids), "added": len(added), "removed": len(removed)}
+
+
+class PopulationSnapshot:
+    """Read side: the current generation's columns, memory-mapped on first use."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.generation = _current_generation(self.path)
+        if self.generation is None:
+            raise FileNotFoundError(f"No population snapshot under {self.path}")
+        with open(self.generation / "meta.json", "r") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT:
+            raise ValueError(f"Unsupported population snapshot format: {meta.get('format')!r}")
+        self.count = meta["count"]
+        self.labels: Dict[str, List[str]] = meta["labels"]
+        self.created_at = meta["created_at"]
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        column = self._columns.get(name)
+        if column is None:
+            if name not in COLUMNS:
+                raise KeyError(f"Unknown column {name!r}; stored: {', '.join(COLUMNS)}; derived: {', '.join(DERIVED)}")
+            if self.count:
+                column = np.memmap(self.generation / f"{name}.bin", dtype=COLUMNS[name], mode="r", shape=(self.count,))
+            else:
+                column = np.zeros(0, dtype=COLUMNS[name])  # mmap cannot map an empty file
+            self._columns[name] = column
+        return column
+
+    def close(self) -> None:
+        self._columns.clear()
+
+    def user_ids(self) -> List[str]:
+        offsets = np.fromfile(self.generation / "user_ids.idx", dtype="<i8").tolist()
+        blob = (self.generation / "user_ids.bin").read_bytes()
+        return [blob[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    # Derived values
+    def consistency_rate(self) -> np.ndarray:
+        """FeedbackAgent.observe_task_completion's completed / tasks (0 without tasks)."""
+        tasks = self["tasks"]
+        return np.divide(self["completed"], tasks, out=np.zeros(self.count), where=tasks > 0)
+
+    def streak(self, today: Optional[date] = None) -> np.ndarray:
+        """feedback_state.current_streak as of `today` (runs ending on a later day count as 0)."""
+        today = _day_number(today or datetime.now().date())
+        return np.where(self["streak_day"] == today, self["streak_run"], 0)
+
+    def values(self, name: str, today: Optional[date] = None) -> np.ndarray:
+        if name == "consistency_rate":
+            return self.consistency_rate()
+        if name == "streak":
+            return self.streak(today)
+        return self[name]
+
+    # Queries
+    def code(self, column: str, label: str) -> int:
+        """Code of a categorical label; -2 (matches nothing) if no user has it."""
+        try:
+            return self.labels[column].index(label)
+        except ValueError:
+            return -2
+
+    def where(self, active_since: Optional[date] = None, **conditions) -> np.ndarray:
+        """
+        Boolean row mask: column=value, or column=[values] for any of them; categorical
+        columns take labels. active_since keeps users with a workout on or after that date.
+        """
+        mask = np.ones(self.count, dtype=bool)
+        for name, value in conditions.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            if name in CATEGORICAL:
+                values = [self.code(name, v) if isinstance(v, str) else v for v in values]
+            column = self.values(name)
+            mask &= column == values[0] if len(values) == 1 else np.isin(column, values)
+        if active_since is not None:
+            mask &= self["last_activity"] >= to_micros(active_since)
+        return mask
+
+    def mean(self, name: str, mask: Optional[np.ndarray] = None, today: Optional[date] = None) -> float:
+        values = self.values(name, today)
+        values = values[mask] if mask is not None else values
+        return float(values.mean()) if len(values) else 0.0
+
+    def group_by(
+        self, by: str, name: str, mask: Optional[np.ndarray] = None, today: Optional[date] = None
+    ) -> Dict[Any, Dict[str, float]]:
+        """{group: {"users", "mean"}} of column `name` per value of `by` (labels for categorical columns)."""
+        keys = self[by]
+        values = self.values(name, today)
+        if mask is not None:
+            keys, values = keys[mask], values[mask]
+        if not len(keys):
+            return {}
+        low, high = int(keys.min()), int(keys.max())
+        if high - low <= 1 << 16:
+            # Small integer keys (codes, weeks): count straight into bins, no sort.
+            shifted = keys.astype(np.int64) - low
+            users = np.bincount(shifted)
+            sums = np.bincount(shifted, weights=values)
+            groups = np.flatnonzero(users)
+            users, sums, groups = users[groups], sums[groups], groups + low
+        else:
+            groups, inverse = np.unique(keys, return_inverse=True)
+            users = np.bincount(inverse)
+            sums = np.bincount(inverse, weights=values)
+        result = {}
+        for group, n, total in zip(groups.tolist(), users.tolist(), sums.tolist()):
+            if by in CATEGORICAL:
+                group = self.labels[by][group] if group >= 0 else None
+            result[group] = {"users": n, "mean": total / n}
+        return result
@@ -0,0 +1,195 @@
+"""
+Weekly plan rollover: a persisted time wheel of each user's next plan-week boundary.
+
+A plan's week `n` ends `n` weeks after the plan's created_at. The wheel is a directory of
+slot files, one per `slot_seconds` of due time. Each file holds "user_id<TAB>due" lines.
+A line is appended whenever a saved plan's boundary changes. DataManager does that on
+every save once the wheel directory exists; see `RolloverScheduler.init`. tick() claims
+only the slots that are due by renaming them, then rolls those users over with
+DataManager.roll_over_week. That archives the finished week's statuses, advances
+week_number and resets every task to pending. Then it appends each user's next boundary.
+
+So a tick costs the number of due entries plus one directory listing, and a restart
+simply lists the slot files. A user whose rolled-over record cannot be saved keeps their
+entry, so the next tick tries again. Entries are hints. Each claimed user is re-checked against
+their stored plan under the backend's write lock. An entry that went stale (the plan was
+replaced, or another tick got there first) only moves the user to their real boundary, so
+duplicate or crashed-tick entries are harmless.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from .storage import file_lock
+from .time_index import to_micros
+
+WHEEL_DIR = "rollover"
+WEEK_US = 7 * 86400 * 10**6
+SLOT_SUFFIX = ".due"
+CLAIMED_SUFFIX = ".claimed"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def week_due(plan: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Microseconds since the epoch at which the plan's current week ends; None without a dated plan."""
+    if not plan:
+        return None
+    created = to_micros(plan.get("created_at"))
+    if created is None:
+        return None
+    return created + plan.get("week_number", 1) * WEEK_US
+
+
+def _iso(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+class RolloverWheel:
+    """Slot files under `path`; appends and claims are serialized by a sidecar file lock."""
+
+    def __init__(self, path: Union[str, Path], slot_seconds: int = 3600):
+        self.path = Path(path)
+        self.slot_us = slot_seconds * 10**6
+        self.lock_path = self.path / ".lock"
+
+    def add(self, entries: List[Tuple[str, int]]) -> None:
+        by_slot: Dict[int, List[str]] = {}
+        for user_id, due in entries:
+            by_slot.setdefault(due // self.slot_us, []).append(f"{user_id}\t{due}\n")
+        with file_lock(self.lock_path):
+            for slot, lines in by_slot.items():
+                with open(self.path / f"{slot:014d}{SLOT_SUFFIX}", "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+
+    def slots(self) -> List[int]:
+        names = os.listdir(self.path)
+        return sorted(int(name[: -len(SLOT_SUFFIX)]) for name in names if name.endswith(SLOT_SUFFIX))
+
+    def claim(self, now_us: int) -> List[Path]:
+        """Rename every slot starting at or before now, so later appends start fresh files."""
+        claimed = []
+        with file_lock(self.lock_path):
+            for slot in self.slots():
+                if slot * self.slot_us > now_us:
+                    break
+                source = self.path / f"{slot:014d}{SLOT_SUFFIX}"
+                target = source.with_name(f"{slot:014d}.{time.time_ns()}{CLAIMED_SUFFIX}")
+                os.replace(source, target)
+                claimed.append(target)
+        # Left behind by a tick that stopped before finishing its slots.
+        claimed += sorted(p for p in self.path.glob(f"*{CLAIMED_SUFFIX}") if p not in claimed)
+        return claimed
+
+    @staticmethod
+    def read(path: Path) -> Dict[str, int]:
+        """{user_id: due} from a slot file; duplicate lines for a user collapse to the earliest due."""
+        entries: Dict[str, int] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                user_id, _, due = line.rstrip("\n").rpartition("\t")
+                if user_id and due.lstrip("-").isdigit():
+                    entries[user_id] = min(int(due), entries.get(user_id, int(due)))
+        return entries
+
+    def pending(self) -> int:
+        """Entries waiting in the wheel (reads every slot file; for reporting, not for ticks)."""
+        total = 0
+        for path in self.path.glob(f"*{SLOT_SUFFIX}"):
+            with open(path, "rb") as f:
+                total += sum(1 for _ in f)
+        return total
+
+
+class RolloverScheduler:
+    """
+    Rolls plan weeks over for the users of `data_manager` as their boundaries come due.
+    Not thread-safe; run one tick at a time per wheel.
+    """
+
+    def __init__(self, data_manager, path: Union[str, Path, None] = None, slot_seconds: int = 3600):
+        self.data_manager = data_manager
+        self.wheel = RolloverWheel(path or Path(data_manager.data_dir) / WHEEL_DIR, slot_seconds)
+        if not self.wheel.path.is_dir():
+            raise FileNotFoundError(f"No rollover schedule at {self.wheel.path}; create it with RolloverScheduler.init")
+        # Rolled-over users are saved through data_manager, which schedules their next boundary.
+        data_manager.attach_rollover(self.wheel)
+
+    @classmethod
+    def init(cls, data_manager, path: Union[str, Path, None] = None, slot_seconds: int = 3600) -> "RolloverScheduler":
+        """
+        Create the wheel and schedule every stored user with a plan. This is the one full scan.
+        From then on, DataManagers on the same data directory schedule plan changes as they
+        save.
+        """
+        Path(path or Path(data_manager.data_dir) / WHEEL_DIR).mkdir(parents=True, exist_ok=True)
+        scheduler = cls(data_manager, path, slot_seconds)
+        backend = data_manager.backend
+        batch = []
+        for user_id in backend.iter_user_ids():
+            due = week_due((backend.load(user_id) or {}).get("current_plan"))
+            if due is not None:
+                batch.append((user_id, due))
+            if len(batch) >= 10000:
+                scheduler.wheel.add(batch)
+                batch = []
+        scheduler.wheel.add(batch)
+        return scheduler
+
+    def tick(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Roll over every user whose week has ended by `now`; returns what was done."""
+        now_us = to_micros(now or datetime.now())
+        result = {"due": 0, "rolled": 0, "weeks": 0, "rescheduled": 0, "dropped": 0, "failed": 0}
+        for path in self.wheel.claim(now_us):
+            later = []
+            for user_id, due in RolloverWheel.read(path).items():
+                if due > now_us:
+                    later.append((user_id, due))
+                    continue
+                result["due"] += 1
+                rolled = self._roll(user_id, now_us)
+                if rolled is None:
+                    # Not saved: keep the entry, so the next tick retries the user.
+                    later.append((user_id, due))
+                    result["failed"] += 1
+                    continue
+                weeks, next_due = rolled
+                if weeks:
+                    result["rolled"] += 1
+                    result["weeks"] += weeks
+                elif next_due is None:
+                    result["dropped"] += 1
+                else:
+                    # Stale entry: the plan was replaced or already rolled over.
+                    later.append((user_id, next_due))
+                    result["rescheduled"] += 1
+            self.wheel.add(later)
+            path.unlink()
+        return result
+
+    def _roll(self, user_id: str, now_us: int) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        Roll the stored plan over to the week containing now; (weeks rolled, next boundary),
+        or None if the rolled-over record could not be saved.
+        """
+        stored = self.data_manager.backend.load(user_id)
+        due = week_due((stored or {}).get("current_plan"))
+        if due is None or due > now_us:
+            return 0, due
+        outcome = [0, None]
+
+        def mutate(user_data: Dict[str, Any]) -> Dict[str, Any]:
+            outcome[0] = 0
+            due = week_due(user_data.get("current_plan"))
+            while due is not None and due <= now_us:
+                self.data_manager.roll_over_week(user_data, ended_at=_iso(due))
+                outcome[0] += 1
+                due = week_due(user_data["current_plan"])
+            outcome[1] = due
+            return user_data
+
+        if self.data_manager.update_user_data(mutate, user_id) is None:
+            return None
+        return outcome[0], outcome[1]
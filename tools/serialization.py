@@ -0,0 +1,113 @@
+"""
+Serialization codecs for stored user records.
+
+A codec turns a record into bytes and back. JSON codecs write plain compact JSON (the
+stdlib "json" codec always works; "orjson" is used when installed), so their files need
+no header and files written before codecs existed load unchanged. Binary codecs
+("msgpack", when installed) prefix their output with a header naming the codec, which
+JSON can never start with; decode() picks the codec from it. "auto" is the fastest JSON
+codec available.
+"""
+import json
+from typing import Callable, Dict, Any, Union
+
+from .workout_history import json_default
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib json codec is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: records stay JSON
+    msgpack = None
+
+HEADER_PREFIX = b"\x00codec:"
+
+
+class Codec:
+    name = ""
+    header = b""
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """Stdlib json without indentation or padding."""
+
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=json_default).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    name = "orjson"
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def decode(self, data: bytes) -> Any:
+        return json_loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    header = HEADER_PREFIX + b"msgpack\n"
+
+    def encode(self, value: Any) -> bytes:
+        return self.header + msgpack.packb(value, default=json_default, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(memoryview(data)[len(self.header) :], raw=False, strict_map_key=False)
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON with orjson when installed, falling back to json for what orjson rejects (NaN)."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+CODECS: Dict[str, Callable[[], Codec]] = {"json": JsonCodec, "orjson": OrjsonCodec, "msgpack": MsgpackCodec}
+_INSTALLED = {"json": True, "orjson": orjson is not None, "msgpack": msgpack is not None}
+
+
+def available_codecs() -> list:
+    return [name for name in CODECS if _INSTALLED[name]]
+
+
+def get_codec(codec: Union[str, Codec, None] = None) -> Codec:
+    """A codec by name, or as given; None and "auto" mean orjson if installed, else json."""
+    if isinstance(codec, Codec):
+        return codec
+    if codec in (None, "auto"):
+        codec = "orjson" if _INSTALLED["orjson"] else "json"
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec {codec!r}; expected one of {', '.join(CODECS)} or 'auto'")
+    if not _INSTALLED[codec]:
+        raise ValueError(f"The {codec} codec needs the {codec} package, which is not installed")
+    return CODECS[codec]()
+
+
+def detect(data: bytes) -> Codec:
+    """The codec that wrote `data`: named by its header, else JSON."""
+    if data.startswith(HEADER_PREFIX):
+        end = data.find(b"\n", len(HEADER_PREFIX))
+        return get_codec(data[len(HEADER_PREFIX) : end].decode("ascii", "replace"))
+    return get_codec("auto")
+
+
+def decode(data: bytes) -> Any:
+    return detect(data).decode(data)
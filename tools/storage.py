@@ -0,0 +1,571 @@
+"""
+Storage backends: pluggable persistence engines used by DataManager.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterator, List, Optional, Union
+from urllib.parse import quote, unquote
+
+from . import serialization, workout_history
+from .metrics import get_default_metrics, key
+from .serialization import Codec, json_loads
+from .workout_history import WorkoutHistory, json_default
+
+try:
+    import fcntl
+except ImportError:  # Windows: os.replace is still atomic, but writers are not serialized
+    fcntl = None
+
+Mutator = Callable[[Optional[Dict[str, Any]]], Dict[str, Any]]
+
+# I/O metrics, recorded while the default metrics are enabled. SQLite counts its JSON columns only.
+READ_BYTES = key("storage_read_bytes_total")
+WRITTEN_BYTES = key("storage_written_bytes_total")
+PARSE_SECONDS = key("storage_parse_seconds")
+SERIALIZE_SECONDS = key("storage_serialize_seconds")
+
+
+@contextlib.contextmanager
+def file_lock(lock_path: Path):
+    """Advisory exclusive lock on a sidecar file, held for the duration of the block."""
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def read_record(f) -> Any:
+    """Decode a file opened in binary mode with the codec its header names, counting bytes and parse time."""
+    data = f.read()
+    metrics = get_default_metrics()
+    if not metrics.enabled:
+        return serialization.decode(data)
+    started = time.perf_counter()
+    value = serialization.decode(data)
+    metrics.observe(PARSE_SECONDS, time.perf_counter() - started)
+    metrics.inc(READ_BYTES, len(data))
+    return value
+
+
+def atomic_write_record(path: Path, value: Any, codec: Codec) -> None:
+    """Encode, write to a temp file in the same directory, fsync, then os.replace over the target."""
+    metrics = get_default_metrics()
+    started = time.perf_counter()
+    data = codec.encode(value)
+    if metrics.enabled:
+        metrics.observe(SERIALIZE_SECONDS, time.perf_counter() - started)
+        metrics.inc(WRITTEN_BYTES, len(data))
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
+
+
+def _dumps(value: Any) -> str:
+    """json.dumps for SQLite columns, counting serialize time and bytes."""
+    metrics = get_default_metrics()
+    if not metrics.enabled:
+        return json.dumps(value, default=json_default)
+    started = time.perf_counter()
+    text = json.dumps(value, default=json_default)
+    metrics.observe(SERIALIZE_SECONDS, time.perf_counter() - started)
+    metrics.inc(WRITTEN_BYTES, len(text))
+    return text
+
+
+def _stat_version(path: Path) -> Any:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class StorageBackend:
+    """
+    Interface every DataManager backend implements. Records are user_data dicts whose
+    "workouts" is a WorkoutHistory on load; save accepts either that or a plain list.
+    Event-sourced backends persist the events DataManager records (see tools.events).
+    """
+
+    event_sourced = False
+    # version() tokens stay comparable across connections and runs (see tools.population).
+    durable_versions = True
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def load_many(self, user_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """{user_id: record or None} for a batch of users; backends override it to read shared files once."""
+        return {user_id: self.load(user_id) for user_id in user_ids}
+
+    def save(self, user_id: str, user_data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, user_id: str) -> None:
+        raise NotImplementedError
+
+    def version(self, user_id: str) -> Any:
+        """Cheap token that changes whenever the stored record may have changed; None if unknown."""
+        return None
+
+    def update(self, user_id: str, mutator: Mutator) -> Dict[str, Any]:
+        """Read-modify-write one user. Backends override this to make it atomic across processes."""
+        user_data = mutator(self.load(user_id))
+        self.save(user_id, user_data)
+        return user_data
+
+    def user_ids(self) -> List[str]:
+        raise NotImplementedError
+
+    def iter_user_ids(self) -> Iterator[str]:
+        """user_ids() in no particular order; backends override it to avoid listing every user at once."""
+        yield from self.user_ids()
+
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        for user_id in self.user_ids():
+            user_data = self.load(user_id)
+            if user_data is not None:
+                yield user_data
+
+    def rewrite_all(self) -> int:
+        """Re-encode every stored record with the backend's codec; returns the number of users."""
+        user_ids = self.user_ids()
+        for user_id in user_ids:
+            self.update(user_id, lambda stored: stored)
+        return len(user_ids)
+
+    def close(self) -> None:
+        pass
+
+
+class JsonFileBackend(StorageBackend):
+    """
+    Original single-file layout: every user in one document, rewritten under a file lock.
+    Written with `codec` (see tools.serialization); any codec's files load.
+    """
+
+    def __init__(self, path: Path, codec: Union[str, Codec, None] = None):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.codec = serialization.get_codec(codec)
+
+    def _read_all(self) -> Dict[str, Any]:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return {}
+        with open(self.path, "rb") as f:
+            all_data = read_record(f)
+        for user_data in all_data.values():
+            workout_history.attach(user_data)
+        return all_data
+
+    def _write_all(self, all_data: Dict[str, Any]) -> None:
+        atomic_write_record(self.path, all_data, self.codec)
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self._read_all().get(user_id)
+
+    def load_many(self, user_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        all_data = self._read_all()
+        return {user_id: all_data.get(user_id) for user_id in user_ids}
+
+    def version(self, user_id: str) -> Any:
+        return _stat_version(self.path)
+
+    def save(self, user_id: str, user_data: Dict[str, Any]) -> None:
+        with file_lock(self.lock_path):
+            all_data = self._read_all()
+            all_data[user_id] = user_data
+            self._write_all(all_data)
+
+    def update(self, user_id: str, mutator: Mutator) -> Dict[str, Any]:
+        with file_lock(self.lock_path):
+            all_data = self._read_all()
+            user_data = mutator(all_data.get(user_id))
+            all_data[user_id] = user_data
+            self._write_all(all_data)
+        return user_data
+
+    def delete(self, user_id: str) -> None:
+        with file_lock(self.lock_path):
+            all_data = self._read_all()
+            if all_data.pop(user_id, None) is not None:
+                self._write_all(all_data)
+
+    def user_ids(self) -> List[str]:
+        return list(self._read_all().keys())
+
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        yield from self._read_all().values()
+
+    def rewrite_all(self) -> int:
+        with file_lock(self.lock_path):
+            all_data = self._read_all()
+            if all_data:
+                self._write_all(all_data)
+        return len(all_data)
+
+
+class ShardedFileBackend(StorageBackend):
+    """
+    One file per user under root/<shard>/, where <shard> is a prefix of sha1(user_id).
+    Writes go through a temp file and os.replace; a per-user lock file serializes writers
+    of the same user, so writers of different users never contend. Files keep the .json
+    name whatever `codec` wrote them; loading detects the codec from the file header.
+    """
+
+    def __init__(self, root: Path, shard_chars: int = 2, codec: Union[str, Codec, None] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.shard_chars = shard_chars
+        self.codec = serialization.get_codec(codec)
+
+    def _user_path(self, user_id: str) -> Path:
+        shard = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[: self.shard_chars]
+        return self.root / shard / f"{quote(user_id, safe='')}.json"
+
+    def _lock_path(self, path: Path) -> Path:
+        return path.with_name(path.name + ".lock")
+
+    def _read(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "rb") as f:
+                return workout_history.attach(read_record(f))
+        except FileNotFoundError:
+            return None
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self._read(self._user_path(user_id))
+
+    def version(self, user_id: str) -> Any:
+        return _stat_version(self._user_path(user_id))
+
+    def save(self, user_id: str, user_data: Dict[str, Any]) -> None:
+        path = self._user_path(user_id)
+        path.parent.mkdir(exist_ok=True)
+        with file_lock(self._lock_path(path)):
+            atomic_write_record(path, user_data, self.codec)
+
+    def update(self, user_id: str, mutator: Mutator) -> Dict[str, Any]:
+        path = self._user_path(user_id)
+        path.parent.mkdir(exist_ok=True)
+        with file_lock(self._lock_path(path)):
+            user_data = mutator(self._read(path))
+            atomic_write_record(path, user_data, self.codec)
+        return user_data
+
+    def delete(self, user_id: str) -> None:
+        path = self._user_path(user_id)
+        with file_lock(self._lock_path(path)):
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+
+    def user_ids(self) -> List[str]:
+        return sorted(unquote(p.name[: -len(".json")]) for p in self.root.glob("*/*.json"))
+
+    def iter_user_ids(self) -> Iterator[str]:
+        for shard in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".json"):
+                        yield unquote(entry.name[: -len(".json")])
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    One row per user plus workouts and plans tables, in WAL mode.
+    Saving a user only touches that user's rows. For a record this connection loaded or saved,
+    only appended workouts, workouts edited in place (WorkoutHistory.edited_since) and
+    appended goal_history references are written. Otherwise, e.g. after an insert or delete,
+    the stored rows are compared and the differing ones rewritten.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            profile TEXT,
+            created_at TEXT,
+            extra TEXT
+        );
+        CREATE TABLE IF NOT EXISTS workouts (
+            user_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            day TEXT,
+            type TEXT,
+            status TEXT,
+            date TEXT,
+            extra TEXT,
+            PRIMARY KEY (user_id, seq)
+        );
+        CREATE TABLE IF NOT EXISTS plans (
+            user_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            plan TEXT NOT NULL,
+            PRIMARY KEY (user_id, role, seq)
+        );
+    """
+
+    _USER_KEYS = ("user_id", "profile", "created_at", "current_plan", "workouts", "goal_history")
+    durable_versions = False  # data_version only means something within one connection
+    _WORKOUT_KEYS = ("day", "type", "status", "date")
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        # user_id -> (workouts ref, workout count, workout edits, goal_history id, goal count) last loaded or saved.
+        self._synced: Dict[str, tuple] = {}
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self._SCHEMA)
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT profile, created_at, extra FROM users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            workout_rows = self.conn.execute(
+                "SELECT day, type, status, date, extra FROM workouts WHERE user_id = ? ORDER BY seq", (user_id,)
+            ).fetchall()
+            plan_rows = self.conn.execute(
+                "SELECT role, plan FROM plans WHERE user_id = ? ORDER BY role, seq", (user_id,)
+            ).fetchall()
+
+        metrics = get_default_metrics()
+        started = time.perf_counter()
+        profile, created_at, extra = row
+        user_data = {
+            "user_id": user_id,
+            "profile": json_loads(profile) if profile is not None else None,
+            "current_plan": None,
+            "workouts": WorkoutHistory(self._workout_from_row(r) for r in workout_rows),
+            "goal_history": [],
+            "created_at": created_at,
+        }
+        for role, plan in plan_rows:
+            if role == "current":
+                user_data["current_plan"] = json_loads(plan)
+            else:
+                user_data["goal_history"].append(json_loads(plan))
+        if extra:
+            user_data.update(json_loads(extra))
+        if metrics.enabled:
+            metrics.observe(PARSE_SECONDS, time.perf_counter() - started)
+            metrics.inc(READ_BYTES, sum(len(text or "") for text in (profile, extra, *(p for _, p in plan_rows))))
+        with self._lock:
+            self._remember(user_id, user_data)
+        return user_data
+
+    def save(self, user_id: str, user_data: Dict[str, Any]) -> None:
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_user(cur, user_id, user_data)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                self._synced.pop(user_id, None)
+                raise
+            self._remember(user_id, user_data)
+
+    def version(self, user_id: str) -> Any:
+        # data_version only moves on commits from other connections; our own writes refresh the cache directly.
+        with self._lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def update(self, user_id: str, mutator: Mutator) -> Dict[str, Any]:
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                user_data = mutator(self.load(user_id))
+                self._write_user(cur, user_id, user_data)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                self._synced.pop(user_id, None)
+                raise
+            self._remember(user_id, user_data)
+        return user_data
+
+    def delete(self, user_id: str) -> None:
+        with self._lock:
+            self._synced.pop(user_id, None)
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("users", "workouts", "plans"):
+                    cur.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def user_ids(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self.conn.execute("SELECT user_id FROM users ORDER BY user_id")]
+
+    def iter_user_ids(self, page: int = 1000) -> Iterator[str]:
+        last = None
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT user_id FROM users WHERE ? IS NULL OR user_id > ? ORDER BY user_id LIMIT ?",
+                    (last, last, page),
+                ).fetchall()
+            if not rows:
+                return
+            for (user_id,) in rows:
+                yield user_id
+            last = rows[-1][0]
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def rewrite_all(self) -> int:
+        return 0  # columns are always JSON
+
+    def import_json(self, json_path: Path) -> int:
+        """Bulk-load a legacy user_data.json in a single transaction. Returns the number of users."""
+        all_data = JsonFileBackend(json_path)._read_all()
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                for user_id, user_data in all_data.items():
+                    self._synced.pop(user_id, None)
+                    self._write_user(cur, user_id, user_data)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return len(all_data)
+
+    def _write_user(self, cur: sqlite3.Cursor, user_id: str, user_data: Dict[str, Any]) -> None:
+        profile = user_data.get("profile")
+        extra = {k: v for k, v in user_data.items() if k not in self._USER_KEYS}
+        cur.execute(
+            "INSERT OR REPLACE INTO users (user_id, profile, created_at, extra) VALUES (?, ?, ?, ?)",
+            (
+                user_id,
+                _dumps(profile) if profile is not None else None,
+                user_data.get("created_at"),
+                _dumps(extra) if extra else None,
+            ),
+        )
+        synced = self._synced.get(user_id)
+        if synced is not None and synced[0]() is not user_data.get("workouts"):
+            synced = None  # a different record object than the one last loaded or saved
+        self._sync_workouts(cur, user_id, user_data.get("workouts") or [], synced)
+        self._sync_history(cur, user_id, user_data.get("goal_history") or [], synced)
+        cur.execute("DELETE FROM plans WHERE user_id = ? AND role = 'current'", (user_id,))
+        if user_data.get("current_plan") is not None:
+            cur.execute(
+                "INSERT INTO plans (user_id, role, seq, plan) VALUES (?, 'current', 0, ?)",
+                (user_id, _dumps(user_data["current_plan"])),
+            )
+
+    def _sync_workouts(
+        self, cur: sqlite3.Cursor, user_id: str, workouts: List[Dict[str, Any]], synced: Optional[tuple]
+    ) -> None:
+        edited = None
+        if synced is not None and synced[1] <= len(workouts):
+            edited = workouts.edited_since(synced[2])
+        if edited is not None:
+            positions = sorted(i for i in edited if i < synced[1])
+            positions += range(synced[1], len(workouts))
+            rows = [self._workout_to_row(user_id, seq, workouts[seq]) for seq in positions]
+        else:
+            stored = cur.execute(
+                "SELECT user_id, seq, day, type, status, date, extra FROM workouts WHERE user_id = ? ORDER BY seq",
+                (user_id,),
+            ).fetchall()
+            rows = _changed(stored, [self._workout_to_row(user_id, seq, w) for seq, w in enumerate(workouts)])
+        cur.execute("DELETE FROM workouts WHERE user_id = ? AND seq >= ?", (user_id, len(workouts)))
+        cur.executemany(
+            "INSERT OR REPLACE INTO workouts (user_id, seq, day, type, status, date, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _sync_history(
+        self, cur: sqlite3.Cursor, user_id: str, history: List[Dict[str, Any]], synced: Optional[tuple]
+    ) -> None:
+        # goal_history holds references to immutable plan versions (tools.plan_versions), so a
+        # known list only ever grows at the end.
+        if synced is not None and synced[3] == id(history) and synced[4] <= len(history):
+            rows = [(user_id, seq, _dumps(history[seq])) for seq in range(synced[4], len(history))]
+        else:
+            stored = cur.execute(
+                "SELECT user_id, seq, plan FROM plans WHERE user_id = ? AND role = 'history' ORDER BY seq", (user_id,)
+            ).fetchall()
+            rows = _changed(stored, [(user_id, seq, _dumps(p)) for seq, p in enumerate(history)])
+        cur.execute("DELETE FROM plans WHERE user_id = ? AND role = 'history' AND seq >= ?", (user_id, len(history)))
+        cur.executemany("INSERT OR REPLACE INTO plans (user_id, role, seq, plan) VALUES (?, 'history', ?, ?)", rows)
+
+    def _remember(self, user_id: str, user_data: Dict[str, Any]) -> None:
+        """Note what the stored rows of a user now match, for the next save of the same record."""
+        workouts, history = user_data.get("workouts"), user_data.get("goal_history")
+        if not isinstance(workouts, WorkoutHistory) or not isinstance(history, list):
+            self._synced.pop(user_id, None)
+            return
+        if len(self._synced) >= 100000 and user_id not in self._synced:
+            self._synced.clear()
+        self._synced[user_id] = (weakref.ref(workouts), len(workouts), workouts.edits, id(history), len(history))
+
+    def _workout_to_row(self, user_id: str, seq: int, workout: Dict[str, Any]) -> tuple:
+        extra = {k: v for k, v in workout.items() if k not in self._WORKOUT_KEYS}
+        return (
+            user_id,
+            seq,
+            workout.get("day"),
+            workout.get("type"),
+            workout.get("status"),
+            workout.get("date"),
+            _dumps(extra) if extra else None,
+        )
+
+    def _workout_from_row(self, row: tuple) -> Dict[str, Any]:
+        day, type_, status, date, extra = row
+        workout = {"day": day, "type": type_, "status": status, "date": date}
+        if extra:
+            workout.update(json_loads(extra))
+        return workout
+
+
+def _changed(stored: List[tuple], rows: List[tuple]) -> List[tuple]:
+    """Rows that are new or differ from the stored row at the same position."""
+    return [row for i, row in enumerate(rows) if i >= len(stored) or stored[i] != row]
+
+
+def migrate_json_to_sqlite(json_path: str, db_path: str) -> int:
+    """One-shot migration of a legacy user_data.json into a SQLite store."""
+    backend = SQLiteBackend(Path(db_path))
+    try:
+        return backend.import_json(Path(json_path))
+    finally:
+        backend.close()
@@ -0,0 +1,160 @@
+"""
+TimeIndex: sorted time index over a user's workouts for date-range queries.
+
+Timestamps are kept sorted alongside prefix counts of completed and skipped entries, so
+counting a window is two bisects (O(log n)) and listing it is O(log n + k). The index
+for a WorkoutHistory is cached on it and extended as workouts are appended; any other
+edit to the history triggers a rebuild on the next query.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .workout_history import NO_TS, WorkoutHistory
+
+DEFAULT_WINDOWS = (7, 30, 90)
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
+
+
+def to_micros(value: Any) -> Optional[int]:
+    """Microseconds since the epoch for a datetime, date or ISO string; None if unparseable."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        # Wall-clock time, as FeedbackAgent's streak uses fromisoformat(...).date().
+        return (value.replace(tzinfo=None) - _EPOCH) // _ONE_US
+    if isinstance(value, date):
+        return (datetime(value.year, value.month, value.day) - _EPOCH) // _ONE_US
+    return None
+
+
+def _rate(completed: int, total: int) -> float:
+    return (completed / total) if total else 0
+
+
+class TimeIndex:
+    def __init__(self, workouts: Sequence[Dict[str, Any]]):
+        self.workouts = workouts
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self.keys = array("q")
+        self.positions = array("q")
+        self.completed = array("q", [0])
+        self.skipped = array("q", [0])
+        self._covered = 0
+        self._edits = getattr(self.workouts, "edits", None)
+        entries = sorted(self._entries(0))
+        for ts, position, status in entries:
+            self.keys.append(ts)
+            self.positions.append(position)
+            self.completed.append(self.completed[-1] + (status == "completed"))
+            self.skipped.append(self.skipped[-1] + (status == "skipped"))
+        self._covered = len(self.workouts)
+
+    def _entries(self, start: int) -> Iterator[Tuple[int, int, Any]]:
+        workouts = self.workouts
+        if isinstance(workouts, WorkoutHistory):
+            # Read the columns directly instead of materializing rows.
+            statuses, codes, irregular = workouts.tables["status"], workouts.codes["status"], workouts._irregular
+            for i in range(start, len(workouts)):
+                if i in irregular:
+                    ts = to_micros(irregular[i].get("date"))
+                    if ts is not None:
+                        yield ts, i, irregular[i].get("status")
+                elif workouts.ts[i] != NO_TS:
+                    yield workouts.ts[i], i, statuses[codes[i]]
+            return
+        for i in range(start, len(workouts)):
+            ts = to_micros(workouts[i].get("date"))
+            if ts is not None:
+                yield ts, i, workouts[i].get("status")
+
+    def refresh(self) -> None:
+        """Catch up with appended workouts; rebuild if the history was edited otherwise."""
+        count = len(self.workouts)
+        if getattr(self.workouts, "edits", None) != self._edits or count < self._covered:
+            self._rebuild()
+            return
+        if count > self._covered:
+            for ts, position, status in self._entries(self._covered):
+                self._add(ts, position, status)
+            self._covered = count
+
+    def _add(self, ts: int, position: int, status: Any) -> None:
+        done, skip = int(status == "completed"), int(status == "skipped")
+        if not self.keys or ts >= self.keys[-1]:
+            self.keys.append(ts)
+            self.positions.append(position)
+            self.completed.append(self.completed[-1] + done)
+            self.skipped.append(self.skipped[-1] + skip)
+            return
+        # Back-dated entry: insert in order and shift the prefix counts after it.
+        i = bisect_right(self.keys, ts)
+        self.keys.insert(i, ts)
+        self.positions.insert(i, position)
+        self.completed.insert(i + 1, self.completed[i] + done)
+        self.skipped.insert(i + 1, self.skipped[i] + skip)
+        for k in range(i + 2, len(self.completed)):
+            self.completed[k] += done
+            self.skipped[k] += skip
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _bounds(self, start: Any, end: Any) -> Tuple[int, int]:
+        lo = bisect_left(self.keys, to_micros(start)) if start is not None else 0
+        hi = bisect_left(self.keys, to_micros(end)) if end is not None else len(self.keys)
+        return lo, max(lo, hi)
+
+    def between(self, start: Any = None, end: Any = None) -> List[Dict[str, Any]]:
+        """Workouts dated in [start, end), oldest first."""
+        lo, hi = self._bounds(start, end)
+        return [self.workouts[self.positions[i]] for i in range(lo, hi)]
+
+    def counts(self, start: Any = None, end: Any = None) -> Dict[str, Any]:
+        lo, hi = self._bounds(start, end)
+        total = hi - lo
+        completed = self.completed[hi] - self.completed[lo]
+        skipped = self.skipped[hi] - self.skipped[lo]
+        return {"total": total, "completed": completed, "skipped": skipped, "completion_rate": _rate(completed, total)}
+
+    def window(self, days: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Counts over the last `days` calendar days, today included."""
+        today = (now or datetime.now()).date()
+        stats = self.counts(today - timedelta(days=days - 1), today + timedelta(days=1))
+        stats["days"] = days
+        return stats
+
+    def windows(self, days: Iterable[int] = DEFAULT_WINDOWS, now: Optional[datetime] = None) -> Dict[str, Any]:
+        return {f"{d}d": self.window(d, now) for d in days}
+
+    def weekly(self, weeks: int = 4, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Monday-aligned weekly rollups, oldest first, ending with the current week."""
+        today = (now or datetime.now()).date()
+        monday = today - timedelta(days=today.weekday())
+        rollups = []
+        for k in range(weeks - 1, -1, -1):
+            start = monday - timedelta(weeks=k)
+            stats = self.counts(start, start + timedelta(weeks=1))
+            stats["week_start"] = start.isoformat()
+            rollups.append(stats)
+        return rollups
+
+
+def time_index(workouts: Sequence[Dict[str, Any]]) -> TimeIndex:
+    """Up-to-date index for `workouts`; cached on WorkoutHistory, built fresh for plain lists."""
+    if not isinstance(workouts, WorkoutHistory):
+        return TimeIndex(workouts)
+    index = workouts.__dict__.get("_time_index")
+    if index is None:
+        index = workouts._time_index = TimeIndex(workouts)
+    else:
+        index.refresh()
+    return index
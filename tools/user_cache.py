@@ -0,0 +1,132 @@
+"""
+UserCache: bounded LRU of deserialized user records, plus write-behind bookkeeping for DataManager.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional, Tuple
+
+
+class UserCache:
+    """
+    LRU map of user_id -> (record, version). The version is an opaque token from the
+    storage backend (e.g. file mtime); a mismatch on lookup invalidates the entry.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], Hashable]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries
+
+    def get(self, user_id: str, version: Hashable = None, check_version: bool = True) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        record, cached_version = entry
+        if check_version and version is not None and version != cached_version:
+            del self._entries[user_id]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return record
+
+    def put(self, user_id: str, record: Dict[str, Any], version: Hashable = None, pinned=()) -> None:
+        """Insert or refresh an entry; evicts least-recently-used entries that are not pinned (dirty)."""
+        self._entries[user_id] = (record, version)
+        self._entries.move_to_end(user_id)
+        self.trim(pinned, keep=user_id)
+
+    def trim(self, pinned=(), keep: Optional[str] = None) -> None:
+        if len(self._entries) <= self.capacity:
+            return
+        for victim in list(self._entries):
+            if len(self._entries) <= self.capacity:
+                break
+            if victim == keep or victim in pinned:
+                continue
+            del self._entries[victim]
+            self.evictions += 1
+
+    def set_version(self, user_id: str, version: Hashable) -> None:
+        if user_id in self._entries:
+            self._entries[user_id] = (self._entries[user_id][0], version)
+
+    def discard(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class WriteBehindBuffer:
+    """Dirty records waiting to be flushed; repeated saves of one user coalesce into a single write."""
+
+    def __init__(self, threshold: int = 100):
+        self.threshold = threshold
+        self.dirty: Dict[str, Dict[str, Any]] = {}
+        self.saves = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.flushed_records = 0
+        self.flush_time_total = 0.0
+        self.flush_time_max = 0.0
+        self.flush_time_last = 0.0
+
+    def __len__(self) -> int:
+        return len(self.dirty)
+
+    def add(self, user_id: str, record: Dict[str, Any]) -> bool:
+        """Mark a record dirty. Returns True once the dirty-count threshold is reached."""
+        self.saves += 1
+        if user_id in self.dirty:
+            self.coalesced += 1
+        self.dirty[user_id] = record
+        return len(self.dirty) >= self.threshold
+
+    def drain(self) -> Dict[str, Dict[str, Any]]:
+        dirty, self.dirty = self.dirty, {}
+        return dirty
+
+    def record_flush(self, count: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.flushed_records += count
+        self.flush_time_total += elapsed
+        self.flush_time_last = elapsed
+        self.flush_time_max = max(self.flush_time_max, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dirty": len(self.dirty),
+            "threshold": self.threshold,
+            "saves": self.saves,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "flushed_records": self.flushed_records,
+            "flush_ms_last": self.flush_time_last * 1000,
+            "flush_ms_max": self.flush_time_max * 1000,
+            "flush_ms_mean": self.flush_time_total / self.flushes * 1000 if self.flushes else 0.0,
+        }
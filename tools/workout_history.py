@@ -0,0 +1,352 @@
+"""
+WorkoutHistory: compact columnar container for user_data["workouts"].
+
+Entries are stored as parallel arrays (int64 timestamps in microseconds since the
+epoch, interned day/type codes, uint8 status codes) instead of one dict of strings
+per workout. Indexing returns a lightweight WorkoutRow view, so existing code that
+iterates, slices, appends dicts or calls w.get("status") keeps working unchanged.
+
+Entries that do not fit the columns exactly (missing or extra keys, dates that do not
+round-trip through datetime.isoformat) are kept verbatim alongside, so nothing is lost.
+"""
+import base64
+import sys
+from array import array
+from collections.abc import Mapping, MutableSequence
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set
+
+FORMAT = "workouts/columnar-1"
+FIELDS = ("day", "type", "status", "date")
+CODE_FIELDS = ("day", "type", "status")
+NO_TS = -(1 << 63)
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
+# Smallest code width first; a column is widened when its table outgrows it.
+_WIDTHS = (("B", 1 << 8), ("H", 1 << 16), ("I", 1 << 32))
+# Recent edits whose positions edited_since() can report; older ones only show up as a count.
+EDIT_LOG_SIZE = 256
+
+
+def parse_timestamp(value: Any) -> int:
+    """Microseconds since the epoch for naive ISO strings that round-trip exactly, else NO_TS."""
+    if not isinstance(value, str):
+        return NO_TS
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return NO_TS
+    if dt.tzinfo is not None or dt.isoformat() != value:
+        return NO_TS
+    return (dt - _EPOCH) // _ONE_US
+
+
+def format_timestamp(ts: int) -> str:
+    return (_EPOCH + timedelta(microseconds=ts)).isoformat()
+
+
+def _pack(column: array) -> str:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return base64.b64encode(column.tobytes()).decode("ascii")
+
+
+def _unpack(typecode: str, data: str) -> array:
+    column = array(typecode)
+    column.frombytes(base64.b64decode(data))
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+class WorkoutRow(Mapping):
+    """Read/write view of one entry; behaves like the dict it replaces."""
+
+    __slots__ = ("_history", "_index")
+
+    def __init__(self, history: "WorkoutHistory", index: int):
+        self._history = history
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self._history._field(self._index, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self._history._field(self._index, key)
+        except KeyError:
+            return default
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        entry = self.to_dict()
+        entry[key] = value
+        self._history[self._index] = entry
+
+    def __iter__(self) -> Iterator[str]:
+        irregular = self._history._irregular.get(self._index)
+        return iter(irregular if irregular is not None else FIELDS)
+
+    def __len__(self) -> int:
+        irregular = self._history._irregular.get(self._index)
+        return len(irregular) if irregular is not None else len(FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self}
+
+    def copy(self) -> Dict[str, Any]:
+        return self.to_dict()
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+
+class WorkoutHistory(MutableSequence):
+    """
+    List-like sequence of workout entries backed by typed arrays.
+
+    Appending takes a dict (e.g. from FitnessTools.create_workout_entry); reading returns
+    WorkoutRow views, and slices return lists of them. Row views address entries by position,
+    so a view taken before an insert or delete may point at a different entry afterwards.
+    """
+
+    def __init__(self, workouts: Optional[Iterable[Dict[str, Any]]] = None):
+        self.ts = array("q")
+        self.codes = {field: array("B") for field in CODE_FIELDS}
+        self.tables: Dict[str, List[Any]] = {field: [] for field in CODE_FIELDS}
+        self._lookup: Dict[str, Dict[Any, int]] = {field: {} for field in CODE_FIELDS}
+        self._irregular: Dict[int, Dict[str, Any]] = {}
+        # Bumped by every mutation other than append, so derived indexes know to rebuild.
+        self.edits = 0
+        # Position of each recent edit, None for one that moved entries (see edited_since).
+        self._edit_log: List[Optional[int]] = []
+        if workouts is not None:
+            self.extend(workouts)
+
+    # Encoding
+
+    def _intern(self, field: str, value: Any) -> int:
+        lookup = self._lookup[field]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.tables[field])
+            self.tables[field].append(value)
+            column = self.codes[field]
+            for typecode, limit in _WIDTHS:
+                if code < limit:
+                    if typecode != column.typecode:
+                        self.codes[field] = array(typecode, column)
+                    break
+        return code
+
+    def _encode(self, workout: Dict[str, Any]):
+        ts = parse_timestamp(workout.get("date"))
+        try:
+            codes = [self._intern(field, workout.get(field)) for field in CODE_FIELDS]
+        except TypeError:  # unhashable value: keep the entry verbatim
+            return ts, [self._intern(field, None) for field in CODE_FIELDS], dict(workout)
+        regular = ts != NO_TS and len(workout) == len(FIELDS) and all(field in workout for field in FIELDS)
+        return ts, codes, None if regular else dict(workout)
+
+    def _field(self, index: int, key: str) -> Any:
+        irregular = self._irregular.get(index)
+        if irregular is not None:
+            return irregular[key]
+        if key == "date":
+            return format_timestamp(self.ts[index])
+        if key in self.codes:
+            return self.tables[key][self.codes[key][index]]
+        raise KeyError(key)
+
+    def _shift_irregular(self, start: int, delta: int) -> None:
+        if self._irregular:
+            self._irregular = {(i + delta if i >= start else i): w for i, w in self._irregular.items()}
+
+    def _edited(self, index: Optional[int]) -> None:
+        self.edits += 1
+        self._edit_log.append(index)
+        if len(self._edit_log) > EDIT_LOG_SIZE:
+            del self._edit_log[: EDIT_LOG_SIZE // 2]
+
+    def edited_since(self, edits: int) -> Optional[Set[int]]:
+        """
+        Positions rewritten in place since `edits` was the edit count, so a saver can write just
+        those plus the appended entries. None if entries were inserted, deleted or replaced
+        wholesale meanwhile, or the edits are too old to tell.
+        """
+        count = self.edits - edits
+        if count < 0 or count > len(self._edit_log):
+            return None
+        positions = self._edit_log[len(self._edit_log) - count :] if count else []
+        return None if None in positions else set(positions)
+
+    # Sequence protocol
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [WorkoutRow(self, i) for i in range(*index.indices(len(self.ts)))]
+        if index < 0:
+            index += len(self.ts)
+        if not 0 <= index < len(self.ts):
+            raise IndexError("workout index out of range")
+        return WorkoutRow(self, index)
+
+    def __setitem__(self, index, workout) -> None:
+        if isinstance(index, slice):
+            replacement = [w.to_dict() if isinstance(w, WorkoutRow) else w for w in workout]
+            entries = self.to_list()
+            entries[index] = replacement
+            self._reset(entries)
+            return
+        if index < 0:
+            index += len(self.ts)
+        if isinstance(workout, WorkoutRow):
+            workout = workout.to_dict()
+        ts, codes, irregular = self._encode(workout)
+        self._edited(index)
+        self.ts[index] = ts
+        for field, code in zip(CODE_FIELDS, codes):
+            self.codes[field][index] = code
+        if irregular is None:
+            self._irregular.pop(index, None)
+        else:
+            self._irregular[index] = irregular
+
+    def __delitem__(self, index) -> None:
+        if isinstance(index, slice):
+            entries = self.to_list()
+            del entries[index]
+            self._reset(entries)
+            return
+        if index < 0:
+            index += len(self.ts)
+        self._edited(None)
+        del self.ts[index]
+        for column in self.codes.values():
+            del column[index]
+        self._irregular.pop(index, None)
+        self._shift_irregular(index, -1)
+
+    def insert(self, index: int, workout: Dict[str, Any]) -> None:
+        if index < 0:
+            index = max(0, index + len(self.ts))
+        index = min(index, len(self.ts))
+        if index == len(self.ts):
+            self.append(workout)
+            return
+        if isinstance(workout, WorkoutRow):
+            workout = workout.to_dict()
+        ts, codes, irregular = self._encode(workout)
+        self._edited(None)
+        self._shift_irregular(index, 1)
+        self.ts.insert(index, ts)
+        for field, code in zip(CODE_FIELDS, codes):
+            self.codes[field].insert(index, code)
+        if irregular is not None:
+            self._irregular[index] = irregular
+
+    def append(self, workout: Dict[str, Any]) -> None:
+        if isinstance(workout, WorkoutRow):
+            workout = workout.to_dict()
+        ts, codes, irregular = self._encode(workout)
+        if irregular is not None:
+            self._irregular[len(self.ts)] = irregular
+        self.ts.append(ts)
+        for field, code in zip(CODE_FIELDS, codes):
+            self.codes[field].append(code)
+
+    def __iter__(self) -> Iterator[WorkoutRow]:
+        for i in range(len(self.ts)):
+            yield WorkoutRow(self, i)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (WorkoutHistory, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"WorkoutHistory({self.to_list()!r})"
+
+    def _reset(self, entries: List[Dict[str, Any]]) -> None:
+        edits = self.edits
+        self.__init__(entries)
+        self.edits = edits
+        self._edited(None)
+
+    def clear(self) -> None:
+        self._reset([])
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state.pop("_time_index", None)  # cache, see tools.time_index
+        return state
+
+    def copy(self) -> "WorkoutHistory":
+        return WorkoutHistory.from_compact(self.to_compact())
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [row.to_dict() for row in self]
+
+    # Serialization
+
+    def to_compact(self) -> Dict[str, Any]:
+        """JSON-serializable form: base64 little-endian columns plus the interned tables."""
+        return {
+            "format": FORMAT,
+            "count": len(self.ts),
+            "tables": self.tables,
+            "typecodes": {field: column.typecode for field, column in self.codes.items()},
+            "columns": {
+                "ts": _pack(self.ts),
+                **{field: _pack(column) for field, column in self.codes.items()},
+            },
+            "irregular": {str(i): w for i, w in self._irregular.items()},
+        }
+
+    @classmethod
+    def from_compact(cls, data: Dict[str, Any]) -> "WorkoutHistory":
+        if data.get("format") != FORMAT:
+            raise ValueError(f"Unsupported workout history format: {data.get('format')!r}")
+        history = cls()
+        history.ts = _unpack("q", data["columns"]["ts"])
+        for field in CODE_FIELDS:
+            history.codes[field] = _unpack(data["typecodes"][field], data["columns"][field])
+            history.tables[field] = list(data["tables"][field])
+            history._lookup[field] = {value: code for code, value in enumerate(history.tables[field])}
+        history._irregular = {int(i): w for i, w in data.get("irregular", {}).items()}
+        if any(len(column) != len(history.ts) for column in history.codes.values()):
+            raise ValueError("Corrupt workout history: column lengths differ")
+        return history
+
+
+def is_compact(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("format") == FORMAT
+
+
+def attach(user_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Make user_data["workouts"] a WorkoutHistory, from either the list or the compact form."""
+    if user_data is None:
+        return None
+    workouts = user_data.get("workouts")
+    if is_compact(workouts):
+        user_data["workouts"] = WorkoutHistory.from_compact(workouts)
+    elif isinstance(workouts, list):
+        user_data["workouts"] = WorkoutHistory(workouts)
+    return user_data
+
+
+def json_default(obj: Any) -> Any:
+    """`default=` hook for json.dump: histories go to disk in compact form, datetimes as ISO strings."""
+    if isinstance(obj, WorkoutHistory):
+        return obj.to_compact()
+    if isinstance(obj, WorkoutRow):
+        return obj.to_dict()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if type(obj).__module__ == "numpy" and hasattr(obj, "item"):
+        return obj.item()  # NumPy scalar
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")